@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""cold start: compile rules vs load compiled rule bundle
+
+    PYTHONPATH=. python benchmarks/bench_bundle.py [-n 2000]
+
+각 측정은 새 python process 에서 수행한다. (import 비용 포함)
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATES = [
+    'service:svc{i} AND title:*keyword{i}*',
+    'url:/https?:\\/\\/host{i}\\.com/i OR size:[{i} TO {j}]',
+    'latency:>{i} NOT status:(ok "fine" /good\\d+/)',
+    '_exists_:field{i} AND body:COUNT(word{i})>=2',
+    'field{i}:!"len(this) > {i}"',
+]
+
+COMPILE = '''
+import json, sys, time
+t = time.perf_counter()
+import json_matcher
+rules = json.load(open(sys.argv[1]))
+matchers = dict((k, json_matcher.compile(v, parser=sys.argv[2])) for k, v in rules.items())
+print(time.perf_counter() - t)
+'''
+
+LOAD = '''
+import sys, time
+t = time.perf_counter()
+from json_matcher.bundle import load_bundle
+bundle = load_bundle(sys.argv[1])
+print(time.perf_counter() - t)
+'''
+
+
+def run(code, *args):
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', code] + list(args), cwd=ROOT)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='rule bundle cold start benchmark')
+    parser.add_argument('-n', type=int, default=2000, help='number of rules')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from json_matcher.bundle import build_bundle, save_bundle
+
+    rules = dict(('rule{}'.format(i), TEMPLATES[i % len(TEMPLATES)].format(i=i, j=i + 10)) for i in range(args.n))
+    workdir = tempfile.mkdtemp()
+    rules_path = os.path.join(workdir, 'rules.json')
+    bundle_path = os.path.join(workdir, 'rules.bundle')
+    with open(rules_path, 'w') as f:
+        json.dump(rules, f)
+    save_bundle(build_bundle(rules, parser='native'), bundle_path)
+
+    print('{} rules, bundle {:.1f} KB'.format(args.n, os.path.getsize(bundle_path) / 1024.0))
+    print('{:<24} {:>10.1f} ms'.format('compile (pyparsing)', run(COMPILE, rules_path, 'pyparsing') * 1000))
+    print('{:<24} {:>10.1f} ms'.format('compile (native)', run(COMPILE, rules_path, 'native') * 1000))
+    print('{:<24} {:>10.1f} ms'.format('load bundle', run(LOAD, bundle_path) * 1000))
+
+
+if __name__ == '__main__':
+    main()
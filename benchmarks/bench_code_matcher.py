@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare CodeMatcher building locals per value (previous) vs the cached frame, and !func over wildcard fields
+called per value vs once (accepts_sequence)
+
+    PYTHONPATH=. python benchmarks/bench_code_matcher.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext, MatchEnvironment, accepts_sequence
+
+
+def original_eval(matcher, input_value, context):
+    # 이전 구현
+    local = {}
+    local.update(context.environ.get_functions())
+    local['this'] = input_value
+    first = matcher.variable_names[0] if len(matcher.variable_names) == 1 else None
+    try:
+        if first and callable(local.get(first)):
+            ret = local[first](input_value)
+        else:
+            ret = eval(matcher.compiled, {}, local)
+    except (AttributeError, TypeError):
+        return False, None
+    return ret, ret
+
+
+def bench(func, number=20000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    environ = MatchEnvironment()
+    for idx in range(50):
+        environ.add_function('f{}'.format(idx), len)
+    environ.add_function('is_exe', lambda value: value.endswith('.exe'))
+    context = MatchContext({}, environ)
+    print('{:<32} {:>12} {:>12} {:>8}'.format('expression', 'previous', 'frame', 'speedup'))
+    for expression in ['is_exe', 'is_exe(this) and len(this) > 3', 'this.startswith("c:")']:
+        matcher = jm.CodeMatcher(expression)
+        value = 'c:/windows/cmd.exe'
+        assert matcher.eval(value, context) == original_eval(matcher, value, context)
+        before = bench(lambda: original_eval(matcher, value, context))
+        after = bench(lambda: matcher.eval(value, context))
+        print('{:<32} {:>9.3f} us {:>9.3f} us {:>7.1f}x'.format(expression, before * 1e6, after * 1e6, before / after))
+
+    # 호출마다 비용이 있는 함수 (예: 외부 조회) 를 값마다 부르는 경우와 한 번 부르는 경우
+    def lookup(values):
+        sum(range(2000))
+        return [value.endswith('.exe') for value in values]
+    environ.add_function('lookup_each', lambda value: lookup([value])[0])
+    environ.add_function('lookup_batch', accepts_sequence(lookup))
+    print()
+    print('{:<32} {:>12} {:>12} {:>8}'.format('files (no match)', 'per value', 'batch', 'speedup'))
+    for count in [1, 10, 100]:
+        doc = dict(files=[dict(name='{}.txt'.format(idx)) for idx in range(count)])
+        each = jm.JsonMatcher('files.*.name:!lookup_each', environ=environ)
+        batch = jm.JsonMatcher('files.*.name:!lookup_batch', environ=environ)
+        before = bench(lambda: each.match(doc), number=200)
+        after = bench(lambda: batch.match(doc), number=200)
+        print('{:<32} {:>9.1f} us {:>9.1f} us {:>7.1f}x'.format(count, before * 1e6, after * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare match engines (interpreter vs codegen) per document
+
+    PYTHONPATH=. python benchmarks/bench_codegen.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+import json_matcher
+
+DOC = {
+    'service': 'tistory', 'userid': '3338219', 'size': 1532, 'score': 0.7,
+    'title': 'json matcher benchmark document',
+    'request': {'method': 'GET', 'path': '/api/v1/items', 'status': 200,
+                'headers': {'host': 'example.com', 'agent': 'Mozilla/5.0'}},
+    'tags': ['a', 'b', 'c'],
+}
+
+QUERIES = [
+    ('single term', 'service:tistory'),
+    ('nested field', 'request.headers.host:example.com'),
+    ('AND x 4', 'service:tistory AND size:>1000 AND request.status:200 AND score:[0.5 TO 1]'),
+    ('OR x 20 (miss)', ' OR '.join('service:s{}'.format(i) for i in range(20))),
+    ('wildcard/regexp', 'title:*matcher* AND request.path:/^\\/api\\/v\\d+/ AND NOT userid:0'),
+    ('mixed', '(service:blog OR service:tistory) AND request.method:GET AND _exists_:tags AND size:<2000'),
+]
+
+
+def bench(query, engine, number):
+    matcher = json_matcher.compile(query, engine=engine)
+    return min(timeit.repeat(lambda: matcher.match(DOC), number=number, repeat=5)) / number
+
+
+def main():
+    print('{:<18} {:>14} {:>14} {:>8}'.format('query', 'interpreter', 'codegen', 'speedup'))
+    for name, query in QUERIES:
+        interpreter = bench(query, json_matcher.ENGINE_INTERPRETER, 2000)
+        codegen = bench(query, json_matcher.ENGINE_CODEGEN, 2000)
+        print('{:<18} {:>11.2f} us {:>11.2f} us {:>7.1f}x'.format(
+            name, interpreter * 1e6, codegen * 1e6, interpreter / codegen))
+
+
+if __name__ == '__main__':
+    main()
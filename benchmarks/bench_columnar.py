@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare matching flattened records one by one (match per row) vs JsonMatcher.match_columns (requires numpy)
+
+    PYTHONPATH=. python benchmarks/bench_columnar.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import time
+
+import numpy
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+from json_matcher.columnar import build_document
+
+QUERIES = [
+    'status:200',
+    'latency:>500 AND status:[400 TO 499]',
+    'method:(GET HEAD) AND NOT status:200',
+    'latency:>900 AND path:/^\\/api\\/v[0-9]+\\/users/',
+]
+
+
+def make_columns(count, seed=0):
+    r = random.Random(seed)
+    return {
+        'status': numpy.array([r.choice([200, 200, 200, 301, 404, 500]) for _ in range(count)]),
+        'latency': numpy.array([r.random() * 1000 for _ in range(count)]),
+        'method': numpy.array([r.choice(['GET', 'POST', 'HEAD', 'PUT']) for _ in range(count)]),
+        'path': numpy.array([r.choice(['/api/v1/users/1', '/api/v2/items', '/index.html']) for _ in range(count)]),
+    }
+
+
+def main():
+    count = 100000
+    columns = make_columns(count)
+    names = list(columns)
+    documents = [build_document(names, row) for row in zip(*[columns[name].tolist() for name in names])]
+    print('{} rows'.format(count))
+    print('{:<60} {:>10} {:>10} {:>8}'.format('query', 'per row', 'columns', 'speedup'))
+    for query in QUERIES:
+        matcher = jm.JsonMatcher(query)
+        start = time.time()
+        expected = [bool(matcher.match_with_context(MatchContext(document))) for document in documents]
+        before = time.time() - start
+        start = time.time()
+        mask = matcher.match_columns(columns)
+        after = time.time() - start
+        assert mask.tolist() == expected
+        print('{:<60} {:>7.1f} ms {:>7.1f} ms {:>7.1f}x'.format(query, before * 1e3, after * 1e3, before / after))
+
+
+if __name__ == '__main__':
+    main()
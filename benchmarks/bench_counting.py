@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare COUNT(...) on long text: slicing search (previous) vs positional search, with/without early exit
+
+    PYTHONPATH=. python benchmarks/bench_counting.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import string
+import timeit
+
+import json_matcher
+from json_matcher import MatchContext
+
+
+def slice_count(pattern, value):
+    # 이전 구현: 매칭될 때마다 남은 문자열을 복사한다.
+    last_matched = ''
+    count = 0
+    start = 0
+    while True:
+        m = pattern.search(value[start:])
+        if not m:
+            break
+        last_matched = m.group()
+        start += m.start() + 1
+        count += 1
+    return count, last_matched
+
+
+def make_text(length, seed=0):
+    r = random.Random(seed)
+    return ''.join(r.choice(string.ascii_lowercase + ' ' * 5 + string.digits) for _ in range(length))
+
+
+def bench(func, number=3):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    print('{:>10} {:>8} {:>12} {:>12} {:>14}'.format('length', 'hits', 'slice', 'positional', 'COUNT()>10'))
+    for length in [10000, 100000, 1000000]:
+        text = make_text(length)
+        regexp_matcher = json_matcher.compile(r'a:/\d[a-z]/').matcher.field_value
+        context = MatchContext({})
+        hits, _ = regexp_matcher.count(text, context)
+        sliced = bench(lambda: slice_count(regexp_matcher.pattern, text))
+        positional = bench(lambda: regexp_matcher.count(text, context))
+        counting_matcher = json_matcher.compile(r'a:COUNT(/\d[a-z]/)>10').matcher.field_value
+        early = bench(lambda: counting_matcher.eval(text, context))
+        print('{:>10} {:>8} {:>9.2f} ms {:>9.2f} ms {:>11.3f} ms'.format(
+            length, hits, sliced * 1e3, positional * 1e3, early * 1e3))
+
+
+if __name__ == '__main__':
+    main()
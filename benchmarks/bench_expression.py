@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare _expr_ evaluated on a copy of the whole document (previous) vs resolving only the names it uses
+
+    PYTHONPATH=. python benchmarks/bench_expression.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+
+
+def original_eval(matcher, context):
+    # 이전 구현: 문서를 복사하고 함수를 합친다.
+    local = dict(context.get_dict())
+    local.update(context.environ.get_functions())
+    try:
+        ret = eval(matcher.original, {}, jm.DictOrObject(local))
+    except (AttributeError, TypeError):
+        return False, None
+    return ret, ret
+
+
+def make_doc(size):
+    doc = dict(('field{}'.format(idx), idx) for idx in range(size))
+    doc.update(A=dict(B=dict(C=5)), D=7)
+    return doc
+
+
+def bench(func, number=20000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    print('{:>8} {:<22} {:>12} {:>12} {:>8}'.format('fields', 'expression', 'copy', 'names', 'speedup'))
+    for size in [10, 100, 1000]:
+        doc = make_doc(size)
+        for expression in ['D > 5', 'A.B.C + D > 10']:
+            matcher = jm.ExpressionMatcher(expression)
+            matcher.original = compile(expression, '_expression_matcher', 'eval')
+            context = MatchContext(doc)
+            assert matcher.eval(context) == original_eval(matcher, context)
+            before = bench(lambda: original_eval(matcher, context))
+            after = bench(lambda: matcher.eval(context))
+            print('{:>8} {:<22} {:>9.2f} us {:>9.2f} us {:>7.1f}x'.format(
+                size, expression, before * 1e6, after * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    main()
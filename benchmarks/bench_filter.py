@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""throughput of match(j) per document vs test(j) (no result capture) vs filter(docs) (one reused context)
+
+    PYTHONPATH=. python benchmarks/bench_filter.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import time
+
+import json_matcher
+from json_matcher import json_matcher as jm
+
+QUERIES = [
+    'status:200',
+    'status:200 AND method:GET AND latency:>100',
+    'method:(GET HEAD) AND NOT status:[400 TO 599] AND path:*users',
+]
+
+
+def make_docs(count, seed=0):
+    r = random.Random(seed)
+    return [dict(status=r.choice([200, 200, 301, 404, 500]), method=r.choice(['GET', 'POST', 'HEAD']),
+                 latency=r.random() * 1000, path=r.choice(['/api/v1/users', '/index.html', '/api/v2/items']))
+            for _ in range(count)]
+
+
+def throughput(func, count, repeat=3):
+    elapsed = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed.append(time.time() - start)
+    return count / min(elapsed)
+
+
+def main():
+    count = 200000
+    docs = make_docs(count)
+    print('{} documents, documents/sec'.format(count))
+    print('{:<64} {:<12} {:>10} {:>10} {:>10} {:>8}'.format('query', 'engine', 'match', 'test', 'filter', 'speedup'))
+    for query in QUERIES:
+        for engine in [json_matcher.ENGINE_INTERPRETER, json_matcher.ENGINE_CODEGEN]:
+            matcher = jm.JsonMatcher(query, engine=engine)
+            expected = [doc for doc in docs if matcher.match(doc)]
+            assert [doc for doc in docs if matcher.test(doc)] == expected
+            assert list(matcher.filter(docs)) == expected
+            match = throughput(lambda: [doc for doc in docs if matcher.match(doc)], count)
+            test = throughput(lambda: [doc for doc in docs if matcher.test(doc)], count)
+            filtered = throughput(lambda: list(matcher.filter(docs)), count)
+            print('{:<64} {:<12} {:>10.0f} {:>10.0f} {:>10.0f} {:>7.2f}x'.format(
+                query, engine, match, test, filtered, filtered / match))
+
+
+if __name__ == '__main__':
+    main()
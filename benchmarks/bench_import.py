@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""measure startup cost of json_matcher
+
+    python benchmarks/bench_import.py [-n 20]
+
+각 측정은 새 python process 에서 수행한다. (import 결과가 캐시되지 않도록)
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ('import', 'import json_matcher'),
+    ('import+compile', 'import json_matcher; json_matcher.compile("foo:bar")'),
+    ('import+compile(all grammars)',
+     'import json_matcher\n'
+     'for flags in [0, json_matcher.IMPLICIT_OR, json_matcher.TERM_MATCH_CONTAIN,\n'
+     '              json_matcher.IMPLICIT_OR | json_matcher.TERM_MATCH_CONTAIN]:\n'
+     '    json_matcher.compile("foo:bar", flags)'),
+]
+
+TIMER = '''
+import time
+_t = time.perf_counter()
+{code}
+print(time.perf_counter() - _t)
+'''
+
+
+def run_once(code):
+    output = subprocess.check_output([sys.executable, '-c', TIMER.format(code=code)], cwd=ROOT)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='json_matcher startup benchmark')
+    parser.add_argument('-n', type=int, default=20, help='number of processes per scenario')
+    args = parser.parse_args()
+
+    for name, code in SCENARIOS:
+        timings = [run_once(code) for _ in range(args.n)]
+        print('{:<32} median {:8.2f} ms  min {:8.2f} ms'.format(
+            name, statistics.median(timings) * 1000, min(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main()
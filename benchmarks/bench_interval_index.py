@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare numeric term evaluation in MultiMatcher (one by one vs interval index)
+
+    PYTHONPATH=. python benchmarks/bench_interval_index.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import timeit
+
+from json_matcher import multi_matcher as multi_matcher_module
+from json_matcher.multi_matcher import compile_many
+
+DOC = {'latency': 730, 'size': 15, 'score': 0.42}
+
+
+def make_rules(count, seed=0):
+    r = random.Random(seed)
+    queries = [
+        lambda: 'latency:>{}'.format(r.randint(0, 1000)),
+        lambda: 'size:[{} TO {}]'.format(*sorted([r.randint(0, 100), r.randint(0, 100)])),
+        lambda: 'score:<={:.2f}'.format(r.random()),
+    ]
+    return dict(('rule{}'.format(idx), r.choice(queries)()) for idx in range(count))
+
+
+def bench(rules, min_terms):
+    multi_matcher_module.NUMERIC_INDEX_MIN_TERMS = min_terms
+    matcher = compile_many(rules, index=False)
+    number = max(1, 2000 // len(rules))
+    return min(timeit.repeat(lambda: matcher.match(DOC), number=number, repeat=3)) / number, len(matcher.match(DOC))
+
+
+def main():
+    print('{:>6} {:>8} {:>14} {:>14} {:>8}'.format('rules', 'matched', 'each term', 'interval', 'speedup'))
+    min_terms = multi_matcher_module.NUMERIC_INDEX_MIN_TERMS
+    for count in [100, 1000, 10000]:
+        rules = make_rules(count)
+        each, matched = bench(rules, float('inf'))
+        indexed, _ = bench(rules, min_terms)
+        print('{:>6} {:>8} {:>11.2f} ms {:>11.2f} ms {:>7.1f}x'.format(
+            count, matched, each * 1e3, indexed * 1e3, each / indexed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare @@{name} terms resolved per evaluation (previous) vs bound to the environ at compile time
+
+    PYTHONPATH=. python benchmarks/bench_keyword_binding.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import string
+import timeit
+
+import json_matcher
+from json_matcher import KeywordSet, MatchContext, MatchEnvironment
+
+
+def make_words(count, seed=0):
+    r = random.Random(seed)
+    return [''.join(r.choice(string.ascii_lowercase) for _ in range(r.randint(5, 10))) for _ in range(count)]
+
+
+def bench(func, number=2000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', make_words(100)))
+    environ.put_keyword_set('other', KeywordSet('other', make_words(100, seed=1)))
+    docs = [dict(a='the quick brown fox jumps over the lazy dog'), dict(a=make_words(100)[-1])]
+    print('{:<28} {:>12} {:>12} {:>8}'.format('query', 'unbound', 'bound', 'speedup'))
+    for query in ['a:@@{keyword}', 'a:*@@{keyword}*', 'a:/@@{keyword}/', 'a:/^@@{keyword}-@@{other}$/',
+                  'a:COUNT(/@@{keyword}/)>1']:
+        unbound = json_matcher.compile(query)
+        bound = json_matcher.compile(query, environ=environ)
+        before = bench(lambda: [unbound.match_with_context(MatchContext(doc, environ)) for doc in docs])
+        after = bench(lambda: [bound.match(doc) for doc in docs])
+        print('{:<28} {:>9.2f} us {:>9.2f} us {:>7.1f}x'.format(
+            query, before / len(docs) * 1e6, after / len(docs) * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    main()
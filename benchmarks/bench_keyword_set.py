@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare KeywordSet engines (one alternation regexp vs Aho-Corasick automaton)
+
+    PYTHONPATH=. python benchmarks/bench_keyword_set.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import string
+import time
+import timeit
+
+from json_matcher import KeywordSet, KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK
+from json_matcher import aho_corasick
+
+SIZES = [100, 1000, 10000, 100000]
+
+
+def make_keywords(count, seed=0):
+    r = random.Random(seed)
+    # 문서에 없는 숫자로 끝나게 해서 keyword 의 앞부분만 매칭되는 경우를 만든다.
+    return [''.join(r.choice(string.ascii_lowercase) for _ in range(r.randint(4, 11))) + r.choice(string.digits)
+            for _ in range(count)]
+
+
+def make_text(keywords, length=300, seed=1):
+    # keyword 가 없는 문서(miss) 와 끝 부분에 keyword 가 있는 문서(hit)
+    r = random.Random(seed)
+    miss = ''.join(r.choice(string.ascii_lowercase + ' ') for _ in range(length))
+    return miss, miss[:-20] + keywords[len(keywords) // 2]
+
+
+def bench(keywords, engine, texts):
+    keyword_set = KeywordSet('keyword', keywords, engine=engine)
+    started = time.time()
+    keyword_set.search('')
+    build = time.time() - started
+
+    number = max(3, min(200, 200000 // len(keywords)))
+    timings = []
+    for text in texts:
+        timings.append(min(timeit.repeat(lambda: keyword_set.search(text), number=number, repeat=3)) / number)
+    count = min(timeit.repeat(lambda: keyword_set.count(texts[1]), number=number, repeat=3)) / number
+    return build, timings[0], timings[1], count
+
+
+def main():
+    print('automaton: {}'.format('pyahocorasick' if aho_corasick.ahocorasick else 'pure python'))
+    print('{:>8} {:<14} {:>10} {:>14} {:>14} {:>14}'.format('keywords', 'engine', 'build', 'search(miss)',
+                                                           'search(hit)', 'count'))
+    for size in SIZES:
+        keywords = make_keywords(size)
+        texts = make_text(keywords)
+        for engine in [KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK]:
+            build, miss, hit, count = bench(keywords, engine, texts)
+            print('{:>8} {:<14} {:>8.3f} s {:>11.1f} us {:>11.1f} us {:>11.1f} us'.format(
+                size, engine, build, miss * 1e6, hit * 1e6, count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
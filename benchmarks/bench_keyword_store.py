@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""reload a large keyword set file: background rebuild time and the first match after the snapshot is swapped
+
+    PYTHONPATH=. python benchmarks/bench_keyword_store.py
+"""
+from __future__ import print_function, unicode_literals
+
+import io
+import os
+import random
+import shutil
+import string
+import tempfile
+import time
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+from json_matcher.keyword_store import KeywordSetStore
+
+
+def make_words(count, seed=0):
+    r = random.Random(seed)
+    return [''.join(r.choice(string.ascii_lowercase) for _ in range(r.randint(5, 10))) for _ in range(count)]
+
+
+def write_keywords(path, keywords, mtime):
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join('{}\n'.format(keyword) for keyword in keywords))
+    os.utime(path, (mtime, mtime))
+
+
+def first_match(matcher, environ, doc):
+    start = time.time()
+    matcher.match_with_context(MatchContext(doc, environ))
+    return time.time() - start
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'keywords.txt')
+        print('{:>8} {:>12} {:>18} {:>18}'.format('keywords', 'reload', 'first match(lazy)', 'first match(store)'))
+        for count in [1000, 10000, 50000]:
+            words = make_words(count)
+            doc = dict(a='the quick brown fox {}'.format(words[-1]))
+            write_keywords(path, words, 1000)
+            store = KeywordSetStore({'keyword': path})
+            bound = jm.JsonMatcher('a:/@@{keyword}/ AND b:@@{keyword}', environ=store)
+            unregistered = jm.JsonMatcher('a:/@@{keyword}/ AND b:@@{keyword}').bind(store.get_environ())
+
+            write_keywords(path, words[1:] + make_words(1, seed=count), 2000)
+            start = time.time()
+            store.reload()
+            reload_time = time.time() - start
+            environ = store.get_environ()
+            # 이전 구현: snapshot 을 바꾼 뒤 처음 평가할 때 정규식을 만든다.
+            lazy = first_match(unregistered, environ, doc)
+            prepared = first_match(bound, environ, doc)
+            print('{:>8} {:>9.1f} ms {:>15.2f} ms {:>15.2f} ms'.format(
+                count, reload_time * 1e3, lazy * 1e3, prepared * 1e3))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
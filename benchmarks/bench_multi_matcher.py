@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare evaluating many rules against one document (per rule JsonMatcher vs MultiMatcher with/without index)
+
+    PYTHONPATH=. python benchmarks/bench_multi_matcher.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import timeit
+
+import json_matcher
+from json_matcher import MatchContext
+from json_matcher.multi_matcher import compile_many
+
+DOC = {
+    'service': 'tistory', 'userid': '3338219', 'size': 1532, 'score': 0.7,
+    'request': {'method': 'GET', 'path': '/api/v1/items', 'status': 200,
+                'headers': {'host': 'example.com', 'agent': 'Mozilla/5.0'}},
+}
+
+SERVICES = ['tistory', 'blog', 'cafe', 'news', 'mail'] + ['service{}'.format(i) for i in range(45)]
+METHODS = ['GET', 'POST', 'PUT']
+HOSTS = ['example.com', 'example.org', 'example.net']
+
+
+def make_rules(count, seed=0):
+    # 같은 field 와 값을 공유하는 rule 들 (실제 탐지 rule 처럼 field 수는 적고 rule 은 많음)
+    r = random.Random(seed)
+    rules = {}
+    for idx in range(count):
+        rules['rule{}'.format(idx)] = '{} AND {} AND ({} OR {})'.format(
+            'service:{}'.format(r.choice(SERVICES)),
+            'request.method:{}'.format(r.choice(METHODS)),
+            'request.headers.host:{}'.format(r.choice(HOSTS)),
+            'size:>{}'.format(r.choice([100, 1000, 2000])))
+    return rules
+
+
+def bench_each(matchers, number):
+    def run():
+        return [rule_id for rule_id, matcher in matchers if matcher.match(DOC)]
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def bench_shared_context(matchers, number):
+    def run():
+        context = MatchContext(DOC)
+        return [rule_id for rule_id, matcher in matchers if matcher.match_with_context(context)]
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def bench_multi(multi_matcher, number):
+    return min(timeit.repeat(lambda: multi_matcher.match(DOC), number=number, repeat=3)) / number
+
+
+def main():
+    print('{:>6} {:>8} {:>12} {:>12} {:>12} {:>12} {:>8}'.format(
+        'rules', 'terms', 'each', 'shared ctx', 'multi', 'multi+index', 'pruned'))
+    for count in [100, 1000, 10000]:
+        rules = make_rules(count)
+        matchers = [(rule_id, json_matcher.compile(query, parser=json_matcher.PARSER_NATIVE))
+                    for rule_id, query in rules.items()]
+        multi_matcher = compile_many(rules, parser=json_matcher.PARSER_NATIVE, index=False)
+        indexed_matcher = compile_many(rules, parser=json_matcher.PARSER_NATIVE)
+        number = max(1, 1000 // count)
+
+        each = bench_each(matchers, number)
+        shared_context = bench_shared_context(matchers, number)
+        multi = bench_multi(multi_matcher, number)
+        indexed = bench_multi(indexed_matcher, number)
+        print('{:>6} {:>8} {:>9.2f} ms {:>9.2f} ms {:>9.2f} ms {:>9.2f} ms {:>7.1f}%'.format(
+            count, len(multi_matcher.terms), each * 1e3, shared_context * 1e3, multi * 1e3, indexed * 1e3,
+            indexed_matcher.stats().pruned_ratio * 100))
+
+
+if __name__ == '__main__':
+    main()
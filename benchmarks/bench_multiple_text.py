@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare field:(a b c ...) evaluated one matcher at a time vs prebuilt alternatives (text_alternatives.py)
+
+    PYTHONPATH=. python benchmarks/bench_multiple_text.py
+"""
+from __future__ import print_function, unicode_literals
+
+import random
+import string
+import timeit
+
+import json_matcher
+from json_matcher import MatchContext
+
+
+def make_words(count, seed=0):
+    r = random.Random(seed)
+    return [''.join(r.choice(string.ascii_lowercase) for _ in range(r.randint(5, 10))) for _ in range(count)]
+
+
+def make_cases():
+    words = make_words(500)
+    cases = []
+    for count in [3, 30, 300]:
+        cases.append(('text', count, json_matcher.TERM_MATCH_EQUAL, words[:count]))
+    for count in [3, 30, 300]:
+        cases.append(('contain', count, json_matcher.TERM_MATCH_CONTAIN, words[:count]))
+    for count in [3, 30, 100]:
+        cases.append(('wildcard', count, json_matcher.TERM_MATCH_EQUAL, ['*{}*'.format(w) for w in words[:count]]))
+    for count in [3, 30, 100]:
+        cases.append(('regexp', count, json_matcher.TERM_MATCH_EQUAL, ['/{}[0-9]+/'.format(w) for w in words[:count]]))
+    mixed = []
+    for idx, word in enumerate(words[:300]):
+        mixed.append([word, '{}*'.format(word), '/{}[0-9]+/'.format(word)][idx % 3])
+    cases.append(('mixed', len(mixed), json_matcher.TERM_MATCH_EQUAL, mixed))
+    return cases
+
+
+def bench(alternatives, values, method):
+    evaluate = getattr(alternatives, method)
+    context = MatchContext({})
+
+    def run():
+        for value in values:
+            evaluate(value, context)
+    number = 200
+    return min(timeit.repeat(run, number=number, repeat=3)) / number / len(values)
+
+
+def main():
+    # 매칭되지 않는 값과 마지막 값에 매칭되는 값
+    values = ['the quick brown fox jumps over the lazy dog', 'user agent string 12345 mozilla']
+    print('{:<10} {:>6} {:>12} {:>12} {:>8}'.format('kind', 'values', 'each', 'prebuilt', 'speedup'))
+    for kind, count, flags, words in make_cases():
+        query = 'a:({})'.format(' '.join(words))
+        alternatives = json_matcher.compile(query, flags).matcher.field_value.alternatives
+        inputs = values + [words[-1].strip('*/').replace('[0-9]+', '7')]
+        each = bench(alternatives, inputs, 'eval_each')
+        prebuilt = bench(alternatives, inputs, 'eval_one')
+        print('{:<10} {:>6} {:>9.2f} us {:>9.2f} us {:>7.1f}x'.format(
+            kind, count, each * 1e6, prebuilt * 1e6, each / prebuilt))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""jrep throughput on a JSONL file: one process (line by line, as jrep without -j) vs parallel.grep with N jobs
+
+    PYTHONPATH=. python benchmarks/bench_parallel.py
+"""
+from __future__ import print_function, unicode_literals
+
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import json_matcher
+from json_matcher.parallel import grep
+
+QUERY = 'status:[500 TO 599] AND method:(GET POST) AND path:*users*'
+
+
+def write_file(path, count, seed=0):
+    r = random.Random(seed)
+    with io.open(path, 'w', encoding='utf-8') as f:
+        for idx in range(count):
+            doc = dict(id=idx, status=r.choice([200, 200, 301, 404, 500, 503]), method=r.choice(['GET', 'POST', 'PUT']),
+                       path=r.choice(['/api/v1/users/{}'.format(idx), '/index.html', '/api/v2/items']),
+                       latency=r.random() * 1000, agent='Mozilla/5.0 (X11; Linux x86_64) json_matcher bench')
+            f.write(json.dumps(doc) + '\n')
+
+
+def sequential(path, output):
+    # jrep 의 -j 없는 경우
+    matcher = json_matcher.compile(QUERY)
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if matcher.test(json.loads(line)):
+                output.write(line.encode('utf-8'))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'access.json')
+        write_file(path, 500000)
+        size = os.path.getsize(path) / 1024.0 / 1024.0
+        print('{:.0f} MB, {} cpus'.format(size, multiprocessing.cpu_count()))
+        print('{:<14} {:>10} {:>10} {:>8}'.format('mode', 'seconds', 'MB/s', 'speedup'))
+        output = io.BytesIO()
+        start = time.time()
+        sequential(path, output)
+        base = time.time() - start
+        expected = output.getvalue()
+        print('{:<14} {:>10.2f} {:>10.1f} {:>7.1f}x'.format('sequential', base, size / base, 1.0))
+        for jobs in sorted(set([2, 4, multiprocessing.cpu_count()])):
+            for ordered in [True, False]:
+                output = io.BytesIO()
+                start = time.time()
+                grep(QUERY, [path], jobs=jobs, ordered=ordered, chunk_size=4 * 1024 * 1024, output=output)
+                elapsed = time.time() - start
+                assert sorted(output.getvalue().splitlines()) == sorted(expected.splitlines())
+                if ordered:
+                    assert output.getvalue() == expected
+                mode = '-j {} {}'.format(jobs, 'ordered' if ordered else 'unordered')
+                print('{:<14} {:>10.2f} {:>10.1f} {:>7.1f}x'.format(mode, elapsed, size / elapsed, base / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare query parser backends (pyparsing vs native)
+
+    PYTHONPATH=. python benchmarks/bench_parser.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from json_matcher import json_matcher as jm
+
+
+def or_query(n):
+    return ' OR '.join('field{}:value{}'.format(i, i) for i in range(n))
+
+
+def nested_query(depth):
+    return '(' * depth + 'A:x' + ' AND B:y)' * depth
+
+
+def mixed_query(n):
+    terms = ['a:x', 'b:>10', 'c:[1 TO 5]', 'd:/re+/i', 'e:(x y "z w")', 'NOT f:*abc*', 'g:COUNT(x)>2']
+    return ' '.join(terms[i % len(terms)] for i in range(n))
+
+
+QUERIES = [
+    ('single term', 'field:value'),
+    ('OR x 10', or_query(10)),
+    ('OR x 100', or_query(100)),
+    ('OR x 500', or_query(500)),
+    ('nested x 20', nested_query(20)),
+    ('nested x 80', nested_query(80)),
+    ('mixed x 50', mixed_query(50)),
+]
+
+
+def bench(query, parser, number):
+    # grammar 생성 비용은 제외한다.
+    jm.build_json_matcher('A:x', parser=parser)
+    try:
+        jm.build_json_matcher(query, parser=parser)
+    except RecursionError:
+        return None
+    return min(timeit.repeat(lambda: jm.build_json_matcher(query, parser=parser), number=number, repeat=3)) / number
+
+
+def main():
+    print('{:<16} {:>14} {:>14} {:>8}'.format('query', 'pyparsing', 'native', 'speedup'))
+    for name, query in QUERIES:
+        number = 3 if len(query) > 2000 else 20
+        reference = bench(query, jm.PARSER_PYPARSING, number)
+        native = bench(query, jm.PARSER_NATIVE, number)
+        if reference is None:
+            print('{:<16} {:>14} {:>11.3f} ms'.format(name, 'RecursionError', native * 1000))
+            continue
+        print('{:<16} {:>11.3f} ms {:>11.3f} ms {:>7.1f}x'.format(
+            name, reference * 1000, native * 1000, reference / native))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare regex engines on safe / catastrophic patterns and measure the cost of regex validation
+
+    PYTHONPATH=. python benchmarks/bench_regex_engine.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+import json_matcher
+from json_matcher import regex_engine
+from json_matcher.regex_engine import find_backtracking
+
+PATTERNS = [
+    ('safe', r'^[a-z]+@[a-z]+\.com$', 'a' * 20 + '@example.org'),
+    ('nested', r'^(a+)+$', 'a' * 22 + 'b'),
+    ('alternation', r'^(a|a)*$', 'a' * 22 + 'b'),
+]
+
+
+def bench_match(query, doc, regex_engine_name):
+    matcher = json_matcher.compile(query, regex_engine=regex_engine_name)
+    return min(timeit.repeat(lambda: matcher.match(doc), number=1, repeat=3))
+
+
+def main():
+    print('re2: {}'.format('installed' if regex_engine.re2 else 'not installed (falls back to re)'))
+    print('{:<12} {:>12} {:>12} {:>14}'.format('pattern', 're', 're2', 'validation'))
+    for name, pattern, value in PATTERNS:
+        query = 'a:/{}/'.format(pattern)
+        doc = dict(a=value)
+        timings = [bench_match(query, doc, engine) for engine in regex_engine.REGEX_ENGINES]
+        number = 1000
+        validation = min(timeit.repeat(lambda: find_backtracking(pattern), number=number, repeat=3)) / number
+        print('{:<12} {:>9.2f} ms {:>9.2f} ms {:>11.1f} us'.format(
+            name, timings[0] * 1e3, timings[1] * 1e3, validation * 1e6))
+
+
+if __name__ == '__main__':
+    main()
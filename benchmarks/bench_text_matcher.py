@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compare TextMatcher.eval_one parsing the value per call (previous) vs precompiled wildcard/typed constants
+
+    PYTHONPATH=. python benchmarks/bench_text_matcher.py
+"""
+from __future__ import print_function, unicode_literals
+
+import fnmatch
+import numbers
+import timeit
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+
+
+def original_eval_one(matcher, input_value, context):
+    # 이전 구현 (keyword set 이 없는 경우)
+    value = matcher.value
+    if not matcher.quoted:
+        if isinstance(input_value, bool):
+            if value.lower() in ['true', 'false']:
+                return (value.lower() == 'true') == input_value, input_value
+        elif isinstance(input_value, numbers.Number):
+            try:
+                return int(value) == int(input_value), input_value
+            except ValueError:
+                pass
+            try:
+                return (abs(float(str(value))) - abs(float(input_value))) < 1e-09, input_value
+            except ValueError:
+                pass
+    if not isinstance(input_value, str):
+        input_value = str(input_value)
+    if context.has_keyword_set(value):
+        raise NotImplementedError
+    if '*' in value or '?' in value:
+        return fnmatch.fnmatch(input_value, value), input_value
+    return value == input_value, value
+
+
+def bench(func, number=100000):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    context = MatchContext({})
+    cases = [
+        ('prefix*', 'mozilla*', 'mozilla/5.0 (x11; linux x86_64)'),
+        ('*suffix', '*.exe', 'c:/windows/system32/cmd.exe'),
+        ('*infix*', '*cmd*', 'c:/windows/system32/cmd.exe'),
+        ('pattern', 'c:/*/cmd.???', 'c:/windows/system32/cmd.exe'),
+        ('int', '200', 404),
+        ('float', '1.5', 2.5),
+        ('bool', 'true', True),
+        ('text', 'GET', 'POST'),
+    ]
+    print('{:<10} {:>12} {:>12} {:>8}'.format('kind', 'previous', 'prebuilt', 'speedup'))
+    for kind, value, input_value in cases:
+        matcher = jm.TextMatcher(jm.ValidText(value))
+        assert matcher.eval_one(input_value, context) == original_eval_one(matcher, input_value, context)
+        before = bench(lambda: original_eval_one(matcher, input_value, context))
+        after = bench(lambda: matcher.eval_one(input_value, context))
+        print('{:<10} {:>9.3f} us {:>9.3f} us {:>7.1f}x'.format(kind, before * 1e6, after * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""wildcard field (*.name, *) resolution on documents with many keys
+
+lazy: TermMatcher/exists 가 iter_values 로 찾은 값을 하나씩 평가 (매칭되면 멈춤)
+materialized: MatchContext.get 으로 중첩 list 를 만든 뒤 평가 (이전 방식)
+
+    PYTHONPATH=. python benchmarks/bench_wildcard.py
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+import json_matcher
+from json_matcher import MatchContext
+
+
+def make_doc(n, hit):
+    doc = {}
+    for idx in range(n):
+        target = 'hit' if idx == hit else 'miss{}'.format(idx)
+        doc['key{}'.format(idx)] = {'target': target, 'attrs': {'size': idx, 'tags': ['a', 'b']}}
+    return doc
+
+
+def materialized_match(matcher, doc):
+    context = MatchContext(doc)
+    term = matcher.matcher
+    values = context.get(term.field_path)
+    return term.field_value.eval(values, context)[0]
+
+
+def materialized_exists(name, doc):
+    context = MatchContext(doc)
+    return context._has_value(context.get(name, default=context._contains_dummy_default_object))
+
+
+def bench(fn, number=5):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main():
+    matcher = json_matcher.compile('*.target:hit')
+    all_matcher = json_matcher.compile('*:hit')
+    print('{:<28} {:>14} {:>14} {:>8}'.format('case', 'materialized', 'lazy', 'speedup'))
+    for n in [1000, 10000]:
+        for hit_name, hit in [('first', 0), ('last', n - 1), ('none', -1)]:
+            doc = make_doc(n, hit)
+            cases = [
+                ('*.target {} x {}'.format(hit_name, n),
+                 lambda: materialized_match(matcher, doc), lambda: matcher.match(doc)),
+                ('* {} x {}'.format(hit_name, n),
+                 lambda: materialized_match(all_matcher, doc), lambda: all_matcher.match(doc)),
+            ]
+            if hit_name == 'first':
+                cases.append(('_exists_:*.target x {}'.format(n),
+                              lambda: materialized_exists('*.target', doc),
+                              lambda: MatchContext(doc).exists('*.target')))
+            for name, old, new in cases:
+                assert bool(old()) == bool(new())
+                materialized, lazy = bench(old), bench(new)
+                print('{:<28} {:>11.3f} ms {:>11.3f} ms {:>7.1f}x'.format(
+                    name, materialized * 1000, lazy * 1000, materialized / lazy))
+
+
+if __name__ == '__main__':
+    main()
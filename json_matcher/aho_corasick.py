@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Aho-Corasick automaton for KeywordSet
+
+keyword 를 모두 '(a|b|c|...)' 하나의 정규식으로 만들면 keyword 가 많을 때 compile 이 오래 걸리고,
+검색할 때 위치마다 모든 keyword 를 시도하므로 느려진다. automaton 은 문자열을 한 번만 훑는다.
+
+결과는 정규식과 같다.
+
+    - search: 가장 앞에서 시작하는 keyword. 같은 위치에서 여러 keyword 가 매칭되면 keyword_list 에서 앞에 있는 것
+    - count: keyword 가 시작하는 위치의 수(겹치는 것 포함)와 마지막 위치의 keyword. limit 이 있으면 앞에서 limit 번째 위치까지
+
+pyahocorasick(C 확장) 이 설치되어 있으면 사용하고, 없으면 pure python 구현을 사용한다.
+"""
+from __future__ import print_function, unicode_literals
+
+import heapq
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatch(object):
+    """re.Match 처럼 group(), start(), end() 를 제공한다."""
+    __slots__ = ('keyword', '_start')
+
+    def __init__(self, keyword, start):
+        self.keyword = keyword
+        self._start = start
+
+    def __repr__(self):
+        return 'KeywordMatch(span=({}, {}), match={!r})'.format(self._start, self.end(), self.keyword)
+
+    def group(self):
+        return self.keyword
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._start + len(self.keyword)
+
+
+class KeywordAutomaton(object):
+    def __init__(self, keywords):
+        # 빈 keyword 는 제외하고, 중복된 keyword 는 처음 나온 위치를 사용한다.
+        self.keywords = []
+        seen = set()
+        for keyword in keywords:
+            if keyword and keyword not in seen:
+                seen.add(keyword)
+                self.keywords.append(keyword)
+        self.max_length = max(map(len, self.keywords)) if self.keywords else 0
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def iter_matches(self, value, pos=0):
+        """pos 이후에서 매칭된 (끝 위치(exclusive), keyword index) 를 끝 위치 순서로 반환한다."""
+        raise NotImplementedError
+
+    def search(self, value, pos=0):
+        keywords = self.keywords
+        max_length = self.max_length
+        best_start = best_index = None
+        for end, index in self.iter_matches(value, pos):
+            if best_start is not None and end - max_length > best_start:
+                # 이후에 끝나는 keyword 는 best_start 보다 뒤에서 시작한다.
+                break
+            start = end - len(keywords[index])
+            if best_start is None or start < best_start or (start == best_start and index < best_index):
+                best_start, best_index = start, index
+        if best_start is None:
+            return None
+        return KeywordMatch(keywords[best_index], best_start)
+
+    def count(self, value, limit=None):
+        """limit 개의 위치를 찾으면 멈춘다. (이때 마지막 keyword 는 앞에서 limit 번째 위치의 keyword)"""
+        keywords = self.keywords
+        max_length = self.max_length
+        # 시작 위치 -> 그 위치에서 매칭된 keyword 중 앞에 있는 것
+        starts = {}
+        # 앞에서 limit 번째 시작 위치. 끝 위치 순서로 찾으므로 더 앞에서 시작하는 keyword 가 나중에 나올 수 있다.
+        last_start = None
+        for end, index in self.iter_matches(value):
+            if last_start is not None and end - max_length > last_start:
+                # 이후에 끝나는 keyword 는 last_start 보다 뒤에서 시작한다. (search 와 같음)
+                break
+            start = end - len(keywords[index])
+            if index < starts.get(start, len(keywords)):
+                starts[start] = index
+                if limit is not None and len(starts) >= limit:
+                    last_start = heapq.nsmallest(limit, starts)[-1]
+        if not starts:
+            return 0, ''
+        if last_start is not None:
+            return limit, keywords[starts[last_start]]
+        return len(starts), keywords[starts[max(starts)]]
+
+
+class AhoCorasick(KeywordAutomaton):
+    """pure python Aho-Corasick automaton"""
+    def __init__(self, keywords):
+        super(AhoCorasick, self).__init__(keywords)
+
+        # node 0 은 root. goto[node] 는 문자 -> 다음 node, terminal[node] 는 node 에서 끝나는 keyword index
+        goto = [{}]
+        terminal = [-1]
+        for index, keyword in enumerate(self.keywords):
+            node = 0
+            for ch in keyword:
+                next_node = goto[node].get(ch)
+                if next_node is None:
+                    next_node = goto[node][ch] = len(goto)
+                    goto.append({})
+                    terminal.append(-1)
+                node = next_node
+            terminal[node] = index
+
+        # fail: 실패했을 때 이동할 node (가장 긴 suffix), output: suffix 중 keyword 가 끝나는 가장 가까운 node (없으면 0)
+        fail = [0] * len(goto)
+        output = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                if node:
+                    fail[child] = goto[f].get(ch, 0)
+                output[child] = fail[child] if terminal[fail[child]] >= 0 else output[fail[child]]
+                queue.append(child)
+
+        self.goto = goto
+        self.fail = fail
+        self.terminal = terminal
+        self.output = output
+
+    def iter_matches(self, value, pos=0):
+        goto, fail, terminal, output = self.goto, self.fail, self.terminal, self.output
+        node = 0
+        # 문자열을 자르지 않는다.
+        for pos in range(pos, len(value)):
+            ch = value[pos]
+            while True:
+                next_node = goto[node].get(ch)
+                if next_node is not None:
+                    node = next_node
+                    break
+                if not node:
+                    break
+                node = fail[node]
+
+            m = node if terminal[node] >= 0 else output[node]
+            while m:
+                yield pos + 1, terminal[m]
+                m = output[m]
+
+
+class CAhoCorasick(KeywordAutomaton):
+    """pyahocorasick 을 사용하는 automaton"""
+    def __init__(self, keywords):
+        super(CAhoCorasick, self).__init__(keywords)
+        self.automaton = ahocorasick.Automaton()
+        for index, keyword in enumerate(self.keywords):
+            self.automaton.add_word(keyword, index)
+        self.automaton.make_automaton()
+
+    def iter_matches(self, value, pos=0):
+        for end, index in self.automaton.iter(value, pos):
+            yield end + 1, index
+
+
+def build_automaton(keywords):
+    if ahocorasick is not None:
+        return CAhoCorasick(keywords)
+    return AhoCorasick(keywords)
+
+
+__all__ = ['AhoCorasick', 'CAhoCorasick', 'KeywordMatch', 'build_automaton']
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compiled rule bundle
+
+여러 rule(query) 을 compile 한 결과를 파일로 저장하고, query parser 를 거치지 않고 다시 읽는다.
+
+    >>> rules = {'rule1': 'foo:bar', 'rule2': 'size:>10'}
+    >>> bundle = load_or_build_bundle('/tmp/rules.bundle', rules)
+    >>> bundle['rule1'].match(dict(foo='bar'))
+
+bundle 에는 rule 원문에 대한 hash 가 저장되어 있어서, rule 이 바뀌면 load_or_build_bundle 이 다시 만든다.
+bundle 은 pickle 을 사용하므로 신뢰할 수 있는 파일만 읽어야 한다.
+"""
+from __future__ import print_function, unicode_literals
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from . import json_matcher as matcher_module
+from .json_matcher import JsonMatcher, JsonMatcherBaseException, get_match_ops
+
+# matcher class 구조가 바뀌면 올린다. (이전 bundle 은 stale 로 취급되어 다시 만들어진다)
+BUNDLE_VERSION = 4
+BUNDLE_MAGIC = b'JSON_MATCHER_BUNDLE\n'
+
+
+class StaleBundleException(JsonMatcherBaseException):
+    def __init__(self, path, reason):
+        self.path = path
+        self.reason = reason
+
+    def __str__(self):
+        return '{}: {}'.format(self.path, self.reason)
+
+    def __repr__(self):
+        return 'StaleBundleException({!r}, {!r})'.format(self.path, self.reason)
+
+
+class RuleBundle(object):
+    def __init__(self, matchers, source_hash):
+        self.matchers = matchers
+        self.source_hash = source_hash
+
+    def __repr__(self):
+        return 'RuleBundle({} rules, {})'.format(len(self.matchers), self.source_hash[:12])
+
+    def __getitem__(self, rule_id):
+        return self.matchers[rule_id]
+
+    def __contains__(self, rule_id):
+        return rule_id in self.matchers
+
+    def __iter__(self):
+        return iter(self.matchers)
+
+    def __len__(self):
+        return len(self.matchers)
+
+    def items(self):
+        return self.matchers.items()
+
+
+def get_rules_hash(rules, flags=0, optimize=False, parser=None):
+    """rule 원문과 compile 옵션에 대한 hash"""
+    implicit_bin_op, term_match_op = get_match_ops(flags)
+    source = {
+        'version': BUNDLE_VERSION,
+        'optimize': optimize,
+        'parser': parser or matcher_module.default_parser,
+        'implicit_bin_op': implicit_bin_op,
+        'term_match_op': term_match_op,
+        # rule_id 는 type 까지 구분한다. (1 과 '1')
+        'rules': sorted([type(rule_id).__name__, str(rule_id), query] for rule_id, query in rules.items()),
+    }
+    encoded = json.dumps(source, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def build_bundle(rules, flags=0, parser=None, optimize=False):
+    """rules(rule_id -> query) 를 compile 해서 RuleBundle 을 만든다."""
+    implicit_bin_op, term_match_op = get_match_ops(flags)
+    parser = parser or matcher_module.default_parser
+
+    # compile() 의 cache 를 rule 들로 채우지 않도록 직접 만든다.
+    matchers = dict((rule_id, JsonMatcher(query.strip(), implicit_bin_op, term_match_op, parser, optimize))
+                    for rule_id, query in rules.items())
+    return RuleBundle(matchers, get_rules_hash(rules, flags, optimize, parser))
+
+
+def save_bundle(bundle, path):
+    """bundle 을 path 에 저장한다. 읽는 쪽이 쓰다 만 파일을 보지 않도록 임시 파일에 쓰고 rename 한다."""
+    header = {'version': BUNDLE_VERSION, 'source_hash': bundle.source_hash, 'size': len(bundle)}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.bundle-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(BUNDLE_MAGIC)
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(bundle.matchers, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_bundle(path, source_hash=None):
+    """path 의 bundle 을 읽는다.
+
+    source_hash 가 주어지면 bundle 의 hash 와 비교해서 다르면 StaleBundleException 을 발생시킨다.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+            raise StaleBundleException(path, 'not a bundle file')
+        try:
+            header = pickle.load(f)
+        except Exception as e:
+            raise StaleBundleException(path, 'broken header: {!r}'.format(e))
+        if header.get('version') != BUNDLE_VERSION:
+            raise StaleBundleException(path, 'bundle version {} != {}'.format(header.get('version'), BUNDLE_VERSION))
+        if source_hash is not None and header.get('source_hash') != source_hash:
+            raise StaleBundleException(path, 'rules changed')
+        try:
+            matchers = pickle.load(f)
+        except Exception as e:
+            raise StaleBundleException(path, 'broken body: {!r}'.format(e))
+    return RuleBundle(matchers, header['source_hash'])
+
+
+def load_or_build_bundle(path, rules, flags=0, parser=None, optimize=False):
+    """path 의 bundle 이 rules 와 같으면 읽고, 없거나 stale 하면 새로 만들어 저장한다."""
+    source_hash = get_rules_hash(rules, flags, optimize, parser)
+    try:
+        return load_bundle(path, source_hash)
+    except (IOError, OSError, StaleBundleException):
+        pass
+
+    bundle = build_bundle(rules, flags, parser, optimize)
+    save_bundle(bundle, path)
+    return bundle
+
+
+__all__ = ['RuleBundle', 'StaleBundleException', 'BUNDLE_VERSION',
+           'get_rules_hash', 'build_bundle', 'save_bundle', 'load_bundle', 'load_or_build_bundle']
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+
+import collections
+import threading
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """thread-safe, size-bounded LRU cache
+
+    maxsize 가 0 이면 캐시하지 않고, None 이면 크기 제한 없이 캐시한다.
+    """
+
+    def __init__(self, maxsize=128):
+        self._lock = threading.RLock()
+        self._data = collections.OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if self._maxsize == 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_create(self, key, factory):
+        """key 에 해당하는 값을 반환하고, 없으면 factory() 로 만들어 저장한다.
+
+        factory 는 lock 밖에서 호출되므로 같은 key 가 동시에 만들어질 수 있으나, 먼저 저장된 값을 사용한다.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = factory()
+
+        with self._lock:
+            if self._maxsize == 0:
+                return value
+            if key in self._data:
+                return self._data[key]
+            self._data[key] = value
+            self._evict()
+        return value
+
+    def _evict(self):
+        if self._maxsize is None:
+            return
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be >= 0 or None: {}'.format(maxsize))
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self, reset_stats=True):
+        with self._lock:
+            self._data.clear()
+            if reset_stats:
+                self.hits = 0
+                self.misses = 0
+                self.evictions = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self._maxsize, len(self._data))
+
+
+__all__ = ['LRUCache', 'CacheInfo']
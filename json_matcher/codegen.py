@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""code generation engine
+
+compile 된 matcher tree 를 하나의 python 함수로 만든다. (compile(..., engine='codegen'))
+
+    >>> matcher = json_matcher.compile('a.b:x AND c:>10', engine='codegen')
+    >>> print(matcher.program.source)
+
+tree 를 따라 eval 을 호출하는 대신 AND/OR/NOT 의 short-circuit, field 접근, 상수 비교를 함수 안에 풀어 쓴다.
+자주 쓰이는 경우(문자열/숫자 입력에 대한 text, regexp, operator, range)만 직접 만들고,
+나머지(list/dict 입력, keyword set, COUNT, code 등)는 해당 matcher 의 eval 을 호출하므로 결과는 interpreter 와 같다.
+"""
+from __future__ import print_function, unicode_literals
+
+import re
+
+from .json_matcher import (TERM_MATCH_OP_CONTAIN, NOT_RESULT, WILDCARD_PREFIX, WILDCARD_SUFFIX, WILDCARD_INFIX,
+                           TextMatcher, RegexpMatcher, Operator, RangeMatcher,
+                           TermMatcher, ExistsMatcher,
+                           NotMatcher, OrMatcher, AndMatcher, FlatOrMatcher, FlatAndMatcher,
+                           append_ordered_results)
+from .match_environ import KEYWORD_SET_PREFIX
+
+# dict 를 따라가기만 하면 되는 단순한 field name (a, a.b.c)
+SIMPLE_FIELD_NAME_RE = re.compile(r'^[A-Za-z_@][A-Za-z0-9_@]*(?:\.[A-Za-z_@][A-Za-z0-9_@]*)*$')
+
+# python 은 indent 가 100 단계를 넘으면 compile 할 수 없다. 더 깊은 tree 는 matcher 의 eval 을 호출한다.
+MAX_INDENT = 60
+
+COMPARE_OPS = {'<=': '<=', '<': '<', '>=': '>=', '>': '>', '=': '=='}
+
+_MISSING = object()
+
+
+class CodeGenerator(object):
+    def __init__(self):
+        self.lines = []
+        self.namespace = {
+            '_MISSING': _MISSING,
+            '_EMPTY': {},
+            '_NOT_RESULT': NOT_RESULT,
+            '_append_ordered_results': append_ordered_results,
+        }
+        self.var_count = 0
+
+    def constant(self, value):
+        name = '_k{}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def new_var(self, prefix):
+        self.var_count += 1
+        return '{}{}'.format(prefix, self.var_count)
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def generate(self, matcher):
+        self.emit(1, 'result = context.get_result()')
+        self.emit(1, 'j = context.j')
+        self.emit(1, 'jd = j if type(j) is dict else _EMPTY')
+        self.emit(1, 'get = context.get')
+        self.emit_node(matcher, 1)
+        self.emit(1, 'return m')
+        return '\n'.join(['def _match(context):'] + self.lines) + '\n'
+
+    #
+    # boolean nodes: 평가 결과를 m 에 저장한다.
+    #
+    def emit_node(self, node, indent):
+        if indent > MAX_INDENT:
+            self.emit_delegate(node, indent)
+        elif isinstance(node, (AndMatcher, FlatAndMatcher)):
+            self.emit_and(node, indent)
+        elif isinstance(node, (OrMatcher, FlatOrMatcher)):
+            self.emit_or(node, indent)
+        elif isinstance(node, NotMatcher):
+            self.emit_not(node, indent)
+        elif isinstance(node, TermMatcher) and not node.field_path.has_wildcard:
+            self.emit_term(node, indent)
+        elif isinstance(node, ExistsMatcher):
+            self.emit(indent, 'm = context.exists({})'.format(self.constant(node.field_path)))
+        else:
+            self.emit_delegate(node, indent)
+
+    def emit_delegate(self, node, indent):
+        self.emit(indent, 'm = {}.eval(context)[0]'.format(self.constant(node)))
+
+    def emit_and(self, node, indent):
+        if isinstance(node, FlatAndMatcher):
+            operands = [node.matchers[idx] for idx in node.order]
+            if node.reordered and node.ordered_result:
+                return self.emit_reordered_and(node, indent)
+        else:
+            operands = flatten_binary(node, AndMatcher)
+
+        self.emit_node(operands[0], indent)
+        for operand in operands[1:]:
+            self.emit(indent, 'if m:')
+            self.emit_node(operand, indent + 1)
+
+    def emit_reordered_and(self, node, indent):
+        # FlatAndMatcher.eval 과 같이 결과를 따로 모았다가 작성된 순서로 붙인다.
+        size = self.new_var('s')
+        chunks = self.new_var('c')
+        self.emit(indent, '{} = len(result)'.format(size))
+        self.emit(indent, '{} = [None] * {}'.format(chunks, len(node.matchers)))
+        self.emit(indent, 'm = True')
+        for idx in node.order:
+            self.emit(indent, 'if m:')
+            self.emit_node(node.matchers[idx], indent + 1)
+            self.emit(indent + 1, '{}[{}] = result[{}:]'.format(chunks, idx, size))
+            self.emit(indent + 1, 'del result[{}:]'.format(size))
+        self.emit(indent, 'if m:')
+        self.emit(indent + 1, '_append_ordered_results(result, {})'.format(chunks))
+
+    def emit_or(self, node, indent):
+        if isinstance(node, FlatOrMatcher):
+            operands = [node.matchers[idx] for idx in node.order]
+        else:
+            operands = flatten_binary(node, OrMatcher)
+
+        self.emit_node(operands[0], indent)
+        for operand in operands[1:]:
+            self.emit(indent, 'if not m:')
+            self.emit_node(operand, indent + 1)
+
+    def emit_not(self, node, indent):
+        self.emit_node(node.term, indent)
+        self.emit(indent, 'if m:')
+        self.emit(indent + 1, 'm = False')
+        self.emit(indent, 'else:')
+        self.emit(indent + 1, 'if not result:')
+        self.emit(indent + 2, 'result.append(_NOT_RESULT)')
+        self.emit(indent + 1, 'm = True')
+
+    #
+    # term
+    #
+    def emit_term(self, node, indent):
+        field_name = self.constant(node.field_name)
+        self.emit_field(node.field_name, self.constant(node.field_path), indent)
+        self.emit(indent, 'if v is None:')
+        self.emit(indent + 1, 'm = False')
+        self.emit(indent, 'else:')
+        self.emit_value(node.field_value, indent + 1)
+        self.emit(indent + 1, 'if m:')
+        self.emit(indent + 2, 'result.append(({}, v, mv))'.format(field_name))
+
+    def emit_field(self, name, field_path, indent):
+        """context.get(name) 을 v 에 저장한다. dict 를 따라가는 경우만 직접 접근하고 나머지는 context.get 을 사용"""
+        if not SIMPLE_FIELD_NAME_RE.match(name):
+            self.emit(indent, 'v = get({})'.format(field_path))
+            return
+
+        keys = name.split('.')
+        self.emit(indent, 'v = jd.get({}, _MISSING)'.format(self.constant(keys[0])))
+        for key in keys[1:]:
+            self.emit(indent, 'v = v.get({}, _MISSING) if type(v) is dict else _MISSING'.format(self.constant(key)))
+        # 없는 경우 list 안의 dict 등을 context.get 에서 처리한다.
+        self.emit(indent, 'if v is _MISSING:')
+        self.emit(indent + 1, 'v = get({})'.format(field_path))
+
+    def emit_value(self, matcher, indent):
+        """field value matcher 의 (matched, matched_value) 를 m, mv 에 저장한다."""
+        branches = self.get_fast_paths(matcher)
+        keyword = 'if'
+        for type_check, lines in branches:
+            self.emit(indent, '{} {}:'.format(keyword, type_check))
+            for line in lines:
+                self.emit(indent + 1, line)
+            keyword = 'elif'
+        if branches:
+            self.emit(indent, 'else:')
+            indent += 1
+        self.emit(indent, 'm, mv = {}.eval(v, context)'.format(self.constant(matcher)))
+
+    def get_fast_paths(self, matcher):
+        """입력 type 별로 직접 만드는 코드의 목록 [(type 조건, 코드)]. 나머지는 matcher.eval 을 호출한다."""
+        is_str = 'type(v) is str'
+        is_number = 'type(v) is int or type(v) is float'
+
+        if isinstance(matcher, TextMatcher):
+            if KEYWORD_SET_PREFIX in matcher.value:
+                return []
+            value = self.constant(matcher.value)
+            if matcher.wildcard is not None:
+                return [(is_str, [self.get_wildcard_code(matcher.wildcard), 'mv = v'])]
+            elif matcher.term_match_op == TERM_MATCH_OP_CONTAIN:
+                return [(is_str, ['m = {} in v'.format(value), 'mv = {}'.format(value)])]
+            return [(is_str, ['m = v == {}'.format(value), 'mv = {}'.format(value)])]
+
+        elif isinstance(matcher, RegexpMatcher):
+            if KEYWORD_SET_PREFIX in matcher.value:
+                return []
+            search = self.constant(matcher.pattern.search)
+            return [(is_str, ['mo = {}(v)'.format(search), 'm = mo is not None', 'mv = mo.group() if m else None'])]
+
+        elif isinstance(matcher, Operator):
+            op = COMPARE_OPS.get(matcher.op, '==')
+            if matcher.is_float:
+                number = ['m = v {} {}'.format(op, self.constant(matcher.float_value)), 'mv = v']
+            else:
+                # 숫자 입력과 문자열 값은 매칭되지 않는다.
+                number = ['m = False', 'mv = None']
+            return [(is_number, number),
+                    (is_str, ['m = v {} {}'.format(op, self.constant(matcher.value)), 'mv = v'])]
+
+        elif isinstance(matcher, RangeMatcher):
+            start, stop = self.constant(matcher.start), self.constant(matcher.stop)
+            op = '<=' if matcher.incl else '<'
+            if matcher.is_float:
+                return [(is_number, ['mv = float(v)', 'm = {} {} mv {} {}'.format(start, op, op, stop)])]
+            return [(is_str, ['m = {} {} v {} {}'.format(start, op, op, stop), 'mv = v'])]
+
+        return []
+
+    def get_wildcard_code(self, wildcard):
+        kind, operand = wildcard
+        if kind == WILDCARD_PREFIX:
+            return 'm = v.startswith({})'.format(self.constant(operand))
+        elif kind == WILDCARD_SUFFIX:
+            return 'm = v.endswith({})'.format(self.constant(operand))
+        elif kind == WILDCARD_INFIX:
+            return 'm = {} in v'.format(self.constant(operand))
+        return 'm = {}(v) is not None'.format(self.constant(operand.match))
+
+
+def flatten_binary(node, class_object):
+    """binary AND/OR 연쇄를 작성된 순서의 목록으로 펼친다."""
+    operands = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, class_object):
+            stack.append(n.right)
+            stack.append(n.left)
+        else:
+            operands.append(n)
+    return operands
+
+
+def generate_source(matcher):
+    """(source, namespace)"""
+    generator = CodeGenerator()
+    source = generator.generate(matcher)
+    return source, generator.namespace
+
+
+def compile_matcher(matcher):
+    """matcher tree 를 context -> matched 함수로 만든다. 함수의 source 속성에 생성된 코드가 있다."""
+    source, namespace = generate_source(matcher)
+    code = compile(source, '<json_matcher codegen>', 'exec')
+    exec(code, namespace)
+    program = namespace['_match']
+    program.source = source
+    return program
+
+
+__all__ = ['generate_source', 'compile_matcher']
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""columnar batch matching (JsonMatcher.match_columns)
+
+field name -> 값 배열(column) 로 펼친 record 들을 한 번에 평가해서 행마다 매칭 여부(bool ndarray)를 반환한다.
+행 i 의 문서는 {field name: column[i]} (a.b 는 중첩 dict) 이고 결과는 행마다 match 한 것과 같다.
+
+    >>> matcher = json_matcher.compile('status:200 AND latency:>500 AND method:(GET HEAD)')
+    >>> matcher.match_columns({'status': statuses, 'latency': latencies, 'method': methods})
+    array([ True, False, ...])
+
+    - 숫자 column(int/float)의 operator/range, 숫자/문자열 column 의 text(IN 포함) term 은 NumPy 연산으로 평가한다.
+    - AND/OR/NOT 은 mask 연산이고, 오른쪽은 아직 결정되지 않은 행(AND 는 왼쪽이 매칭된 행, OR 는 매칭되지 않은 행)만 평가한다.
+    - 나머지(정규식, keyword set, COUNT, code, _expr_, _exists_, object column 등)는 그 행들만 문서를 만들어 eval 한다.
+
+NumPy 는 설치되어 있을 때만 사용한다. 없으면 행마다 평가한 bool list 를 반환한다.
+"""
+from __future__ import print_function, unicode_literals
+
+import operator
+
+from six import string_types
+
+from .field_path import parse_path
+from .json_matcher import (TERM_MATCH_OP_CONTAIN, WILDCARD_PREFIX, WILDCARD_SUFFIX, WILDCARD_INFIX,
+                           TextMatcher, MultipleTextMatcher, Operator, RangeMatcher,
+                           TermMatcher, NotMatcher, OrMatcher, AndMatcher, FlatOrMatcher, FlatAndMatcher)
+from .match_environ import MatchContext
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# python 은 int 와 float 를 정확히 비교하지만 NumPy 는 float64 로 바꿔서 비교한다. 이 범위를 넘는 정수는 행마다 평가한다.
+MAX_EXACT_INT = 2 ** 53
+
+COMPARE_OPS = {'<=': operator.le, '<': operator.lt, '>=': operator.ge, '>': operator.gt}
+
+
+def to_column(values):
+    """array-like 를 1차원 ndarray 로. list 는 원소의 type 이 모두 int, float, str 중 하나일 때만 그 dtype 으로 바꾼다.
+
+    (NumPy 는 [1, 2.5], [True, 2] 등을 하나의 숫자 dtype 으로 바꾸므로 행마다 평가한 결과가 달라진다)
+    """
+    if isinstance(values, numpy.ndarray) or hasattr(values, '__array__'):
+        column = numpy.asarray(values)
+        if column.ndim == 1:
+            return column
+    values = list(values)
+    types = set(map(type, values))
+    if len(types) == 1 and types.pop() in (int, float) + string_types:
+        try:
+            return numpy.asarray(values)
+        except OverflowError:
+            pass
+    column = numpy.empty(len(values), dtype=object)
+    for idx, value in enumerate(values):
+        column[idx] = value
+    return column
+
+
+def build_document(names, values):
+    """행 하나의 문서. a.b 는 {'a': {'b': ...}}"""
+    document = {}
+    for name, value in zip(names, values):
+        keys = parse_path(name)
+        parent = document
+        for key in keys[:-1]:
+            parent = parent.setdefault(key, {})
+            if not isinstance(parent, dict):
+                raise ValueError('Conflicting column: {}'.format(name))
+        if keys[-1] in parent:
+            raise ValueError('Conflicting column: {}'.format(name))
+        parent[keys[-1]] = value
+    return document
+
+
+def is_exact_int_column(values):
+    return not len(values) or (-MAX_EXACT_INT <= values.min() and values.max() <= MAX_EXACT_INT)
+
+
+def eval_text(matcher, values):
+    """TextMatcher.eval_one 과 같은 mask. NumPy 로 평가할 수 없으면 None"""
+    kind = values.dtype.kind
+    if kind == 'U':
+        if matcher.keyword_set_names:
+            return None
+        if matcher.wildcard is not None:
+            wildcard_kind, operand = matcher.wildcard
+            if wildcard_kind == WILDCARD_PREFIX:
+                return numpy.char.startswith(values, operand)
+            elif wildcard_kind == WILDCARD_SUFFIX:
+                return numpy.char.endswith(values, operand)
+            elif wildcard_kind == WILDCARD_INFIX:
+                return numpy.char.find(values, operand) >= 0
+            return None
+        if matcher.term_match_op == TERM_MATCH_OP_CONTAIN:
+            return numpy.char.find(values, matcher.value) >= 0
+        return values == matcher.value
+
+    if kind not in 'iuf' or matcher.quoted:
+        return None
+    if kind == 'f' and numpy.isinf(values).any():
+        # int(inf) 는 OverflowError 이다.
+        return None
+    if matcher.int_value is not None:
+        if kind == 'f':
+            # int(nan) 은 아래의 float 비교가 되고 결과는 같다. (False)
+            if abs(matcher.int_value) > MAX_EXACT_INT:
+                return None
+            return numpy.trunc(values) == matcher.int_value
+        info = numpy.iinfo(values.dtype)
+        if not info.min <= matcher.int_value <= info.max:
+            return numpy.zeros(len(values), dtype=bool)
+        return values == matcher.int_value
+    if matcher.abs_float_value is not None:
+        return (matcher.abs_float_value - numpy.abs(values.astype(numpy.float64))) < 1e-09
+    # 숫자로 해석할 수 없는 text 는 str(숫자) 와 같을 수 없다.
+    if matcher.keyword_set_names or matcher.wildcard is not None or matcher.term_match_op == TERM_MATCH_OP_CONTAIN:
+        return None
+    return numpy.zeros(len(values), dtype=bool)
+
+
+def eval_multiple_text(matcher, values):
+    """field:(a b c). text matcher 들의 mask 의 OR"""
+    if not all(isinstance(m, TextMatcher) for m in matcher.matchers):
+        return None
+    if values.dtype.kind == 'U' and all(not m.keyword_set_names and m.wildcard is None and
+                                        m.term_match_op != TERM_MATCH_OP_CONTAIN for m in matcher.matchers):
+        return numpy.isin(values, [m.value for m in matcher.matchers])
+    mask = numpy.zeros(len(values), dtype=bool)
+    for m in matcher.matchers:
+        matched = eval_text(m, values)
+        if matched is None:
+            return None
+        mask |= matched
+    return mask
+
+
+def eval_operator(matcher, values):
+    kind = values.dtype.kind
+    compare = COMPARE_OPS.get(matcher.op, operator.eq)
+    if kind == 'U':
+        return compare(values, matcher.value)
+    if kind not in 'iuf':
+        return None
+    if not matcher.is_float:
+        return numpy.zeros(len(values), dtype=bool)
+    if kind in 'iu' and not is_exact_int_column(values):
+        return None
+    return compare(values, matcher.float_value)
+
+
+def eval_range(matcher, values):
+    kind = values.dtype.kind
+    if matcher.is_float:
+        if kind not in 'iuf':
+            return None
+        # RangeMatcher 는 float(input) 으로 바꿔서 비교한다.
+        values = values.astype(numpy.float64)
+    elif kind != 'U':
+        return None
+    if matcher.incl:
+        return (matcher.start <= values) & (values <= matcher.stop)
+    return (matcher.start < values) & (values < matcher.stop)
+
+
+VALUE_EVALUATORS = [
+    (TextMatcher, eval_text),
+    (MultipleTextMatcher, eval_multiple_text),
+    (Operator, eval_operator),
+    (RangeMatcher, eval_range),
+]
+
+
+def eval_values(matcher, values):
+    for matcher_class, evaluator in VALUE_EVALUATORS:
+        if isinstance(matcher, matcher_class):
+            return evaluator(matcher, values)
+    return None
+
+
+class ColumnEvaluator(object):
+    """matcher tree 를 행 번호 목록(rows) 에 대해 평가한다. eval 은 rows 와 길이가 같은 bool ndarray"""
+    def __init__(self, columns, environ=None):
+        self.names = list(columns)
+        self.columns = dict((name, to_column(values)) for name, values in columns.items())
+        sizes = set(len(column) for column in self.columns.values())
+        if len(sizes) > 1:
+            raise ValueError('Columns have different lengths: {}'.format(sorted(sizes)))
+        self.size = sizes.pop() if sizes else 0
+        self.top_level_names = set(parse_path(name)[0] for name in self.names)
+        self.environ = environ
+        # 행마다 평가할 때 만든 문서. (행 번호 -> 문서)
+        self.documents = {}
+
+    def get_documents(self, rows):
+        missing = [row for row in rows.tolist() if row not in self.documents]
+        if missing:
+            values = [self.columns[name][missing].tolist() for name in self.names]
+            for idx, row in enumerate(missing):
+                self.documents[row] = build_document(self.names, [column[idx] for column in values])
+        return [self.documents[row] for row in rows.tolist()]
+
+    def eval_rows(self, matcher, rows):
+        """NumPy 로 평가할 수 없는 matcher 를 rows 의 문서마다 평가한다."""
+        mask = numpy.zeros(len(rows), dtype=bool)
+        for idx, document in enumerate(self.get_documents(rows)):
+            matched, matched_value = matcher.eval(MatchContext(document, self.environ))
+            mask[idx] = bool(matched)
+        return mask
+
+    def eval(self, matcher, rows):
+        if not len(rows):
+            return numpy.zeros(0, dtype=bool)
+        if isinstance(matcher, TermMatcher):
+            return self.eval_term(matcher, rows)
+        elif isinstance(matcher, NotMatcher):
+            return ~self.eval(matcher.term, rows)
+        elif isinstance(matcher, AndMatcher):
+            return self.eval_and([matcher.left, matcher.right], rows)
+        elif isinstance(matcher, OrMatcher):
+            return self.eval_or([matcher.left, matcher.right], rows)
+        elif isinstance(matcher, FlatAndMatcher):
+            return self.eval_and([matcher.matchers[idx] for idx in matcher.order], rows)
+        elif isinstance(matcher, FlatOrMatcher):
+            return self.eval_or([matcher.matchers[idx] for idx in matcher.order], rows)
+        return self.eval_rows(matcher, rows)
+
+    def eval_and(self, matchers, rows):
+        mask = numpy.ones(len(rows), dtype=bool)
+        for matcher in matchers:
+            undecided = numpy.flatnonzero(mask)
+            if not len(undecided):
+                break
+            mask[undecided] = self.eval(matcher, rows[undecided])
+        return mask
+
+    def eval_or(self, matchers, rows):
+        mask = numpy.zeros(len(rows), dtype=bool)
+        for matcher in matchers:
+            undecided = numpy.flatnonzero(~mask)
+            if not len(undecided):
+                break
+            mask[undecided] = self.eval(matcher, rows[undecided])
+        return mask
+
+    def eval_term(self, term, rows):
+        if term.field_path.has_wildcard:
+            return self.eval_rows(term, rows)
+        column = self.columns.get(term.field_name)
+        if column is None:
+            if parse_path(term.field_name)[0] not in self.top_level_names:
+                # 없는 field 는 매칭되지 않는다.
+                return numpy.zeros(len(rows), dtype=bool)
+            return self.eval_rows(term, rows)
+        mask = eval_values(term.field_value, column[rows])
+        if mask is None:
+            return self.eval_rows(term, rows)
+        return mask
+
+
+def match_columns(matcher, columns, environ=None):
+    """matcher(matcher tree) 로 columns 의 행마다 평가한 bool ndarray. NumPy 가 없으면 bool list"""
+    if numpy is None:
+        names = list(columns)
+        sizes = set(len(values) for values in columns.values())
+        if len(sizes) > 1:
+            raise ValueError('Columns have different lengths: {}'.format(sorted(sizes)))
+        return [bool(matcher.eval(MatchContext(build_document(names, row), environ))[0])
+                for row in zip(*[columns[name] for name in names])]
+    evaluator = ColumnEvaluator(columns, environ)
+    return evaluator.eval(matcher, numpy.arange(evaluator.size))
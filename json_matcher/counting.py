@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""counting engine for COUNT(...)
+
+pattern.search(value[start:]) 처럼 남은 문자열을 잘라서 다시 검색하면 매칭될 때마다 복사하므로 긴 문자열에서 O(n^2) 이다.
+search(value, pos) 로 위치만 옮겨가며 검색한다.
+
+    - COUNT_OVERLAPPING: 매칭된 위치의 다음 문자부터 다시 검색한다. (겹치는 것 포함, 정규식/keyword set 의 기본)
+    - COUNT_NON_OVERLAPPING: 매칭된 끝에서부터 다시 검색한다. (str.count 와 같음, text 의 기본)
+
+limit 를 주면 개수가 limit 에 도달했을 때 멈춘다. (CountingMatcher 의 조건이 이미 결정된 경우)
+"""
+from __future__ import print_function, unicode_literals
+
+COUNT_OVERLAPPING = 'overlapping'
+COUNT_NON_OVERLAPPING = 'non_overlapping'
+COUNT_MODES = [COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING]
+
+
+def count_matches(search, value, mode=COUNT_OVERLAPPING, limit=None):
+    """search(value, pos) 가 pos 이후에서 가장 앞의 매칭(start(), end(), group()) 을 반환할 때 (개수, 마지막 매칭)"""
+    overlapping = mode == COUNT_OVERLAPPING
+    length = len(value)
+    count = 0
+    last_matched = ''
+    pos = 0
+    while pos <= length:
+        m = search(value, pos)
+        if not m:
+            break
+        count += 1
+        last_matched = m.group()
+        if limit is not None and count >= limit:
+            break
+        start = m.start()
+        if overlapping:
+            pos = start + 1
+        else:
+            # 빈 문자열이 매칭되면 다음 문자로 넘어간다.
+            end = m.end()
+            pos = end if end > start else end + 1
+    return count, last_matched
+
+
+def count_text(text, value, mode=COUNT_NON_OVERLAPPING, limit=None):
+    """value 에 text 가 나오는 횟수"""
+    if mode == COUNT_NON_OVERLAPPING:
+        # C 로 한 번 훑으므로 limit 에서 멈추지 않아도 된다.
+        return value.count(text)
+
+    length = len(value)
+    count = 0
+    pos = value.find(text)
+    while pos >= 0:
+        count += 1
+        if (limit is not None and count >= limit) or pos >= length:
+            break
+        pos = value.find(text, pos + 1)
+    return count
+
+
+def get_count_limit(op, condition_value):
+    """COUNT(...) op condition_value 의 결과가 결정되는 개수. 끝까지 세어야 하면 None
+
+        >c, <=c, =c: c + 1 개이면 각각 True, False, False
+        >=c, <c: c 개이면 각각 True, False
+    """
+    limit = condition_value if op in ['>=', '<'] else condition_value + 1
+    if limit <= 0:
+        return None
+    return limit
+
+
+__all__ = ['COUNT_OVERLAPPING', 'COUNT_NON_OVERLAPPING']
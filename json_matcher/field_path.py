@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""precompiled field path accessor
+
+field name(a.b.c, a[0].b, *.name, *) 을 미리 해석해 두고 문서에서 값을 꺼낸다.
+MatchContext.get 이 pydash.has/get 으로 매번 path 를 해석하던 것을 대신하며 결과는 같다.
+
+    - path 해석과 key 접근은 pydash 와 같다. (a.0 은 dict 의 '0' 또는 0 key, list 의 0 번째)
+    - 없는 path 는 존재하는 가장 긴 앞부분을 찾아, 그 값이 dict 의 list 면 각 dict 에서 나머지를 찾는다.
+    - *.name 은 모든 하위 dict 에서 name 을 찾고, * 는 모든 값의 목록이다.
+
+* 가 들어간 path 는 get 이 이전과 같은 중첩 list 를 만들지만, iter_values 로 찾은 값을 하나씩 받을 수 있다.
+(TermMatcher, exists 는 iter_values 를 사용해서 매칭되면 문서의 나머지를 훑지 않는다)
+"""
+from __future__ import print_function, unicode_literals
+
+import re
+from collections.abc import Mapping, Sequence
+
+from .cache import LRUCache
+
+# pydash.utilities.RE_PATH_KEY_DELIM, RE_PATH_LIST_INDEX
+PATH_KEY_DELIM_RE = re.compile(r'(?<!\\)(?:\\\\)*\.|(\[-?\d+\])')
+PATH_LIST_INDEX_RE = re.compile(r'\[-?\d+\]')
+
+WILDCARD = '*'
+WILDCARD_PREFIX = '*.'
+
+MISSING = object()
+
+
+def _list_index(key):
+    if key is not None and PATH_LIST_INDEX_RE.match(key):
+        return int(key[1:-1])
+    return None
+
+
+def parse_path(field_name):
+    """field name 을 key 목록으로 바꾼다. (pydash.to_path 와 같음)"""
+    if '.' not in field_name and '[' not in field_name:
+        return [field_name]
+
+    parts = PATH_KEY_DELIM_RE.split(field_name)
+    keys = []
+    for idx, part in enumerate(parts):
+        if part is None:
+            continue
+        if part == '':
+            prev_part = parts[idx - 1] if idx else None
+            next_part = parts[idx + 1] if idx + 1 < len(parts) else None
+            if prev_part is not None and next_part is not None:
+                continue
+            if _list_index(prev_part) is not None or _list_index(next_part) is not None:
+                continue
+        keys.append(part)
+
+    path = []
+    for key in keys:
+        index = _list_index(key)
+        if index is not None:
+            path.append(index)
+        else:
+            path.append(key.replace('\\\\', '\\').replace('\\.', '.'))
+    return path
+
+
+def _get_item(obj, key):
+    try:
+        return obj[key]
+    except Exception:
+        pass
+    if not isinstance(key, int):
+        try:
+            return obj[int(key)]
+        except Exception:
+            pass
+    return MISSING
+
+
+def get_key(obj, key):
+    """obj 의 key 값. 없으면 MISSING (pydash.helpers.base_get 과 같음)"""
+    if isinstance(obj, dict):
+        value = obj.get(key, MISSING)
+        if value is MISSING and not isinstance(key, int):
+            try:
+                value = obj.get(int(key), MISSING)
+            except Exception:
+                pass
+        return value
+
+    if isinstance(obj, (Mapping, Sequence)) and not (isinstance(obj, tuple) and hasattr(obj, '_fields')):
+        return _get_item(obj, key)
+
+    value = _get_item(obj, key)
+    if value is MISSING:
+        # __class__ 같은 key 로 객체 내부에 접근하지 않는다.
+        if isinstance(key, str) and key.startswith('__') and key.endswith('__'):
+            return MISSING
+        try:
+            value = getattr(obj, key)
+        except Exception:
+            pass
+    return value
+
+
+def _all_values(j):
+    """하위 dict 까지 모든 값 (재귀하지 않음)"""
+    stack = [iter(j.values())]
+    while stack:
+        for v in stack[-1]:
+            if isinstance(v, dict):
+                stack.append(iter(v.values()))
+                break
+            yield v
+        else:
+            stack.pop()
+
+
+class FieldPath(object):
+    def __init__(self, field_name):
+        self.field_name = field_name
+        self.keys = parse_path(field_name)
+        self.is_all = field_name == WILDCARD
+        self.is_wildcard = field_name.startswith(WILDCARD_PREFIX)
+        self.has_wildcard = WILDCARD in field_name
+        # 없는 path 인 경우 찾아볼 앞부분 (긴 것부터): [(key 개수 또는 None, 앞부분의 key 목록, 나머지 field name)]
+        self._prefixes = None
+        self._stripped = None
+
+    def __repr__(self):
+        return 'FieldPath({})'.format(self.field_name)
+
+    def __getstate__(self):
+        return {'field_name': self.field_name}
+
+    def __setstate__(self, state):
+        self.__init__(state['field_name'])
+
+    def walk(self, j, keys=None):
+        """keys 를 따라간 값. 없으면 MISSING"""
+        value = j
+        for key in self.keys if keys is None else keys:
+            if type(value) is dict:
+                v = value.get(key, MISSING)
+                if v is MISSING:
+                    v = get_key(value, key)
+            else:
+                v = get_key(value, key)
+            if v is MISSING:
+                return MISSING
+            value = v
+        return value
+
+    def has(self, j):
+        return self.walk(j) is not MISSING
+
+    def get(self, j, root, default=None):
+        """j(None 이면 root) 에서 field 값을 꺼낸다. root 는 MatchContext 의 문서"""
+        j = root if j is None else j
+
+        if self.is_all:
+            return list(_all_values(j))
+
+        if self.is_wildcard and isinstance(j, (list, dict)):
+            values = [self.get_stripped().get(j, root, default)]
+            for v in (j.values() if isinstance(j, dict) else j):
+                if isinstance(v, list):
+                    for i in v:
+                        # list 나 dict 가 아닌 값에는 field 가 없다.
+                        values.append(self.get(i, root, default) if isinstance(i, (list, dict)) else default)
+                if isinstance(v, dict):
+                    values.append(self.get(v, root, default))
+            return values
+
+        value = self.walk(j)
+        if value is not MISSING:
+            return value
+        return self._get_from_prefix(j, root, default)
+
+    def get_stripped(self):
+        """*.name 의 name"""
+        if self._stripped is None:
+            self._stripped = get_field_path(self.field_name.lstrip(WILDCARD_PREFIX))
+        return self._stripped
+
+    def iter_values(self, j, root, default=None):
+        """찾은 값을 하나씩 반환한다.
+
+        * 가 없는 path 는 get 의 결과 하나를 반환하고, * 가 있는 path 는 get 이 만드는 중첩 list 대신
+        찾은 값(찾지 못한 경우 default)을 문서를 훑으면서 바로 반환한다.
+        """
+        j = root if j is None else j
+
+        if self.is_all:
+            if isinstance(j, dict):
+                for v in _all_values(j):
+                    yield v
+            return
+
+        if not self.has_wildcard:
+            yield self.get(j, root, default)
+            return
+
+        if self.is_wildcard and isinstance(j, (list, dict)):
+            for v in self._iter_wildcard(j, root, default):
+                yield v
+            return
+
+        value = self.walk(j)
+        if value is not MISSING:
+            yield value
+            return
+
+        new_value, rest = self._find_prefix(j)
+        if isinstance(new_value, list) and len(new_value) and isinstance(new_value[0], dict):
+            rest_path = get_field_path(rest)
+            for nv in new_value:
+                if nv is None:
+                    yield default
+                    continue
+                for v in rest_path.iter_values(nv, root, default):
+                    yield v
+        elif isinstance(new_value, dict):
+            for v in get_field_path(rest).iter_values(new_value, root, default):
+                yield v
+        else:
+            yield default
+
+    def _iter_wildcard(self, j, root, default):
+        # get 과 같은 순서로 하위 dict 를 방문한다. (재귀하지 않음)
+        stripped = self.get_stripped()
+        stack = [iter((j,))]
+        while stack:
+            for node in stack[-1]:
+                if isinstance(node, dict):
+                    for v in stripped.iter_values(node, root, default):
+                        yield v
+                    stack.append(iter(node.values()))
+                    break
+                elif isinstance(node, list):
+                    stack.append(iter(node))
+                    break
+            else:
+                stack.pop()
+
+    def get_prefixes(self):
+        if self._prefixes is None:
+            prefixes = []
+            name = self.field_name
+            while True:
+                split = name.rsplit('.', 1)
+                if len(split) == 1:
+                    break
+                name = split[0]
+                keys = parse_path(name)
+                # 앞부분의 key 가 전체 key 의 앞부분이면 전체 key 로 한 번에 따라간다.
+                depth = len(keys) if self.keys[:len(keys)] == keys else None
+                rest = self.field_name[len(name) + 1:]
+                prefixes.append((depth, keys, rest))
+            self._prefixes = prefixes
+        return self._prefixes
+
+    def _get_from_prefix(self, j, root, default):
+        new_value, rest = self._find_prefix(j)
+        if isinstance(new_value, list) and len(new_value) and isinstance(new_value[0], dict):
+            rest_path = get_field_path(rest)
+            return [rest_path.get(nv, root, default) for nv in new_value]
+        elif isinstance(new_value, dict):
+            return get_field_path(rest).get(new_value, root)
+        return default
+
+    def _find_prefix(self, j):
+        """존재하는 가장 긴 앞부분의 (값, 나머지 field name). 없으면 (MISSING, None)"""
+        values = [j]
+        for key in self.keys:
+            v = get_key(values[-1], key)
+            if v is MISSING:
+                break
+            values.append(v)
+
+        for depth, keys, rest in self.get_prefixes():
+            if depth is not None:
+                if depth >= len(values):
+                    continue
+                new_value = values[depth]
+            else:
+                new_value = self.walk(j, keys)
+                if new_value is MISSING:
+                    continue
+            return new_value, rest
+        return MISSING, None
+
+
+_field_paths = LRUCache(4096)
+
+
+def get_field_path(field_name):
+    """field_name 의 FieldPath (같은 field_name 이면 같은 객체)"""
+    if isinstance(field_name, FieldPath):
+        return field_name
+    return _field_paths.get_or_create(field_name, lambda: FieldPath(field_name))
+
+
+__all__ = ['FieldPath', 'get_field_path', 'parse_path']
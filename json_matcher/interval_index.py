@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""interval index for numeric terms
+
+같은 field 에 대한 숫자 비교 term(field:>500, field:[10 TO 20], field:<=0.3 ...) 이 많을 때,
+term 을 하나씩 평가하지 않고 문서 값을 포함하는 구간을 interval tree 로 찾는다. (O(log n + k))
+
+    - Operator: >t 는 (t, inf], >=t 는 [t, inf], <t 는 [-inf, t), <=t 는 [-inf, t], =t 는 [t, t]
+    - RangeMatcher: [start, stop] 또는 (start, stop)
+
+문서 값이 숫자(int, float, bool) 인 경우만 사용한다. 문자열, list 등은 term 을 그대로 평가한다.
+"""
+from __future__ import print_function, unicode_literals
+
+import collections
+import math
+
+from .json_matcher import Operator, RangeMatcher, TermMatcher
+
+INF = float('inf')
+
+Interval = collections.namedtuple('Interval', ['low', 'low_incl', 'high', 'high_incl', 'item'])
+
+
+def contains(interval, x):
+    low, low_incl, high, high_incl, _ = interval
+    return (low < x or (low_incl and low == x)) and (x < high or (high_incl and high == x))
+
+
+class IntervalTree(object):
+    """정적인 centered interval tree. stab(x) 는 x 를 포함하는 구간의 item 목록"""
+    def __init__(self, intervals):
+        self.size = len(intervals)
+        self.root = self.build(list(intervals))
+
+    def __len__(self):
+        return self.size
+
+    def build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(set(v for interval in intervals for v in (interval.low, interval.high)))
+        center = endpoints[len(endpoints) // 2]
+
+        left, here, right = [], [], []
+        for interval in intervals:
+            if interval.high < center:
+                left.append(interval)
+            elif interval.low > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        # node: (center, low 오름차순, high 내림차순, 왼쪽, 오른쪽)
+        by_low = sorted(here, key=lambda i: i.low)
+        by_high = sorted(here, key=lambda i: i.high, reverse=True)
+        return center, by_low, by_high, self.build(left), self.build(right)
+
+    def stab(self, x):
+        found = []
+        node = self.root
+        while node is not None:
+            center, by_low, by_high, left, right = node
+            if x < center:
+                # center 를 포함하는 구간이므로 high 쪽은 항상 만족한다.
+                for interval in by_low:
+                    if interval.low > x:
+                        break
+                    if interval.low < x or interval.low_incl:
+                        found.append(interval.item)
+                node = left
+            elif x > center:
+                for interval in by_high:
+                    if interval.high < x:
+                        break
+                    if interval.high > x or interval.high_incl:
+                        found.append(interval.item)
+                node = right
+            else:
+                for interval in by_low:
+                    if interval.low > x:
+                        break
+                    if contains(interval, x):
+                        found.append(interval.item)
+                break
+        return found
+
+
+def get_interval(matcher):
+    """숫자로 비교하는 Operator/RangeMatcher 의 (low, low_incl, high, high_incl). 아니면 None"""
+    if isinstance(matcher, Operator) and matcher.is_float:
+        t = matcher.float_value
+        if math.isnan(t):
+            return None
+        return {
+            '>': (t, False, INF, True),
+            '>=': (t, True, INF, True),
+            '<': (-INF, True, t, False),
+            '<=': (-INF, True, t, True),
+            '=': (t, True, t, True),
+        }.get(matcher.op)
+    if isinstance(matcher, RangeMatcher) and matcher.is_float:
+        start, stop = matcher.start, matcher.stop
+        if math.isnan(start) or math.isnan(stop) or start > stop:
+            return None
+        return start, matcher.incl, stop, matcher.incl
+    return None
+
+
+def is_numeric_term(matcher):
+    return isinstance(matcher, TermMatcher) and not matcher.field_path.has_wildcard and \
+        get_interval(matcher.field_value) is not None
+
+
+class NumericTermIndex(object):
+    """한 field 의 숫자 비교 term 들. items 는 term 의 field_value 가 Operator/RangeMatcher 인 TermMatcher 를 갖는 객체
+
+    Operator 는 문서 값을 그대로, RangeMatcher 는 float 로 바꿔서 비교하므로 tree 를 나눈다.
+    """
+    def __init__(self, field_name, items, get_term=lambda item: item):
+        self.field_name = field_name
+        operators, ranges = [], []
+        for item in items:
+            field_value = get_term(item).field_value
+            interval = Interval(*(get_interval(field_value) + (item,)))
+            (ranges if isinstance(field_value, RangeMatcher) else operators).append(interval)
+        self.operators = IntervalTree(operators)
+        self.ranges = IntervalTree(ranges)
+
+    def __repr__(self):
+        return 'NumericTermIndex({}, operators={}, ranges={})'.format(
+            self.field_name, len(self.operators), len(self.ranges))
+
+    def __len__(self):
+        return len(self.operators) + len(self.ranges)
+
+    def search(self, value):
+        """value 로 매칭되는 [(item, matched_value)]. 숫자가 아니면 None (term 을 평가해야 함)"""
+        if not isinstance(value, (int, float)) or (isinstance(value, float) and math.isnan(value)):
+            return None
+        try:
+            float_value = float(value)
+        except OverflowError:
+            return None
+        # Operator 는 문서 값을, RangeMatcher 는 float 로 바꾼 값을 matched_value 로 남긴다.
+        return [(item, value) for item in self.operators.stab(value)] + \
+            [(item, float_value) for item in self.ranges.stab(float_value)]
+
+
+__all__ = ['IntervalTree', 'NumericTermIndex', 'get_interval']
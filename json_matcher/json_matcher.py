@@ -3,21 +3,49 @@
 from __future__ import print_function, unicode_literals
 
 import collections
+import copy
 import ast
 import fnmatch
 import numbers
 import re
+import threading
+import warnings
 from six import string_types
-import pyparsing as pp
-
-from .match_environ import MatchContext
+from six.moves import builtins
+
+from .cache import LRUCache
+from .field_path import get_field_path
+from .match_environ import MatchContext, KeywordSetBinding
+from .keyword_store import KeywordSetStore
+from .counting import (COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING, COUNT_MODES, count_matches, count_text,
+                       get_count_limit)
+from .regex_engine import (REGEX_ENGINE_RE, REGEX_ENGINE_RE2, REGEX_ENGINES,
+                           REGEX_VALIDATION_OFF, REGEX_VALIDATION_WARN, REGEX_VALIDATION_STRICT, REGEX_VALIDATIONS,
+                           UnsafeRegexpWarning, compile_regexp, find_backtracking, is_backtracking)
 
 IMPLICIT_BIN_OP_AND = 'AND'
 IMPLICIT_BIN_OP_OR = 'OR'
 TERM_MATCH_OP_EQUAL = 'EQUAL'
 TERM_MATCH_OP_CONTAIN = 'CONTAIN'
 
-pp.ParserElement.enablePackrat()
+IMPLICIT_BIN_OPS = [IMPLICIT_BIN_OP_OR, IMPLICIT_BIN_OP_AND]
+TERM_MATCH_OPS = [TERM_MATCH_OP_EQUAL, TERM_MATCH_OP_CONTAIN]
+
+# query parser backend
+PARSER_PYPARSING = 'pyparsing'
+PARSER_NATIVE = 'native'
+PARSERS = [PARSER_PYPARSING, PARSER_NATIVE]
+
+# match engine
+ENGINE_INTERPRETER = 'interpreter'
+ENGINE_CODEGEN = 'codegen'
+ENGINES = [ENGINE_INTERPRETER, ENGINE_CODEGEN]
+
+# wildcard text 의 비교 방법. prefix*, *suffix, *infix* 는 문자열 method 로, 나머지는 정규식으로 비교한다.
+WILDCARD_PREFIX = 'prefix'
+WILDCARD_SUFFIX = 'suffix'
+WILDCARD_INFIX = 'infix'
+WILDCARD_PATTERN = 'pattern'
 
 
 class JsonMatcherBaseException(Exception):
@@ -32,32 +60,124 @@ class JsonMatcherParseException(JsonMatcherBaseException):
         return 'JsonMatcherParseException({})'.format(repr(self.original_exception))
 
 
+class UnsafeRegexpException(JsonMatcherBaseException):
+    """regex_validation=REGEX_VALIDATION_STRICT 에서 catastrophic backtracking 이 생길 수 있는 pattern"""
+    def __init__(self, pattern, reasons):
+        self.pattern = pattern
+        self.reasons = reasons
+
+    def __str__(self):
+        return '/{}/: {}'.format(self.pattern, ', '.join(self.reasons))
+
+    def __repr__(self):
+        return 'UnsafeRegexpException({!r}, {!r})'.format(self.pattern, self.reasons)
+
+
+class UnsafeExpressionException(JsonMatcherBaseException):
+    """_expr_ 에서 허용하지 않는 속성/이름을 사용하는 expression (ExpressionMatcher)"""
+    def __init__(self, expression, reasons):
+        self.expression = expression
+        self.reasons = reasons
+
+    def __str__(self):
+        return '{}: {}'.format(self.expression, ', '.join(self.reasons))
+
+    def __repr__(self):
+        return 'UnsafeExpressionException({!r}, {!r})'.format(self.expression, self.reasons)
+
+
 ValidText = collections.namedtuple('ValidText', ['value'])
 QuotedString = collections.namedtuple('QuotedString', ['value'])
 RQuotedString = collections.namedtuple('RQuotedString', ['value', 'options'])
 
 
-def flat_nested_object(o, pathes=None, depth=0, max_depth=10):
-    if depth >= max_depth:
-        return
-    if pathes is None:
-        pathes = []
+# 입력된 list / dictionary 를 풀어서 평가할 때의 제한. (set_leaf_budget)
+DEFAULT_LEAF_MAX_DEPTH = 10
+leaf_max_depth = DEFAULT_LEAF_MAX_DEPTH
+leaf_max_elements = None
+
+
+def set_leaf_budget(max_depth=DEFAULT_LEAF_MAX_DEPTH, max_elements=None):
+    """list / dictionary 입력을 풀어서 평가할 때 내려가는 깊이와 방문하는 원소 수(None: 제한 없음)"""
+    global leaf_max_depth, leaf_max_elements
+    leaf_max_depth = max_depth
+    leaf_max_elements = max_elements
+
+
+def iter_leaves(o, max_depth=DEFAULT_LEAF_MAX_DEPTH, max_elements=None):
+    """list / dict 안의 값(list / dict 가 아닌 것)을 순서대로 반환한다. 재귀하지 않고 path 도 만들지 않는다.
+
+    max_depth 보다 깊은 값은 건너뛰고, max_elements 개의 원소를 방문하면 멈춘다.
+    """
     if isinstance(o, list):
-        for idx, item in enumerate(o):
-            new_pathes = pathes + ['[{}]'.format(idx)]
-            for name, value in flat_nested_object(item, new_pathes, depth + 1, max_depth):
-                yield name, value
+        stack = [iter(o)]
     elif isinstance(o, dict):
-        for inner_key, inner_value in o.items():
-            new_pathes = pathes + ['.{}'.format(inner_key)]
-            for name, value in flat_nested_object(inner_value, new_pathes, depth + 1, max_depth):
-                yield name, value
+        stack = [iter(o.values())]
     else:
-        name = ''.join(pathes)
-        if name.startswith('.'):
-            name = name[1:]
-        yield name, o
-    return
+        if max_depth > 0:
+            yield o
+        return
+    if max_depth <= 1:
+        return
+
+    visited = 0
+    while stack:
+        for item in stack[-1]:
+            visited += 1
+            if max_elements is not None and visited > max_elements:
+                return
+            if isinstance(item, list):
+                if len(stack) + 1 < max_depth:
+                    stack.append(iter(item))
+                    break
+            elif isinstance(item, dict):
+                if len(stack) + 1 < max_depth:
+                    stack.append(iter(item.values()))
+                    break
+            else:
+                yield item
+        else:
+            stack.pop()
+
+
+def iter_leaf_paths(o, max_depth=DEFAULT_LEAF_MAX_DEPTH, max_elements=None, prefix=''):
+    """iter_leaves 와 같은 순서로 (path, 값) 을 반환한다. path 는 a.b[0].c 형식"""
+    def children(container, path):
+        if isinstance(container, list):
+            return (('{}[{}]'.format(path, idx), item) for idx, item in enumerate(container))
+        return (('{}.{}'.format(path, key), item) for key, item in container.items())
+
+    def leaf_name(path):
+        return path[1:] if path.startswith('.') else path
+
+    if not isinstance(o, (list, dict)):
+        if max_depth > 0:
+            yield leaf_name(prefix), o
+        return
+    if max_depth <= 1:
+        return
+
+    stack = [children(o, prefix)]
+    visited = 0
+    while stack:
+        for path, item in stack[-1]:
+            visited += 1
+            if max_elements is not None and visited > max_elements:
+                return
+            if isinstance(item, (list, dict)):
+                if len(stack) + 1 < max_depth:
+                    stack.append(children(item, path))
+                    break
+            else:
+                yield leaf_name(path), item
+        else:
+            stack.pop()
+
+
+def flat_nested_object(o, pathes=None, depth=0, max_depth=10):
+    """(path, 값) 목록. iter_leaf_paths 를 사용한다."""
+    prefix = ''.join(pathes) if pathes else ''
+    return iter_leaf_paths(o, max_depth - depth, prefix=prefix)
 
 
 # list / dictionary 가 입력되는 경우 nested 된 객체를 풀어서 접근한다.
@@ -73,18 +193,33 @@ class BaseMatcher:
         raise NotImplemented
 
     def eval(self, input_value, context):
-        # 시작하기 전에 한번 검사해서 flat_nested_object 에 의한 generator 생성을 차단
+        # 시작하기 전에 한번 검사해서 iter_leaves 에 의한 generator 생성을 차단
         if isinstance(input_value, numbers.Number) or isinstance(input_value, string_types):
             return self.eval_one(input_value, context)
 
-        for name, value in flat_nested_object(input_value):
-            if isinstance(input_value, list) and len(input_value) and isinstance(input_value[0], dict):
-                break
+        # dict 의 list 는 평가하지 않는다.
+        if isinstance(input_value, list) and len(input_value) and isinstance(input_value[0], dict):
+            return False, None
+
+        for value in iter_leaves(input_value, leaf_max_depth, leaf_max_elements):
             matched, matched_value = self.eval_one(value, context)
             if matched:
                 return matched, matched_value
         return False, None
 
+    def bind(self, environ):
+        """environ 에서 미리 찾아둘 것이 있으면 찾는다. (JsonMatcher.bind)"""
+        pass
+
+    def get_keyword_sets(self, context):
+        """@@{name} 의 keyword set 목록. 없는 것이 있으면 None (bind 한 environ 이면 미리 찾은 것을 사용)"""
+        binding = self.binding
+        if binding is not None:
+            resolved = binding.lookup(context.environ)
+            if resolved is not None:
+                return resolved.keyword_sets
+        return context.get_keyword_sets(self.keyword_set_names)
+
 
 class TextMatcher(BaseMatcher):
     def __init__(self, value, term_match_op=TERM_MATCH_OP_EQUAL):
@@ -95,19 +230,61 @@ class TextMatcher(BaseMatcher):
         if isinstance(value, QuotedString):
             self.quoted = True
 
+        self.build()
+        self.binding = None
+
     def __repr__(self):
         return 'TextMatcher:{}'.format(self.value)
 
-    def count(self, input_value, context):
+    def build(self):
+        """value 로 비교할 때마다 다시 해석하지 않도록 미리 만든다."""
+        self.keyword_set_names = tuple(MatchContext.KEYWORD_SET_NAME_RE.findall(self.value))
+        self.wildcard = build_wildcard(self.value)
+
+        # 따옴표가 없으면 boolean/숫자 입력과 boolean/숫자로 비교한다. 해석할 수 없으면 None
+        self.bool_value = None
+        self.int_value = None
+        self.abs_float_value = None
+        if self.quoted:
+            return
+        if self.value.lower() in ['true', 'false']:
+            self.bool_value = self.value.lower() == 'true'
+        try:
+            self.int_value = int(self.value)
+        except ValueError:
+            pass
+        try:
+            self.abs_float_value = abs(float(str(self.value)))
+        except ValueError:
+            pass
+
+    def bind(self, environ):
+        self.binding = None
+        if self.keyword_set_names and environ is not None:
+            self.binding = KeywordSetBinding(environ, self.keyword_set_names)
+
+    # binding 은 environ 을 참조하므로 저장하지 않는다.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('binding', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.build()
+        self.binding = None
+
+    def count(self, input_value, context, mode=None, limit=None):
+        """mode 가 None 이면 keyword set 은 겹치는 것 포함, text 는 겹치지 않는 것만 센다."""
         if not isinstance(input_value, string_types):
             input_value = str(input_value)
 
         # keyword set 설정이 있는 경우 반영한다.
-        if context.has_keyword_set(self.value):
-            count, matched_value = context.count_keyword_set(self.value, input_value)
-            return count, matched_value
+        keyword_sets = self.get_keyword_sets(context) if self.keyword_set_names else None
+        if keyword_sets is not None:
+            return keyword_sets[0].count(input_value, mode or COUNT_OVERLAPPING, limit)
         else:
-            count = input_value.count(self.value)
+            count = count_text(self.value, input_value, mode or COUNT_NON_OVERLAPPING, limit)
             return count, self.value
 
     def eval_one(self, input_value, context):
@@ -115,41 +292,42 @@ class TextMatcher(BaseMatcher):
             if isinstance(input_value, bool):
                 # If input_value is bool value, try boolean match
                 # XXX: isinstance(True, numbers.Number) == True. So we try boolean first.
-                try:
-                    if self.value.lower() in ['true', 'false']:
-                        boolean_value = self.value.lower() == 'true'
-                        return boolean_value == input_value, input_value
-                except ValueError:
-                    pass
+                if self.bool_value is not None:
+                    return self.bool_value == input_value, input_value
             elif isinstance(input_value, numbers.Number):
                 # If input_value is numeric value, try Int/Float match
-                try:
-                    return int(self.value) == int(input_value), input_value
-                except ValueError:
-                    pass
-
-                try:
-                    return (abs(float(str(self.value))) - abs(float(input_value))) < 1e-09, input_value
-                except ValueError:
-                    pass
+                # int(nan) 등 입력을 int 로 바꿀 수 없으면 float 로 비교한다.
+                if self.int_value is not None:
+                    try:
+                        return self.int_value == int(input_value), input_value
+                    except ValueError:
+                        pass
+
+                # XXX: 차이의 절대값이 아니므로 value 보다 절대값이 큰 입력은 모두 매칭된다. (이전부터의 동작)
+                if self.abs_float_value is not None:
+                    try:
+                        return (self.abs_float_value - abs(float(input_value))) < 1e-09, input_value
+                    except ValueError:
+                        pass
 
         if not isinstance(input_value, string_types):
             input_value = str(input_value)
 
         # keyword set 설정이 있는 경우 반영한다.
-        if context.has_keyword_set(self.value):
+        keyword_sets = self.get_keyword_sets(context) if self.keyword_set_names else None
+        if keyword_sets is not None:
             if self.term_match_op == TERM_MATCH_OP_CONTAIN:
-                r = context.search_keyword_set(self.value, input_value)
+                m = keyword_sets[0].search(input_value)
             else:
-                r = context.match_keyword_set(self.value, input_value)
+                m = keyword_sets[0].match(input_value)
 
-            if r:
-                return r
+            if m:
+                return True, m.group()
             else:
                 return False, None
 
-        if '*' in self.value or '?' in self.value:
-            return fnmatch.fnmatch(input_value, self.value), input_value
+        if self.wildcard is not None:
+            return match_wildcard(self.wildcard, input_value), input_value
 
         if self.term_match_op == TERM_MATCH_OP_CONTAIN:
             return self.value in input_value, self.value
@@ -169,40 +347,71 @@ class RegexpMatcher(BaseMatcher):
         flags = 0
         if 'i' in options:
             flags = flags | re.IGNORECASE
+        self.flags = int(flags)
+        self.regex_engine = REGEX_ENGINE_RE
         self.pattern = re.compile(self.value, flags)
+        self.keyword_set_names = tuple(MatchContext.KEYWORD_SET_NAME_RE.findall(self.value))
+        self.binding = None
 
     def __repr__(self):
         return 'RegexpMatcher:{}'.format(self.value)
 
-    def count(self, input_value, context):
+    def set_regex_engine(self, regex_engine):
+        self.regex_engine = regex_engine
+        self.pattern = compile_regexp(self.value, self.flags, regex_engine)
+        if self.binding is not None:
+            self.bind(self.binding.environ)
+
+    def bind(self, environ):
+        """keyword set 을 확장한 정규식을 미리 compile 해 둔다."""
+        self.binding = None
+        if self.keyword_set_names and environ is not None:
+            self.binding = KeywordSetBinding(environ, self.keyword_set_names, self.value, self.regex_engine)
+
+    # RE2 pattern 은 pickle 할 수 없을 수 있으므로 다시 만든다. binding 은 environ 을 참조하므로 저장하지 않는다.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['pattern']
+        state.pop('binding', None)
+        return state
+
+    def __setstate__(self, state):
+        pattern = state.pop('pattern', None)
+        self.__dict__.update(state)
+        if 'flags' not in state:
+            self.flags = int(pattern.flags & re.IGNORECASE)
+        self.keyword_set_names = tuple(MatchContext.KEYWORD_SET_NAME_RE.findall(self.value))
+        self.binding = None
+        self.set_regex_engine(state.get('regex_engine', REGEX_ENGINE_RE))
+
+    def get_expanded_pattern(self, context):
+        """keyword set 을 확장한 정규식. 사용하지 않으면 self.pattern"""
+        binding = self.binding
+        if binding is not None:
+            resolved = binding.lookup(context.environ)
+            if resolved is not None:
+                return resolved.pattern or self.pattern
+        if context.get_keyword_sets(self.keyword_set_names) is None:
+            return self.pattern
+        return context.expand_regexp(self.value, self.regex_engine)
+
+    def count(self, input_value, context, mode=None, limit=None):
+        """mode 가 None 이면 겹치는 것 포함"""
         if not isinstance(input_value, string_types):
             input_value = str(input_value)
 
         # keyword set 설정이 있는 경우 반영한다.
-        pattern = self.pattern
-        if context.has_keyword_set(self.value):
-            pattern = context.expand_regexp(self.value)
+        pattern = self.get_expanded_pattern(context) if self.keyword_set_names else self.pattern
 
-        last_matched = ''
-        count = 0
-        start = 0
-        while True:
-            m = pattern.search(input_value[start:])
-            if not m:
-                break
-            last_matched = m.group()
-            start += m.start() + 1
-            count += 1
-        return count, last_matched
+        return count_matches(pattern.search, input_value, mode or COUNT_OVERLAPPING, limit)
 
     def eval_one(self, input_value, context):
         if not isinstance(input_value, string_types):
             input_value = str(input_value)
 
         # keyword set 설정이 있는 경우 반영한다.
-        if context.has_keyword_set(self.value):
-            expanded_regexp = context.expand_regexp(self.value)
-            m = expanded_regexp.search(input_value)
+        if self.keyword_set_names:
+            m = self.get_expanded_pattern(context).search(input_value)
         else:
             m = self.pattern.search(input_value)
 
@@ -215,6 +424,39 @@ class RegexpMatcher(BaseMatcher):
         return self.value
 
 
+def build_wildcard(value):
+    """* 또는 ? 가 있는 text 를 (비교 방법, 문자열 또는 정규식) 으로. wildcard 가 아니면 None
+
+    fnmatch.fnmatchcase 와 같다. (POSIX 에서는 fnmatch.fnmatch 와 같음)
+    """
+    if '*' not in value and '?' not in value:
+        return None
+    literal = value.strip('*')
+    if literal and not any(c in literal for c in '*?['):
+        starts, ends = value.startswith('*'), value.endswith('*')
+        if starts and ends:
+            return WILDCARD_INFIX, literal
+        elif ends:
+            return WILDCARD_PREFIX, literal
+        elif starts:
+            return WILDCARD_SUFFIX, literal
+    elif not literal:
+        # '*', '**' 는 모든 문자열과 매칭된다.
+        return WILDCARD_PREFIX, ''
+    return WILDCARD_PATTERN, re.compile(fnmatch.translate(value))
+
+
+def match_wildcard(wildcard, value):
+    kind, operand = wildcard
+    if kind == WILDCARD_PREFIX:
+        return value.startswith(operand)
+    elif kind == WILDCARD_SUFFIX:
+        return value.endswith(operand)
+    elif kind == WILDCARD_INFIX:
+        return operand in value
+    return operand.match(value) is not None
+
+
 def build_text_matcher(value, term_match_op):
     if isinstance(value, RQuotedString):
         return RegexpMatcher(value)
@@ -225,30 +467,56 @@ def build_text_matcher(value, term_match_op):
 class MultipleTextMatcher(BaseMatcher):
     def __init__(self, values, term_match_op=TERM_MATCH_OP_EQUAL):
         self.matchers = list(map(lambda v: build_text_matcher(v, term_match_op), values))
+        self.build()
 
     def __repr__(self):
         matchers_text = ','.join(map(lambda t: t.get_value(), self.matchers))
         return 'MultipleTextMatcher: {}'.format(matchers_text)
 
+    def build(self):
+        """matcher 들을 한 번에 평가하는 구조를 만든다. (text_alternatives.py) matchers 를 바꾸면 다시 호출한다."""
+        from .text_alternatives import TextAlternatives
+        self.alternatives = TextAlternatives(self.matchers)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('alternatives', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.build()
+
     def eval_one(self, input_value, context):
-        for matcher in self.matchers:
-            matched, matched_value = matcher.eval_one(input_value, context)
-            if matched:
-                return matched, matched_value
-        return False, None
+        return self.alternatives.eval_one(input_value, context)
 
 
 class CountingMatcher(BaseMatcher):
-    def __init__(self, matcher, op, condition_value):
+    """mode: None(text 는 COUNT_NON_OVERLAPPING, 정규식/keyword set 은 COUNT_OVERLAPPING), COUNT_OVERLAPPING,
+    COUNT_NON_OVERLAPPING
+
+    조건이 결정되는 개수(limit)를 세면 멈춘다. 이때 matched_value 는 그때까지 찾은 것 중 마지막이다.
+    """
+    def __init__(self, matcher, op, condition_value, mode=None):
+        if mode is not None and mode not in COUNT_MODES:
+            raise ValueError('Unknown count mode: {}'.format(mode))
         self.matcher = matcher
         self.op = op
         self.condition_value = int(condition_value.value)
+        self.mode = mode
+        self.limit = get_count_limit(op, self.condition_value)
 
     def __repr__(self):
         return f'CountingMatcher({self.matcher},{self.op},{self.condition_value})'
 
-    def count(self, value, context):
-        count, matched_value = self.matcher.count(value, context)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'limit' not in state:
+            self.mode = None
+            self.limit = get_count_limit(self.op, self.condition_value)
+
+    def count(self, value, context, limit=None):
+        count, matched_value = self.matcher.count(value, context, self.mode, limit)
         return count, matched_value
 
     def eval_one(self, input_value, context):
@@ -257,18 +525,19 @@ class CountingMatcher(BaseMatcher):
     def eval(self, input_value, context):
         count = 0
         last_matched = ''
+        limit = self.limit
 
-        # 시작하기 전에 한번 검사해서 flat_nested_object 에 의한 generator 생성을 차단
+        # 시작하기 전에 한번 검사해서 iter_leaves 에 의한 generator 생성을 차단
         if isinstance(input_value, numbers.Number) or isinstance(input_value, string_types):
-            count, last_matched = self.eval_one(input_value, context)
-        else:
-            for name, value in flat_nested_object(input_value):
-                if isinstance(input_value, list) and len(input_value) and isinstance(input_value[0], dict):
-                    break
-                e_count, e_last_matched = self.eval_one(value, context)
+            count, last_matched = self.count(input_value, context, limit)
+        elif not (isinstance(input_value, list) and len(input_value) and isinstance(input_value[0], dict)):
+            for value in iter_leaves(input_value, leaf_max_depth, leaf_max_elements):
+                e_count, e_last_matched = self.count(value, context, None if limit is None else limit - count)
                 if e_count > 0:
                     count += e_count
                     last_matched = e_last_matched
+                    if limit is not None and count >= limit:
+                        break
 
         if self.op == '<=':
             return count <= self.condition_value, last_matched
@@ -283,49 +552,86 @@ class CountingMatcher(BaseMatcher):
         return count == self.condition_value, last_matched
 
 
+# environ 의 함수로 만든 CodeMatcher 의 평가 준비. function 은 field:!func 처럼 함수 하나만 쓴 경우의 함수
+CodeFrame = collections.namedtuple('CodeFrame', ['environ', 'version', 'function', 'globals'])
+
+
 class CodeMatcher:
+    """field:!func, field:!"func(this, 1) > 2"
+
+    environ(과 version) 이 바뀌지 않으면 함수를 찾거나 globals 를 만들지 않고 이전에 만든 CodeFrame 을 사용한다.
+    environ.functions 를 직접 바꾸면 반영되지 않는다. (MatchEnvironment.add_function)
+    version 이 없는 environ(get_functions 만 있는 경우 등)은 평가할 때마다 CodeFrame 을 만든다.
+    """
     def __init__(self, expression):
         self.expression = expression
         self.compiled = __builtins__['compile'](expression, '_expression_matcher', 'eval')
         parsed = ast.parse(expression)
         self.variable_names = [node.id for node in ast.walk(parsed) if isinstance(node, ast.Name)]
+        self.frame = None
 
     def __repr__(self):
         return 'CodeMatcher({})'.format(self.expression)
 
-    def create_local(self, input_value, context):
-        local = {}
-        functions = context.environ.get_functions()
-
-        local.update(functions)
-        local['this'] = input_value
-        return local
-
-    def is_no_args_function(self, local):
-        first = self.variable_names[0] if len(self.variable_names) == 1 else None
-        if first and callable(local.get(first)):
-            return True
-        else:
-            return False
-
-    def call_single_function(self, local, this):
-        first = self.variable_names[0]
-        return local[first](this)
+    # code object 는 pickle 할 수 없으므로 expression 으로부터 다시 만든다. frame 은 environ 을 참조하므로 저장하지 않는다.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['compiled']
+        state.pop('frame', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compiled = __builtins__['compile'](self.expression, '_expression_matcher', 'eval')
+        self.frame = None
+
+    def get_frame(self, environ):
+        version = getattr(environ, 'version', None)
+        if version is None:
+            return self.create_frame(environ, version)
+        frame = self.frame
+        if frame is None or frame.environ is not environ or frame.version != version:
+            frame = self.frame = self.create_frame(environ, version)
+        return frame
+
+    def create_frame(self, environ, version):
+        functions = environ.get_functions()
+        # 이름이 하나이고 함수이면 eval 하지 않고 바로 호출한다. (this 는 입력 값이므로 제외)
+        function = None
+        if len(self.variable_names) == 1 and self.variable_names[0] != 'this':
+            function = functions.get(self.variable_names[0])
+            if not callable(function):
+                function = None
+        # 입력 값(this) 은 locals 로 넘기고 나머지 이름은 globals(함수, builtins) 에서 찾는다.
+        code_globals = dict(functions)
+        code_globals['__builtins__'] = builtins
+        return CodeFrame(environ, version, function, code_globals)
+
+    def accepts_sequence(self, context):
+        """함수 하나만 쓰고 그 함수가 값들을 list 로 받는 경우 (accepts_sequence)"""
+        function = self.get_frame(context.environ).function
+        return function is not None and getattr(function, 'accepts_sequence', False)
 
     def eval(self, input_value, context):
-        this = input_value
-        local = self.create_local(input_value, context)
+        frame = self.get_frame(context.environ)
         try:
-            if self.is_no_args_function(local):
-                ret = self.call_single_function(local, this)
+            if frame.function is not None:
+                ret = frame.function(input_value)
             else:
-                ret = eval(self.compiled, {}, local)
+                ret = eval(self.compiled, frame.globals, {'this': input_value})
         except (AttributeError, TypeError) as e:
             return False, None
         except Exception as e:
             raise e
         return ret, ret
 
+    def eval_batch(self, input_values, context):
+        """input_values 마다의 결과 목록. accepts_sequence 인 경우만 사용한다."""
+        try:
+            return list(self.get_frame(context.environ).function(input_values))
+        except (AttributeError, TypeError) as e:
+            return [False] * len(input_values)
+
 
 class Operator(BaseMatcher):
     def __init__(self, op, value):
@@ -416,12 +722,16 @@ class TermMatcher:
     def __init__(self, field_name, field_value):
         self.field_name = field_name
         self.field_value = field_value
+        self.field_path = get_field_path(field_name)
 
     def __repr__(self):
         return 'TermMatcher({}:{})'.format(self.field_name, self.field_value)
 
     def eval(self, context):
-        input_value = context.get(self.field_name)
+        if self.field_path.has_wildcard:
+            return self.eval_wildcard(context)
+
+        input_value = context.get(self.field_path)
 
         if input_value is None:
             return False, None
@@ -432,7 +742,46 @@ class TermMatcher:
         return matched, matched_value
 
 
-class DictOrObject:
+    def eval_wildcard(self, context):
+        if isinstance(self.field_value, CodeMatcher) and self.field_value.accepts_sequence(context):
+            return self.eval_batch(context)
+
+        # 찾은 값을 하나씩 평가하고 매칭되면 멈춘다. 결과에는 (중첩 list 대신) 매칭된 값을 남긴다.
+        for value in self.iter_wildcard_values(context):
+            if value is None:
+                continue
+            matched, matched_value = self.field_value.eval(value, context)
+            if matched:
+                context.add_result((self.field_name, value, matched_value))
+                return matched, matched_value
+        return False, None
+
+    def iter_wildcard_values(self, context):
+        for value in context.iter_values(self.field_path):
+            # * 는 list 안의 dict 의 값도 평가한다. (이전처럼 모든 값을 하나의 list 로 평가한 것과 같음)
+            # BaseMatcher.eval 은 dict 의 list 를 평가하지 않으므로 값들을 펼친 list 로 넘긴다.
+            # 다른 list 값처럼 list 하나로 평가하고 결과에도 (펼친) list 를 남긴다. (COUNT, !func 도 list 단위)
+            if self.field_path.is_all and isinstance(value, list) and len(value) and isinstance(value[0], dict):
+                yield list(iter_leaves(value, leaf_max_depth, leaf_max_elements))
+            else:
+                yield value
+
+    def eval_batch(self, context):
+        # 찾은 값들을 한 번에 함수에 넘기고, 처음으로 매칭된 값을 결과에 남긴다. (eval_wildcard 와 같은 결과)
+        values = [value for value in self.iter_wildcard_values(context) if value is not None]
+        if not values:
+            return False, None
+        for value, ret in zip(values, self.field_value.eval_batch(values, context)):
+            if ret:
+                context.add_result((self.field_name, value, ret))
+                return ret, ret
+        return False, None
+
+
+class DictOrObject(object):
+    """_expr_ 에서 dict 를 a.b 로 접근하기 위한 읽기 전용 view. 없는 key 는 None"""
+    __slots__ = ('v',)
+
     def __init__(self, v):
         self.v = v
 
@@ -446,32 +795,125 @@ class DictOrObject:
         return r
 
     def __getattr__(self, name):
-        return self[name]
+        r = self.v.get(name)
+        if r and isinstance(r, dict):
+            return DictOrObject(r)
+        return r
 
     def __repr__(self):
         return str(self.v)
 
 
+# _expr_ 에서 접근할 수 없는 속성. __class__ 등과 generator/frame 을 따라가면 python 내부(builtins)에 접근할 수 있다.
+UNSAFE_EXPRESSION_ATTRIBUTES = frozenset([
+    'gi_frame', 'gi_code', 'gi_yieldfrom', 'cr_frame', 'cr_code', 'cr_await', 'ag_frame', 'ag_code', 'ag_await',
+    'f_back', 'f_builtins', 'f_code', 'f_globals', 'f_locals', 'tb_frame', 'tb_next', 'format', 'format_map', 'mro',
+])
+
+
+def get_attributes(value, names):
+    """value.a.b.c 와 같다. DictOrObject 를 단계마다 만들지 않는다. (AttributeChains)"""
+    wrapped = type(value) is DictOrObject
+    if wrapped:
+        value = value.v
+    for name in names:
+        if wrapped:
+            # DictOrObject.v 는 key 가 아니라 감싼 dict 이다.
+            value = value if name == 'v' else value.get(name)
+            wrapped = name != 'v' and isinstance(value, dict) and bool(value)
+        else:
+            value = getattr(value, name)
+            wrapped = type(value) is DictOrObject
+            if wrapped:
+                value = value.v
+    return DictOrObject(value) if wrapped else value
+
+
+class AttributeChains(ast.NodeTransformer):
+    """a.b.c 를 __attributes__(a, ('b', 'c')) 로 바꾼다."""
+    def visit_Attribute(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            return self.generic_visit(node)
+        names = []
+        value = node
+        while isinstance(value, ast.Attribute) and isinstance(value.ctx, ast.Load):
+            names.append(value.attr)
+            value = value.value
+        call = ast.Call(func=ast.Name(id='__attributes__', ctx=ast.Load()),
+                        args=[self.visit(value), ast.Constant(value=tuple(reversed(names)))], keywords=[])
+        return ast.copy_location(call, node)
+
+
+# _expr_ 의 builtins. 이름은 문서의 field 또는 environ 의 함수이고, 둘 다 없으면 None 이다.
+EXPRESSION_BUILTINS = {'__attributes__': get_attributes}
+
+
+def find_unsafe_expression(parsed):
+    """expression 의 ast 에서 허용하지 않는 속성/이름 목록"""
+    reasons = []
+    for node in ast.walk(parsed):
+        if isinstance(node, ast.Attribute) and (node.attr.startswith('__') or
+                                                node.attr in UNSAFE_EXPRESSION_ATTRIBUTES):
+            reasons.append('attribute {}'.format(node.attr))
+        elif isinstance(node, ast.Name) and node.id.startswith('__'):
+            reasons.append('name {}'.format(node.id))
+    return reasons
+
+
 class ExpressionMatcher:
+    """_expr_:"a.b + c > 10"
+
+    expression 이 사용하는 이름만 문서(또는 environ 의 함수)에서 찾는다. 문서를 복사하지 않고, builtins 와 __class__ 같은
+    내부 속성에 접근할 수 없다. (UnsafeExpressionException)
+    """
     def __init__(self, expression):
         self.expression = expression
-        self.compiled = __builtins__['compile'](expression, '_expression_matcher', 'eval')
         parsed = ast.parse(expression)
         self.variable_names = [node.id for node in ast.walk(parsed) if isinstance(node, ast.Name)]
+        self.build()
 
     def __repr__(self):
         return 'ExpressionMatcher({})'.format(self.expression)
 
+    def build(self):
+        parsed = ast.parse(self.expression, mode='eval')
+        reasons = find_unsafe_expression(parsed)
+        if reasons:
+            raise UnsafeExpressionException(self.expression, reasons)
+        parsed = ast.fix_missing_locations(AttributeChains().visit(parsed))
+        self.compiled = __builtins__['compile'](parsed, '_expression_matcher', 'eval')
+        # 중복을 제거한 이름들
+        self.names = tuple(collections.OrderedDict.fromkeys(self.variable_names))
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['compiled']
+        state.pop('names', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.build()
+
     def get_local(self, context):
+        """expression 이 사용하는 이름 -> 값. 함수가 문서의 field 보다 우선한다."""
         functions = context.environ.get_functions()
-        local = dict(context.get_dict())
-        local.update(functions)
-        return DictOrObject(local)
+        j = context.get_dict()
+        if type(j) is not dict:
+            j = dict(j)
+        local = {'__builtins__': EXPRESSION_BUILTINS}
+        for name in self.names:
+            value = functions[name] if name in functions else j.get(name)
+            if value and isinstance(value, dict):
+                value = DictOrObject(value)
+            local[name] = value
+        return local
 
     def eval(self, context):
         try:
             local = self.get_local(context)
-            ret = eval(self.compiled, {}, local)
+            # comprehension 안의 이름도 찾을 수 있도록 globals 로 넘긴다.
+            ret = eval(self.compiled, local)
         except (AttributeError, TypeError) as e:
             return False, None
         except Exception as e:
@@ -483,12 +925,13 @@ class ExpressionMatcher:
 class ExistsMatcher:
     def __init__(self, variable_name):
         self.variable_name = variable_name
+        self.field_path = get_field_path(variable_name)
 
     def __repr__(self):
         return 'ExistsMatcher({})'.format(self.variable_name)
 
     def eval(self, context):
-        return context.exists(self.variable_name), self.variable_name
+        return context.exists(self.field_path), self.variable_name
 
 
 def build_term_matcher(field_name, field_value):
@@ -499,6 +942,10 @@ def build_term_matcher(field_name, field_value):
     return TermMatcher(field_name, field_value)
 
 
+# NOT 으로만 매칭된 경우 groups() 가 비어있지 않도록 추가하는 결과
+NOT_RESULT = ('NOT', 'NOT', 'NOT')
+
+
 class NotMatcher:
     def __init__(self, term):
         self.term = term
@@ -510,7 +957,7 @@ class NotMatcher:
         matched, matched_value = self.term.eval(context)
         if not matched:
             if not context.get_result():
-                context.add_result(('NOT', 'NOT', 'NOT'))
+                context.add_result(NOT_RESULT)
             return True, 'NOT'
         else:
             return False, None
@@ -551,6 +998,80 @@ class AndMatcher:
         return True, (lmatched_value, rmatched_value)
 
 
+class FlatOrMatcher:
+    """n-ary OR. order 는 matchers 를 평가하는 순서 (기본: 작성된 순서)"""
+    def __init__(self, matchers, order=None):
+        self.matchers = list(matchers)
+        self.order = list(order) if order is not None else list(range(len(self.matchers)))
+
+    def __repr__(self):
+        return 'OR({})'.format(','.join(map(repr, self.matchers)))
+
+    def eval(self, context):
+        matchers = self.matchers
+        for idx in self.order:
+            matched, matched_value = matchers[idx].eval(context)
+            if matched:
+                return matched, matched_value
+        return False, None
+
+
+class FlatAndMatcher:
+    """n-ary AND. order 는 matchers 를 평가하는 순서 (기본: 작성된 순서)
+
+    작성된 순서와 다르게 평가하더라도 매칭된 경우의 groups() 는 작성된 순서로 평가했을 때와 같도록 결과를 재배열한다.
+    (ordered_result=False 이면 재배열하지 않는다) 매칭되지 않은 경우의 결과는 작성된 순서와 다르므로
+    optimizer 는 실패한 결과가 groups() 에 나타나지 않는 곳에서만 순서를 바꾼다.
+    """
+    def __init__(self, matchers, order=None, ordered_result=True):
+        self.matchers = list(matchers)
+        self.order = list(order) if order is not None else list(range(len(self.matchers)))
+        self.reordered = self.order != sorted(self.order)
+        self.ordered_result = ordered_result
+
+    def __repr__(self):
+        return 'AND({})'.format(', '.join(map(repr, self.matchers)))
+
+    def eval(self, context):
+        matchers = self.matchers
+        if not self.reordered or not self.ordered_result:
+            matched_values = []
+            for idx in self.order:
+                matched, matched_value = matchers[idx].eval(context)
+                if not matched:
+                    return False, None
+                matched_values.append(matched_value)
+            return True, tuple(matched_values)
+
+        # 각 matcher 의 결과를 따로 모았다가 작성된 순서로 다시 붙인다.
+        result = context.get_result()
+        result_size = len(result)
+        chunks = [None] * len(matchers)
+        matched_values = [None] * len(matchers)
+        for idx in self.order:
+            matched, matched_value = matchers[idx].eval(context)
+            if not matched:
+                # 순서를 바꾼 AND 가 실패한 결과는 groups() 에 나타나지 않는다. (optimizer)
+                del result[result_size:]
+                return False, None
+            chunks[idx] = result[result_size:]
+            matched_values[idx] = matched_value
+            del result[result_size:]
+
+        append_ordered_results(result, chunks)
+        return True, tuple(matched_values)
+
+
+def append_ordered_results(result, chunks):
+    """순서를 바꿔 평가한 AND 의 결과(chunks, 작성된 순서)를 result 에 붙인다."""
+    for chunk in chunks:
+        for r in chunk:
+            # NOT_RESULT 는 결과가 비어 있을 때만 추가된다. 작성된 순서에서 앞에 결과가 있으면 제외한다.
+            if r is NOT_RESULT and result:
+                continue
+            result.append(r)
+
+
 def build_binary_matcher(l, class_object):
     left = l[0]
     op_ = None
@@ -588,6 +1109,9 @@ def escape_raw_regexp_term(tokens):
 # Grammar
 #
 def get_parser(implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
+    # pyparsing 은 import 비용이 크므로 grammar 가 필요할 때 import 한다.
+    import pyparsing as pp
+
     COLON, LBRACK, RBRACK, LBRACE, RBRACE, TILDE, CARAT = map(pp.Literal, ':[]{}~^')
     LPAR, RPAR = map(pp.Suppress, '()')
     AND_, OR_, NOT_, TO_ = map(pp.CaselessKeyword, 'AND OR NOT TO'.split())
@@ -669,18 +1193,44 @@ def get_parser(implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_
     return expression
 
 
+# grammar 는 (implicit_bin_op, term_match_op) 조합별로 처음 요청될 때 만든다.
+# import 시점에 모든 조합을 만들면 CLI / 짧은 worker process 의 시작 비용이 커진다.
 PREBUILT_PARSERS = {}
-for bin_op in [IMPLICIT_BIN_OP_OR, IMPLICIT_BIN_OP_AND]:
-    PREBUILT_PARSERS[bin_op] = {}
-    for match_op in [TERM_MATCH_OP_EQUAL, TERM_MATCH_OP_CONTAIN]:
-        PREBUILT_PARSERS[bin_op][match_op] = get_parser(bin_op, match_op)
+_prebuilt_parsers_lock = threading.Lock()
+_packrat_enabled = False
+
 
+def get_prebuilt_parser(implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
+    global _packrat_enabled
 
-def build_json_matcher(expr, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
-    if implicit_bin_op not in PREBUILT_PARSERS or term_match_op not in PREBUILT_PARSERS[implicit_bin_op]:
+    if implicit_bin_op not in IMPLICIT_BIN_OPS or term_match_op not in TERM_MATCH_OPS:
         raise ValueError('No parser for ({}, {})'.format(implicit_bin_op, term_match_op))
 
-    expression = PREBUILT_PARSERS[implicit_bin_op][term_match_op]
+    parser = PREBUILT_PARSERS.get(implicit_bin_op, {}).get(term_match_op)
+    if parser is not None:
+        return parser
+
+    with _prebuilt_parsers_lock:
+        parser = PREBUILT_PARSERS.get(implicit_bin_op, {}).get(term_match_op)
+        if parser is None:
+            if not _packrat_enabled:
+                import pyparsing as pp
+                pp.ParserElement.enablePackrat()
+                _packrat_enabled = True
+            parser = get_parser(implicit_bin_op, term_match_op)
+            PREBUILT_PARSERS.setdefault(implicit_bin_op, {})[term_match_op] = parser
+    return parser
+
+
+def build_json_matcher(expr, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL,
+                       parser=PARSER_PYPARSING):
+    if parser == PARSER_NATIVE:
+        from .query_parser import parse_query
+        return parse_query(expr, implicit_bin_op, term_match_op)
+    elif parser != PARSER_PYPARSING:
+        raise ValueError('Unknown parser: {}'.format(parser))
+
+    expression = get_prebuilt_parser(implicit_bin_op, term_match_op)
     matcher, = expression.parseString(expr, parseAll=True)
     return matcher
 
@@ -689,8 +1239,16 @@ JsonMatchValue = collections.namedtuple('JsonMatchedValue', ['field_name', 'quer
 
 
 class JsonMatchResult:
+    """groups() 의 JsonMatchValue 들은 처음 요청할 때 만든다."""
     def __init__(self, matched_list):
-        self.matched = list(map(lambda matched: JsonMatchValue(*matched), matched_list))
+        self.matched_list = list(matched_list)
+        self.matched_values = None
+
+    @property
+    def matched(self):
+        if self.matched_values is None:
+            self.matched_values = list(map(lambda matched: JsonMatchValue(*matched), self.matched_list))
+        return self.matched_values
 
     def group(self, idx=0):
         return self.matched[idx]
@@ -699,24 +1257,200 @@ class JsonMatchResult:
         return self.matched
 
 
+def iter_matchers(matcher):
+    """matcher tree 의 node 들 (재귀하지 않음)"""
+    stack = [matcher]
+    while stack:
+        m = stack.pop()
+        yield m
+        if isinstance(m, NotMatcher):
+            stack.append(m.term)
+        elif isinstance(m, (AndMatcher, OrMatcher)):
+            stack.extend([m.right, m.left])
+        elif isinstance(m, (FlatAndMatcher, FlatOrMatcher, MultipleTextMatcher)):
+            stack.extend(reversed(m.matchers))
+        elif isinstance(m, TermMatcher):
+            stack.append(m.field_value)
+        elif isinstance(m, CountingMatcher):
+            stack.append(m.matcher)
+
+
+def bind_matchers(matcher, environ):
+    """matcher tree 의 term 들을 environ(또는 KeywordSetStore 의 현재 snapshot) 에 bind 한다."""
+    environ = environ.get_environ()
+    for m in iter_matchers(matcher):
+        if isinstance(m, BaseMatcher):
+            m.bind(environ)
+
+
+def update_bindings(matcher, environ):
+    for m in iter_matchers(matcher):
+        binding = getattr(m, 'binding', None)
+        if binding is not None:
+            binding.update(environ)
+
+
+def iter_regexp_matchers(matcher):
+    """matcher tree 의 RegexpMatcher 들"""
+    return (m for m in iter_matchers(matcher) if isinstance(m, RegexpMatcher))
+
+
 class JsonMatcher():
-    def __init__(self, expression, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
+    def __init__(self, expression, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL,
+                 parser=PARSER_PYPARSING, optimize=False, engine=ENGINE_INTERPRETER,
+                 regex_engine=REGEX_ENGINE_RE, regex_validation=REGEX_VALIDATION_OFF, environ=None):
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine: {}'.format(engine))
+        if regex_engine not in REGEX_ENGINES:
+            raise ValueError('Unknown regex engine: {}'.format(regex_engine))
+        if regex_validation not in REGEX_VALIDATIONS:
+            raise ValueError('Unknown regex validation: {}'.format(regex_validation))
+        if parser == PARSER_NATIVE:
+            from .query_parser import QuerySyntaxError
+            parse_exception = QuerySyntaxError
+        else:
+            import pyparsing as pp
+            parse_exception = pp.ParseBaseException
+
+        self.expression = expression
+        self.implicit_bin_op = implicit_bin_op
+        self.term_match_op = term_match_op
         try:
-            self.matcher = build_json_matcher(expression, implicit_bin_op, term_match_op)
-        except pp.ParseBaseException as e:
+            self.matcher = build_json_matcher(expression, implicit_bin_op, term_match_op, parser)
+        except parse_exception as e:
             raise JsonMatcherParseException(e)
 
+        if optimize:
+            from .optimizer import optimize as optimize_matcher
+            self.matcher = optimize_matcher(self.matcher)
+
+        self.regex_engine = regex_engine
+        self.setup_regexps(regex_validation)
+        self.environ = None
+        if environ is not None:
+            self._bind_environ(environ)
+        self.engine = engine
+        self.program = self.build_program()
+
+    def __repr__(self):
+        return 'JsonMatcher({})'.format(self.matcher)
+
+    def setup_regexps(self, regex_validation):
+        """정규식을 regex_engine 으로 compile 하고, re 로 compile 된 것은 regex_validation 에 따라 검사한다."""
+        for matcher in iter_regexp_matchers(self.matcher):
+            if self.regex_engine != REGEX_ENGINE_RE:
+                matcher.set_regex_engine(self.regex_engine)
+            if regex_validation == REGEX_VALIDATION_OFF or not is_backtracking(matcher.pattern):
+                continue
+            reasons = find_backtracking(matcher.value, matcher.flags)
+            if not reasons:
+                continue
+            if regex_validation == REGEX_VALIDATION_STRICT:
+                raise UnsafeRegexpException(matcher.value, reasons)
+            warnings.warn('/{}/: {}'.format(matcher.value, ', '.join(reasons)), UnsafeRegexpWarning, stacklevel=3)
+
+        # RE 가 아닌 정규식은 합치지 않으므로 다시 만든다.
+        if self.regex_engine != REGEX_ENGINE_RE:
+            for matcher in iter_matchers(self.matcher):
+                if isinstance(matcher, MultipleTextMatcher):
+                    matcher.build()
+
+    def bind(self, environ):
+        """environ 에 bind 한 복사본. self 는 바꾸지 않는다. (compile() 이 cache 해서 공유하는 matcher 일 수 있다)
+
+        environ 의 keyword set 을 미리 찾고 확장한 정규식을 compile 해 둔다. match(j) 는 environ 으로 평가한다.
+        environ 이 KeywordSetStore 이면 현재 snapshot 에 bind 하고, reload 할 때 새 snapshot 으로 옮긴다.
+        다른 environ 의 context 로 평가하면 bind 하지 않은 것처럼 평가한다.
+        """
+        matcher = copy.deepcopy(self)
+        matcher._bind_environ(environ)
+        return matcher
+
+    def _bind_environ(self, environ):
+        """self 를 environ 에 bind 한다. (__init__, bind) compile() 이 공유하는 matcher 는 bind 하지 않도록 밖에서 부르지 않는다."""
+        self.environ = environ
+        bind_matchers(self.matcher, environ)
+        if isinstance(environ, KeywordSetStore):
+            environ.register(self)
+
+    def update_bindings(self, environ):
+        """bind 한 term 들을 environ(같은 origin 의 새 snapshot) 으로 옮긴다. (KeywordSetStore.reload)"""
+        update_bindings(self.matcher, environ)
+
+    def build_program(self):
+        if self.engine == ENGINE_CODEGEN:
+            from .codegen import compile_matcher
+            return compile_matcher(self.matcher)
+        return None
+
+    # 생성된 함수는 pickle 할 수 없으므로 다시 만든다. environ 은 함수를 포함하므로 저장하지 않는다.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('program', None)
+        state.pop('environ', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.engine = state.get('engine', ENGINE_INTERPRETER)
+        self.environ = None
+        self.program = self.build_program()
+
     def match(self, j):
-        context = MatchContext(j)
+        context = MatchContext(j, self.environ.get_environ() if self.environ is not None else None)
         return self.match_with_context(context)
 
-    def match_with_context(self, context):
+    def test(self, j):
+        """j 가 매칭되는지 여부. groups() 의 결과를 모으거나 만들지 않는다."""
+        context = MatchContext(j, self.environ.get_environ() if self.environ is not None else None, capture=False)
+        if self.program is not None:
+            return bool(self.program(context))
         matched, matched_value = self.matcher.eval(context)
+        return bool(matched)
+
+    def filter(self, iterable, capture=False):
+        """iterable 의 문서 중 매칭된 것을 차례로 반환하는 generator. capture=True 이면 (문서, JsonMatchResult)
+
+        문서마다 MatchContext 를 만들지 않고 하나를 reset 해서 사용한다. (KeywordSetStore 이면 문서마다 현재 snapshot)
+        """
+        environ = self.environ
+        context = MatchContext(None, environ.get_environ() if environ is not None else None, capture=capture)
+        program = self.program
+        matcher = self.matcher
+        for j in iterable:
+            context.reset(j, environ.get_environ() if environ is not None else None)
+            if program is not None:
+                matched = program(context)
+            else:
+                matched, matched_value = matcher.eval(context)
+            if not matched:
+                continue
+            if capture:
+                yield j, JsonMatchResult(context.result)
+            else:
+                yield j
+
+    def match_with_context(self, context):
+        """context 의 문서를 평가한다. 같은 context 로 여러 JsonMatcher 를 평가하면 field 값을 다시 찾지 않는다."""
+        context.clear_result()
+        if self.program is not None:
+            matched = self.program(context)
+        else:
+            matched, matched_value = self.matcher.eval(context)
         if matched:
             r = JsonMatchResult(context.get_result())
             return r
         return
 
+    def match_columns(self, columns):
+        """field name -> column(array-like) 의 행마다 매칭 여부. bool ndarray (NumPy 가 없으면 bool list)
+
+        숫자/문자열 column 의 text, operator, range term 과 AND/OR/NOT 은 NumPy 로 평가하고, 나머지는 결정되지 않은 행만
+        문서를 만들어 평가한다. (columnar.py)
+        """
+        from .columnar import match_columns
+        return match_columns(self.matcher, columns, self.environ.get_environ() if self.environ is not None else None)
+
 
 # Flags
 IMPLICIT_OR = 1 << 0
@@ -725,6 +1459,10 @@ TERM_MATCH_EQUAL = 1 << 2
 TERM_MATCH_CONTAIN = 1 << 3
 
 default_term_match_op = TERM_MATCH_OP_EQUAL
+default_parser = PARSER_PYPARSING
+default_engine = ENGINE_INTERPRETER
+default_regex_engine = REGEX_ENGINE_RE
+regex_validation = REGEX_VALIDATION_OFF
 
 
 def set_default_term_match_op(term_match_option):
@@ -735,8 +1473,58 @@ def set_default_term_match_op(term_match_option):
         default_term_match_op = TERM_MATCH_OP_CONTAIN
 
 
-def compile(expression, flags=0):
-    """compile lucene like query"""
+def set_default_parser(parser):
+    global default_parser
+    if parser not in PARSERS:
+        raise ValueError('Unknown parser: {}'.format(parser))
+    default_parser = parser
+
+
+def set_default_engine(engine):
+    global default_engine
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine: {}'.format(engine))
+    default_engine = engine
+
+
+def set_default_regex_engine(regex_engine):
+    global default_regex_engine
+    if regex_engine not in REGEX_ENGINES:
+        raise ValueError('Unknown regex engine: {}'.format(regex_engine))
+    default_regex_engine = regex_engine
+
+
+def set_regex_validation(validation):
+    """compile 할 때 정규식 검사 (REGEX_VALIDATION_OFF(기본), REGEX_VALIDATION_WARN, REGEX_VALIDATION_STRICT)"""
+    global regex_validation
+    if validation not in REGEX_VALIDATIONS:
+        raise ValueError('Unknown regex validation: {}'.format(validation))
+    regex_validation = validation
+
+
+# compiled query cache
+DEFAULT_CACHE_SIZE = 512
+
+_compiled_cache = LRUCache(DEFAULT_CACHE_SIZE)
+
+
+def cache_info():
+    """return hits/misses/evictions/maxsize/currsize of compiled query cache"""
+    return _compiled_cache.info()
+
+
+def set_cache_size(maxsize):
+    """resize compiled query cache (0: disable, None: unbounded)"""
+    _compiled_cache.resize(maxsize)
+
+
+def clear_cache():
+    """clear compiled query cache"""
+    _compiled_cache.clear()
+
+
+def get_match_ops(flags=0):
+    """flags -> (implicit_bin_op, term_match_op)"""
     implicit_bin_op = IMPLICIT_BIN_OP_AND
     if flags & IMPLICIT_OR:
         implicit_bin_op = IMPLICIT_BIN_OP_OR
@@ -748,16 +1536,53 @@ def compile(expression, flags=0):
         term_match_op = TERM_MATCH_OP_CONTAIN
     if flags & TERM_MATCH_EQUAL:
         term_match_op = TERM_MATCH_OP_EQUAL
-
-    return JsonMatcher(expression, implicit_bin_op, term_match_op)
-
-
-def match(expression, j, flags=0):
+    return implicit_bin_op, term_match_op
+
+
+def compile(expression, flags=0, parser=None, optimize=False, engine=None, regex_engine=None, environ=None):
+    """compile lucene like query
+
+    parser: PARSER_PYPARSING(default) or PARSER_NATIVE (hand-written, faster on long queries)
+    optimize: reorder AND/OR terms by estimated cost (see optimizer.py)
+    engine: ENGINE_INTERPRETER(default) or ENGINE_CODEGEN (query compiled to a python function, see codegen.py)
+    regex_engine: REGEX_ENGINE_RE(default) or REGEX_ENGINE_RE2 (linear time if re2 is installed, see regex_engine.py)
+    environ: MatchEnvironment to bind (keyword sets resolved and expanded regexps compiled once, see JsonMatcher.bind).
+             a matcher bound to an environ is not cached, keep the returned matcher to reuse it
+    """
+    implicit_bin_op, term_match_op = get_match_ops(flags)
+    if parser is None:
+        parser = default_parser
+    if engine is None:
+        engine = default_engine
+    if regex_engine is None:
+        regex_engine = default_regex_engine
+    validation = regex_validation
+
+    if environ is not None:
+        # bind 한 matcher 는 environ(KeywordSetStore 포함)을 참조하므로 cache 에 두지 않는다.
+        return JsonMatcher(expression.strip(), implicit_bin_op, term_match_op, parser, optimize, engine,
+                           regex_engine, validation, environ)
+
+    # 평가 결과는 MatchContext 에 남는다. matcher 가 평가 중에 바꾸는 것은 environ 에서 찾은 것의 cache
+    # (KeywordSetBinding.resolved, CodeMatcher.frame) 뿐이고 통째로 바꾸므로 여러 thread 에서 공유해도 된다.
+    # bind() 는 복사본을 bind 하므로 cache 된 matcher 는 bind 되지 않는다.
+    key = (expression.strip(), implicit_bin_op, term_match_op, parser, optimize, engine, regex_engine, validation)
+    return _compiled_cache.get_or_create(
+        key, lambda: JsonMatcher(key[0], implicit_bin_op, term_match_op, parser, optimize, engine,
+                                 regex_engine, validation))
+
+
+def match(expression, j, flags=0, parser=None, optimize=False, engine=None, regex_engine=None, environ=None):
     """match json with lucene like query"""
-    matcher = compile(expression, flags)
+    matcher = compile(expression, flags, parser, optimize, engine, regex_engine, environ)
     return matcher.match(j)
 
 
-__all__ = ['compile', 'match',
+__all__ = ['compile', 'match', 'cache_info', 'set_cache_size', 'clear_cache', 'DEFAULT_CACHE_SIZE',
            'JsonMatcher', 'JsonMatchResult',
-           'IMPLICIT_OR', 'IMPLICIT_AND', 'TERM_MATCH_EQUAL', 'TERM_MATCH_CONTAIN']
+           'IMPLICIT_OR', 'IMPLICIT_AND', 'TERM_MATCH_EQUAL', 'TERM_MATCH_CONTAIN',
+           'PARSER_PYPARSING', 'PARSER_NATIVE', 'set_default_parser',
+           'ENGINE_INTERPRETER', 'ENGINE_CODEGEN', 'set_default_engine', 'set_leaf_budget',
+           'REGEX_ENGINE_RE', 'REGEX_ENGINE_RE2', 'set_default_regex_engine',
+           'REGEX_VALIDATION_OFF', 'REGEX_VALIDATION_WARN', 'REGEX_VALIDATION_STRICT', 'set_regex_validation',
+           'UnsafeRegexpException', 'UnsafeRegexpWarning', 'UnsafeExpressionException', 'COUNT_OVERLAPPING', 'COUNT_NON_OVERLAPPING']
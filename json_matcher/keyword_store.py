@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""keyword set files (한 줄에 keyword 하나) and hot reload
+
+KeywordSetStore 는 file 이 바뀌면 KeywordSet 을 새로 읽어 정규식/automaton 까지 만든 뒤, 새 MatchEnvironment snapshot 으로
+바꾼다. snapshot 은 만든 뒤 바꾸지 않으므로 매칭 중인 context 는 이전 snapshot 을 끝까지 사용하고, get_environ() 은 lock 을
+잡지 않는다. reload 는 start() 의 background thread 에서 하거나 직접 호출한다.
+쓰는 중인 file 을 읽지 않도록 file 은 다른 이름으로 쓴 뒤 rename 으로 바꾼다.
+
+    >>> store = KeywordSetStore({'bad_words': 'bad_words.txt'})
+    >>> store.start(interval=10)
+    >>> matcher = json_matcher.compile('text:@@{bad_words}', environ=store)  # reload 할 때 새 snapshot 으로 옮겨진다.
+    >>> matcher.match(doc)
+    >>> multi_matcher.match(doc, store.get_environ())
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+import threading
+import weakref
+
+from .match_environ import KeywordSet, MatchEnvironment
+
+
+class KeywordSetStore(object):
+    """name -> file path 의 keyword set 들로 만든 environ snapshot
+
+    environ: file 에서 읽지 않는 keyword set/함수를 가진 environ. (바꾸지 않고 snapshot 을 만든다)
+    """
+    def __init__(self, paths, environ=None, engine=None, encoding='utf-8'):
+        self.paths = dict(paths)
+        self.engine = engine
+        self.encoding = encoding
+        # file 의 (mtime, size). 바뀐 file 만 다시 읽는다.
+        self.file_stats = {}
+        # bind 한 matcher 들 (update_bindings). reload 할 때 새 snapshot 으로 옮긴다.
+        self.matchers = weakref.WeakSet()
+        # reload 끼리만 잡는다. 평가(get_environ)는 잡지 않는다.
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.last_error = None
+        self.environ = (environ or MatchEnvironment()).snapshot()
+        self.reload(force=True)
+
+    def __repr__(self):
+        return 'KeywordSetStore({}, version={})'.format(', '.join(sorted(self.paths)), self.environ.version)
+
+    def get_environ(self):
+        """현재 snapshot. 매칭 하나(MatchContext)에는 같은 snapshot 을 사용한다."""
+        return self.environ
+
+    def register(self, matcher):
+        """reload 할 때 matcher.update_bindings(새 snapshot) 을 호출한다. (JsonMatcher.bind, MultiMatcher)"""
+        self.matchers.add(matcher)
+
+    def get_file_stat(self, path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+
+    def reload(self, force=False):
+        """바뀐 file 이 있으면 새 snapshot 으로 바꾸고 True. file 을 읽지 못하면 예외가 나고 snapshot 은 그대로이다."""
+        with self.lock:
+            keyword_sets = {}
+            file_stats = {}
+            for name, path in self.paths.items():
+                file_stat = self.get_file_stat(path)
+                if not force and self.file_stats.get(name) == file_stat:
+                    continue
+                keyword_sets[name] = KeywordSet.load(name, path, self.engine, self.encoding).build()
+                file_stats[name] = file_stat
+            if not keyword_sets:
+                return False
+
+            environ = self.environ.snapshot(keyword_sets)
+            # 확장한 정규식도 바꾸기 전에 만들어 둔다. 이전 snapshot 으로 평가 중인 matcher 는 이전 것을 계속 사용한다.
+            for matcher in list(self.matchers):
+                matcher.update_bindings(environ)
+            self.environ = environ
+            self.file_stats.update(file_stats)
+            return True
+
+    def start(self, interval=10.0):
+        """interval 초마다 file 을 확인하는 daemon thread 를 시작한다."""
+        if self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(interval,), name='KeywordSetStore')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.reload()
+                self.last_error = None
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                # 쓰는 중이거나 잠시 없는 file 은 다음에 다시 읽는다.
+                self.last_error = e
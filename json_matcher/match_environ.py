@@ -1,22 +1,80 @@
 from __future__ import print_function, unicode_literals
 
+import collections
+import io
+import itertools
 import re
 
-import pydash
+from six import string_types
+
+from .aho_corasick import KeywordMatch, build_automaton
+from .counting import COUNT_OVERLAPPING, count_matches
+from .field_path import get_field_path
+from .regex_engine import REGEX_ENGINE_RE, compile_regexp
 
 KEYWORD_SET_PREFIX = '@@'
 DEFAULT_KEYWORD_SET_NAME = 'keyword'
 
+KEYWORD_ENGINE_REGEXP = 'regexp'
+KEYWORD_ENGINE_AHO_CORASICK = 'aho_corasick'
+KEYWORD_ENGINES = (KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK)
+
+# engine 을 지정하지 않으면 keyword 가 이 개수 이상일 때 Aho-Corasick 을 사용한다. (benchmarks/bench_keyword_set.py)
+AHO_CORASICK_MIN_KEYWORDS = 200
+
 
 class KeywordSet(object):
-    def __init__(self, name, keyword_list=None):
+    """keyword 목록. search/match/count 는 keyword 수에 따라 정규식 또는 Aho-Corasick automaton 을 사용한다.
+
+    engine: None(keyword 수로 선택), KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK
+    정규식 query 안의 @@{name} 은 engine 과 관계없이 정규식으로 확장한다. (expand_regexp)
+    keyword 를 바꾸면 version 이 올라간다. 매칭 중인 keyword set 을 바꾸려면 새 KeywordSet 으로 바꾼 environ 을 만든다.
+    (MatchEnvironment.snapshot, keyword_store.py)
+    """
+    def __init__(self, name, keyword_list=None, engine=None):
+        if engine is not None and engine not in KEYWORD_ENGINES:
+            raise ValueError('Unknown keyword engine: {}'.format(engine))
         self.name = name
+        self.engine = engine
         self.regexp = None
         self.regexp_exact = None
+        self.automaton = None
+        self.keyword_set = None
         self.keyword_list = keyword_list if keyword_list else []
+        self.version = 0
+
+    @classmethod
+    def load(cls, name, path, engine=None, encoding='utf-8'):
+        """한 줄에 keyword 하나인 file 에서 읽는다. 빈 줄은 무시한다."""
+        with io.open(path, encoding=encoding) as f:
+            keyword_list = [line.rstrip('\r\n') for line in f]
+        return cls(name, [keyword for keyword in keyword_list if keyword], engine)
 
     def add_keyword(self, keyword):
         self.keyword_list.append(keyword)
+        self.reset()
+
+    def reset(self):
+        """keyword_list 를 바꾼 뒤 만들어 둔 정규식/automaton 을 버린다."""
+        self.regexp = None
+        self.regexp_exact = None
+        self.automaton = None
+        self.keyword_set = None
+        self.version += 1
+
+    def build(self):
+        """search/match 에 사용할 정규식 또는 automaton 을 미리 만든다."""
+        if self.get_automaton() is None:
+            self.get_regexp()
+            self.get_regexp_exact()
+        return self
+
+    def get_engine(self):
+        if self.engine is not None:
+            return self.engine
+        if len(self.keyword_list) >= AHO_CORASICK_MIN_KEYWORDS:
+            return KEYWORD_ENGINE_AHO_CORASICK
+        return KEYWORD_ENGINE_REGEXP
 
     def get_regexp_str(self, exact=False):
         cleaned_list = list(filter(None, self.keyword_list))
@@ -35,76 +93,287 @@ class KeywordSet(object):
             self.regexp_exact = re.compile(self.get_regexp_str(True))
         return self.regexp_exact
 
+    def get_automaton(self):
+        """Aho-Corasick 을 사용하지 않으면 None. (빈 keyword 만 있는 경우 정규식 '()' 과 같게 정규식을 사용)"""
+        if self.get_engine() != KEYWORD_ENGINE_AHO_CORASICK:
+            return None
+        if self.automaton is None:
+            automaton = build_automaton(self.keyword_list)
+            self.keyword_set = frozenset(automaton.keywords)
+            self.automaton = automaton
+        return self.automaton if len(self.automaton) else None
+
     def expand_regexp(self, base_regexp):
         name = KEYWORD_SET_PREFIX + '{' + self.name + '}'
         my_regexp = self.get_regexp_str()
         return base_regexp.replace(name, my_regexp)
 
     def search(self, value):
+        automaton = self.get_automaton()
+        if automaton is not None:
+            return automaton.search(value)
         return self.get_regexp().search(value)
 
     def match(self, value):
+        automaton = self.get_automaton()
+        if automaton is not None:
+            # '^(...)$' 와 같다. ($ 는 끝의 개행 앞에서도 매칭된다)
+            if value in self.keyword_set:
+                return KeywordMatch(value, 0)
+            if value.endswith('\n') and value[:-1] in self.keyword_set:
+                return KeywordMatch(value[:-1], 0)
+            return None
         return self.get_regexp_exact().match(value)
 
-    def count(self, value):
-        pattern = self.get_regexp()
+    def count(self, value, mode=COUNT_OVERLAPPING, limit=None):
+        """keyword 가 나오는 횟수와 마지막 keyword (counting.py)"""
+        automaton = self.get_automaton()
+        if automaton is not None:
+            if mode == COUNT_OVERLAPPING:
+                return automaton.count(value, limit)
+            return count_matches(automaton.search, value, mode, limit)
+        return count_matches(self.get_regexp().search, value, mode, limit)
 
-        last_matched = ''
-        count = 0
-        start = 0
-        while True:
-            m = pattern.search(value[start:])
-            if not m:
-                break
-            last_matched = m.group()
-            count += 1
-            start += m.start() + 1
-        return count, last_matched
+
+def accepts_sequence(function):
+    """field:!function 에서 wildcard field(*.name) 의 값들을 list 로 한 번에 받는 함수로 표시한다.
+
+    함수는 값마다의 결과를 같은 순서의 sequence 로 반환해야 한다. (CodeMatcher.eval_batch)
+    """
+    function.accepts_sequence = True
+    return function
 
 
 class MatchEnvironment(object):
+    """keyword set 과 함수 목록
+
+    keyword set/함수를 등록하면 version 이 올라간다. environ 에 bind 한 matcher 는 version 이 바뀌었을 때
+    자신이 사용하는 keyword set 의 version(keyword_set_versions) 이 바뀐 경우만 다시 찾는다. (KeywordSetBinding)
+    keyword_sets 를 직접 바꾸면 bind 한 matcher 에 반영되지 않는다.
+
+    snapshot() 으로 만든 environ 은 같은 origin 을 가지며, bind 한 matcher 는 더 최근의 snapshot 으로 넘어간다.
+    version 은 origin 이 같은 environ 들 사이에서 계속 증가한다.
+    """
     def __init__(self):
         self.keyword_sets = {}
         self.functions = {}
+        self.version = 0
+        self.keyword_set_versions = {}
+        self.origin = self
+        self.counter = itertools.count(1)
+
+    def get_environ(self):
+        """평가에 사용할 environ (KeywordSetStore.get_environ 과 같은 형태)"""
+        return self
 
     def put_keyword_set(self, name, keyword_set):
         self.keyword_sets[name] = keyword_set
+        self.version = next(self.counter)
+        self.keyword_set_versions[name] = self.version
 
     def get_keyword_set(self, name):
         return self.keyword_sets.get(name)
 
-    def with_default_keyword_set(self, keyword_set):
+    def copy(self):
         new_environment = MatchEnvironment()
         new_environment.keyword_sets = dict(self.keyword_sets)
-        new_environment.keyword_sets[DEFAULT_KEYWORD_SET_NAME] = keyword_set
+        new_environment.version = self.version
+        new_environment.keyword_set_versions = dict(self.keyword_set_versions)
+        new_environment.counter = self.counter
+        return new_environment
+
+    def with_default_keyword_set(self, keyword_set):
+        new_environment = self.copy()
+        new_environment.put_keyword_set(DEFAULT_KEYWORD_SET_NAME, keyword_set)
+        return new_environment
+
+    def snapshot(self, keyword_sets=None):
+        """keyword_sets(name -> KeywordSet) 를 바꾼 새 environ. 자신은 바꾸지 않으므로 매칭 중에 사용해도 된다."""
+        new_environment = self.copy()
+        new_environment.functions = dict(self.functions)
+        new_environment.origin = self.origin
+        for name, keyword_set in (keyword_sets or {}).items():
+            new_environment.put_keyword_set(name, keyword_set)
         return new_environment
 
     def add_function(self, function_name, function):
         self.functions[function_name] = function
+        self.version = next(self.counter)
 
     def get_functions(self):
         return self.functions
 
 
+# environ 에서 찾은 keyword set. 한 번 만들면 바꾸지 않는다.
+ResolvedKeywordSets = collections.namedtuple('ResolvedKeywordSets', ['environ', 'version', 'name_versions',
+                                                                     'content_versions', 'keyword_sets', 'pattern'])
+
+
+class KeywordSetBinding(object):
+    """term 의 @@{name} 들을 environ 에서 미리 찾은 것. 정규식 term 은 확장한 정규식을 미리 compile 한다.
+
+    environ 의 version 이 바뀌면 names 의 keyword set version 을 비교해서 바뀐 경우만 다시 찾는다.
+    정규식은 keyword set 의 keyword 가 바뀐 경우(KeywordSet.version)에도 다시 compile 한다.
+    찾은 결과(ResolvedKeywordSets)는 통째로 바꾸므로 여러 thread 에서 평가해도 lock 이 필요 없다.
+    origin 이 같은 더 최근의 snapshot 으로 평가하면 그 snapshot 으로 넘어가고, 바로 이전 snapshot 은 계속 사용할 수 있다.
+    """
+    def __init__(self, environ, names, base_regexp=None, regex_engine=REGEX_ENGINE_RE):
+        self.names = names
+        self.base_regexp = base_regexp
+        self.regex_engine = regex_engine
+        self.previous = None
+        self.resolved = self.resolve(environ)
+
+    def __repr__(self):
+        return 'KeywordSetBinding({}, version={})'.format(', '.join(self.names), self.resolved.version)
+
+    @property
+    def environ(self):
+        return self.resolved.environ
+
+    def get_versions(self, environ):
+        versions = getattr(environ, 'keyword_set_versions', None) or {}
+        return [versions.get(name) for name in self.names]
+
+    def get_content_versions(self, keyword_sets):
+        # 정규식만 keyword 에 따라 만들어 둔다. (KeywordSet 은 keyword 가 바뀌면 스스로 다시 만든다)
+        if self.base_regexp is None or keyword_sets is None:
+            return None
+        return [keyword_set.version for keyword_set in keyword_sets]
+
+    def resolve(self, environ):
+        keyword_sets = [environ.get_keyword_set(name) for name in self.names]
+        # 하나라도 없으면 keyword set 을 사용하지 않는다. (MatchContext.has_keyword_set)
+        keyword_sets = keyword_sets if all(keyword_sets) else None
+        pattern = None
+        if keyword_sets is not None and self.base_regexp is not None:
+            pattern = compile_regexp(expand_keyword_sets(self.base_regexp, keyword_sets), 0, self.regex_engine)
+        return ResolvedKeywordSets(environ, getattr(environ, 'version', None), self.get_versions(environ),
+                                   self.get_content_versions(keyword_sets), keyword_sets, pattern)
+
+    def is_current(self, resolved, environ):
+        return (environ.version == resolved.version and
+                resolved.content_versions == self.get_content_versions(resolved.keyword_sets))
+
+    def update(self, environ):
+        """environ 으로 넘어간다. 사용하는 keyword set 이 그대로이면 다시 찾지 않는다."""
+        resolved = self.resolved
+        if (self.get_versions(environ) == resolved.name_versions and
+                resolved.content_versions == self.get_content_versions(resolved.keyword_sets)):
+            updated = resolved._replace(environ=environ, version=environ.version)
+        else:
+            updated = self.resolve(environ)
+        if updated.environ is not resolved.environ:
+            self.previous = resolved
+        self.resolved = updated
+        return updated
+
+    def lookup(self, environ):
+        """environ 에서 찾은 ResolvedKeywordSets. 이 binding 으로 평가할 수 없는 environ 이면 None
+
+        version 이 없는 environ(MatchEnvironment.__init__ 을 부르지 않은 subclass 등)은 bind 한 결과를 사용하지 않는다.
+        """
+        version = getattr(environ, 'version', None)
+        if version is None:
+            return None
+        resolved = self.resolved
+        if resolved.version is None:
+            return None
+        if resolved.environ is environ:
+            if self.is_current(resolved, environ):
+                return resolved
+            return self.update(environ)
+
+        previous = self.previous
+        if previous is not None and previous.environ is environ:
+            return previous if self.is_current(previous, environ) else None
+        origin = getattr(environ, 'origin', None)
+        if origin is not None and origin is getattr(resolved.environ, 'origin', None) and version > resolved.version:
+            return self.update(environ)
+        return None
+
+
+def expand_keyword_sets(base_regexp, keyword_sets):
+    regexp = base_regexp
+    for keyword_set in keyword_sets:
+        regexp = keyword_set.expand_regexp(regexp)
+    return regexp
+
+
 EMPTY_ENVIRONMENT = MatchEnvironment()
 
 
+class NoResult(list):
+    """결과를 남기지 않는 result. 항상 비어 있다. (MatchContext(capture=False))"""
+    def append(self, matched):
+        pass
+
+    def extend(self, matched_list):
+        pass
+
+    def insert(self, idx, matched):
+        pass
+
+    def __iadd__(self, matched_list):
+        return self
+
+
+# 비어 있으므로 context 들이 같이 사용한다.
+NO_RESULT = NoResult()
+
+
 class MatchContext:
+    """capture=False 이면 groups() 의 결과를 모으지 않는다. (JsonMatcher.test, filter)"""
     _contains_dummy_default_object = object()
 
-    def __init__(self, j, environ=None):
+    def __init__(self, j, environ=None, capture=True):
         self.j = j
-        self.result = []
+        self.result = [] if capture else NO_RESULT
         if not environ:
             self.environ = EMPTY_ENVIRONMENT
         else:
             self.environ = environ
+        # 문서(j) 에서 찾은 field 값과 존재 여부. 같은 context 로 여러 query 를 평가해도 field 당 한 번만 찾는다.
+        self.field_values = {}
+        self.field_exists = {}
+        # 여러 rule 이 공유하는 term 의 평가 결과 (multi_matcher.SharedTermMatcher -> (matched, matched_value, result))
+        self.term_results = {}
+
+    def reset(self, j, environ=None):
+        """같은 context 로 다른 문서(j) 를 평가한다. environ 을 주면 바꾼다."""
+        self.j = j
+        del self.result[:]
+        if environ is not None:
+            self.environ = environ
+        if self.field_values:
+            self.field_values.clear()
+        if self.field_exists:
+            self.field_exists.clear()
+        if self.term_results:
+            self.term_results.clear()
 
     def exists(self, name, j=None):
-        j = self.j if j is None else j
-        v = self.get(name, j, self._contains_dummy_default_object)
+        if j is None:
+            key = name if isinstance(name, string_types) else name.field_name
+            exists = self.field_exists.get(key)
+            if exists is None:
+                exists = self.field_exists[key] = self._exists(name, self.j)
+            return exists
+        return self._exists(name, j)
+
+    def _exists(self, name, j):
+        field_path = get_field_path(name)
+        if field_path.has_wildcard:
+            # 찾은 값이 하나라도 있으면 나머지는 훑지 않는다.
+            for v in field_path.iter_values(j, self.j, self._contains_dummy_default_object):
+                if self._has_value(v):
+                    return True
+            return False
+        return self._has_value(self.get(name, j, self._contains_dummy_default_object))
+
+    def _has_value(self, v):
         if isinstance(v, list):
-            for i in list(self.NestedListToList(v)):
+            for i in self.NestedListToList(v):
                 if i is not self._contains_dummy_default_object:
                     return True
             return False
@@ -132,48 +401,37 @@ class MatchContext:
 
     # find the longest path exists in the json
     def find_longest_existing_path(self, field_name, j):
-        if pydash.has(j, field_name):
+        field_path = get_field_path(field_name)
+        if field_path.has(j):
             return field_name
 
         while True:
             split = field_name.rsplit(".", 1)
-            if len(split) == 1 and split[0] != '':
+            if len(split) == 1:
                 return None
             field_name = split[0]
-            if pydash.has(j, field_name):
+            if get_field_path(field_name).has(j):
                 break
         return field_name
 
     def get(self, field_name, j=None, default=None):
-        j = self.j if j is None else j
-
-        # if the field name is *, then get list of all recursive values
-        if field_name == "*":
-            return list(self.DictToValues(j))
-
-        # if the field name start with * (like *.name), then run self.get on all sub values
-        if field_name.startswith("*.") and (isinstance(j, list) or isinstance(j, dict)):
-            values = [self.get(field_name.lstrip("*."), j, default)]
-            for v in j.values():
-                if isinstance(v, list):
-                    for i in v:
-                        values.append(self.get(field_name, i, default))
-                if isinstance(v, dict):
-                    values.append(self.get(field_name, v, default))
-            return values
-
-        if pydash.has(j, field_name):
-            return pydash.get(j, field_name)
-        else:
-            # get the longest path exists in the dict
-            new_field_name = self.find_longest_existing_path(field_name, j)
-            new_value = pydash.get(j, new_field_name)
-            if isinstance(new_value, list) and len(new_value) and isinstance(new_value[0], dict):
-                return [self.get(field_name.lstrip(new_field_name)[1:], nv, default) for nv in new_value]
-            elif isinstance(new_value, dict):
-                return self.get(field_name.lstrip(new_field_name)[1:], new_value)
-
-        return default
+        """field_name(또는 FieldPath) 의 값. 없으면 default
+
+        a.b.c, a[0].b 와 같은 path 를 따라가고, list 안의 dict 들은 각각 찾아서 list 로 반환한다.
+        *.name 은 모든 하위 dict 의 name, * 는 모든 값의 list 이다. (field_path.py 참고)
+        """
+        if j is None and default is None:
+            key = field_name if isinstance(field_name, string_types) else field_name.field_name
+            try:
+                return self.field_values[key]
+            except KeyError:
+                value = self.field_values[key] = get_field_path(field_name).get(None, self.j)
+                return value
+        return get_field_path(field_name).get(j, self.j, default)
+
+    def iter_values(self, field_name, j=None, default=None):
+        """field_name 에서 찾은 값을 하나씩 반환한다. * 가 들어간 path 는 get 처럼 중첩 list 를 만들지 않는다."""
+        return get_field_path(field_name).iter_values(j, self.j, default)
 
     def get_dict(self):
         return self.j
@@ -184,6 +442,9 @@ class MatchContext:
     def get_result(self):
         return self.result
 
+    def clear_result(self):
+        del self.result[:]
+
     KEYWORD_SET_NAME_RE = re.compile(KEYWORD_SET_PREFIX + r'{([^}]*)}')
 
     def extract_keyword_set_names(self, query):
@@ -205,13 +466,17 @@ class MatchContext:
                 return False
         return True
 
-    def expand_regexp(self, base_regexp):
+    def get_keyword_sets(self, names):
+        """names 의 keyword set 목록. environ 에 없는 것이 있으면 None"""
+        keyword_sets = [self.environ.get_keyword_set(name) for name in names]
+        if not keyword_sets or not all(keyword_sets):
+            return None
+        return keyword_sets
+
+    def expand_regexp(self, base_regexp, regex_engine=REGEX_ENGINE_RE):
         names = self.extract_keyword_set_names(base_regexp)
-        regexp = base_regexp
-        for name in names:
-            keyword_set = self.environ.get_keyword_set(name)
-            regexp = keyword_set.expand_regexp(regexp)
-        return re.compile(regexp)
+        keyword_sets = [self.environ.get_keyword_set(name) for name in names]
+        return compile_regexp(expand_keyword_sets(base_regexp, keyword_sets), 0, regex_engine)
 
     def search_keyword_set(self, term, input_value):
         name = self.extract_keyword_set_name(term)
@@ -242,7 +507,7 @@ class MatchContext:
         else:
             return False, None
 
-    def count_keyword_set(self, term, input_value):
+    def count_keyword_set(self, term, input_value, mode=COUNT_OVERLAPPING, limit=None):
         name = self.extract_keyword_set_name(term)
         if not name:
             return False
@@ -250,8 +515,9 @@ class MatchContext:
         keyword_set = self.environ.get_keyword_set(name)
         if not keyword_set:
             return False, None
-        count, last_matched = keyword_set.count(input_value)
+        count, last_matched = keyword_set.count(input_value, mode, limit)
         return count, last_matched
 
 
-__all__ = ['KeywordSet', 'MatchContext', 'MatchEnvironment']
+__all__ = ['KeywordSet', 'MatchContext', 'MatchEnvironment', 'KeywordSetBinding', 'KEYWORD_ENGINE_REGEXP',
+           'KEYWORD_ENGINE_AHO_CORASICK', 'accepts_sequence']
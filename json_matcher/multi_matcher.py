@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""multiple query matcher
+
+여러 rule(query) 을 한 문서에 대해 한 번에 평가한다.
+
+    >>> matcher = compile_many({'rule1': 'service:tistory AND size:>10', 'rule2': 'service:tistory'})
+    >>> matcher.match(dict(service='tistory', size=1))
+    {'rule2'}
+    >>> matcher.match(dict(service='tistory', size=11), with_results=True)['rule1'].groups()
+
+    - rule 들에 같은 term(field 와 값이 같은 matcher) 이 있으면 하나의 matcher 를 공유하고, 문서마다 한 번만 평가한다.
+    - 모든 rule 이 같은 MatchContext 를 사용하므로 field 값은 문서마다 한 번만 찾는다.
+    - 같은 field 의 숫자 비교 term(field:>10, field:[1 TO 5]) 이 많으면 interval tree 로 한 번에 찾는다.
+    - index=True(기본) 이면 rule 의 필수 조건(field:value, _exists_) 으로 만든 index 로
+      매칭될 수 없는 rule 은 평가하지 않는다. (percolator.py, stats() 참고)
+
+같은 field/term 을 사용하는 rule 이 늘어나도 추가되는 비용은 AND/OR 를 따라가며 평가 결과를 꺼내는 것 정도이다.
+각 rule 의 매칭 여부와 groups() 는 rule 을 따로 compile 해서 평가한 것과 같다.
+"""
+from __future__ import print_function, unicode_literals
+
+import re
+
+from six import string_types
+
+from . import json_matcher as matcher_module
+from .field_path import FieldPath
+from .interval_index import NumericTermIndex, is_numeric_term
+from .json_matcher import (JsonMatcher, JsonMatchResult, get_match_ops, update_bindings,
+                           NotMatcher, OrMatcher, AndMatcher, FlatOrMatcher, FlatAndMatcher)
+from .keyword_store import KeywordSetStore
+from .match_environ import MatchContext
+from .percolator import RuleIndex
+
+# field 의 숫자 비교 term 이 이 개수 이상이면 interval index 를 만든다.
+NUMERIC_INDEX_MIN_TERMS = 4
+
+# compile 할 때마다 새로 만들어지는 속성은 term 을 비교할 때 제외한다. (expression 으로 비교)
+IGNORED_ATTRIBUTES = ('compiled', 'pattern', 'alternatives', 'binding', 'frame')
+
+
+def matcher_key(matcher):
+    """matcher 의 구조를 나타내는 hashable 값. key 가 같은 matcher 는 같은 결과를 낸다."""
+    if isinstance(matcher, (list, tuple)):
+        return tuple(matcher_key(m) for m in matcher)
+    if isinstance(matcher, dict):
+        return tuple(sorted((k, matcher_key(v)) for k, v in matcher.items() if k not in IGNORED_ATTRIBUTES))
+    if isinstance(matcher, FieldPath):
+        return matcher.field_name
+    if isinstance(matcher, re.Pattern):
+        return 'pattern', matcher.pattern, matcher.flags
+    if matcher is None or isinstance(matcher, string_types):
+        return matcher
+    if hasattr(matcher, '__dict__'):
+        return type(matcher).__name__, matcher_key(vars(matcher))
+    # 1, 1.0, True 가 같은 key 가 되지 않도록 type 을 함께 둔다.
+    return type(matcher).__name__, matcher
+
+
+class SharedTermMatcher(object):
+    """여러 rule 이 공유하는 term matcher. 문서(context) 마다 한 번만 평가하고 결과를 재사용한다."""
+    def __init__(self, matcher):
+        self.matcher = matcher
+        # 같은 field 의 숫자 비교 term 이 많으면 interval index 로 한 번에 찾는다. (interval_index.py)
+        self.numeric_index = None
+
+    def __repr__(self):
+        return 'Shared({})'.format(self.matcher)
+
+    def eval(self, context):
+        result = context.get_result()
+        term_results = context.term_results
+        cached = term_results.get(self)
+        if cached is None:
+            if self.numeric_index is not None and resolve_numeric_terms(self.numeric_index, context):
+                # 매칭된 term 의 결과는 모두 들어 있다.
+                cached = term_results.get(self)
+                if cached is None:
+                    return False, None
+            else:
+                result_size = len(result)
+                matched, matched_value = self.matcher.eval(context)
+                term_results[self] = (matched, matched_value, result[result_size:])
+                return matched, matched_value
+        matched, matched_value, results = cached
+        result.extend(results)
+        return matched, matched_value
+
+
+def resolve_numeric_terms(numeric_index, context):
+    """문서의 field 값이 숫자이면 index 에서 매칭되는 term 을 찾아 결과를 넣고 True"""
+    term_results = context.term_results
+    resolved = term_results.get(numeric_index)
+    if resolved is None:
+        value = context.get(numeric_index.field_name)
+        matched_terms = numeric_index.search(value)
+        resolved = term_results[numeric_index] = matched_terms is not None
+        if resolved:
+            field_name = numeric_index.field_name
+            for shared, matched_value in matched_terms:
+                term_results[shared] = (True, matched_value, [(field_name, value, matched_value)])
+    return resolved
+
+
+class MultiMatcher(object):
+    """rule_id -> query 를 compile 해서 한 번에 평가한다. (compile_many 참고)"""
+    def __init__(self, rules, implicit_bin_op=matcher_module.IMPLICIT_BIN_OP_AND,
+                 term_match_op=matcher_module.TERM_MATCH_OP_EQUAL, parser=matcher_module.PARSER_PYPARSING,
+                 optimize=False, index=True, regex_engine=matcher_module.REGEX_ENGINE_RE, environ=None):
+        self.terms = {}
+        self.term_count = 0
+        # [(rule_id, matcher tree)]. 작성된 순서로 평가한다.
+        self.rules = []
+        matchers = []
+        for rule_id, query in rules.items():
+            # compile() 의 cache 에 있는 tree 는 다른 곳에서 사용하므로 직접 만든다. (tree 를 바꿈)
+            matcher = JsonMatcher(query.strip(), implicit_bin_op, term_match_op, parser, optimize,
+                                  regex_engine=regex_engine, regex_validation=matcher_module.regex_validation,
+                                  environ=environ).matcher
+            matchers.append(matcher)
+        self.index = RuleIndex(matchers) if index else None
+        for rule_id, matcher in zip(rules, matchers):
+            self.rules.append((rule_id, self.share_terms(matcher)))
+        self.numeric_indexes = self.build_numeric_indexes()
+        self.environ = environ
+        if isinstance(environ, KeywordSetStore):
+            environ.register(self)
+
+    def __repr__(self):
+        return 'MultiMatcher(rules={}, terms={}, unique_terms={})'.format(
+            len(self.rules), self.term_count, len(self.terms))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get_shared_term(self, matcher):
+        self.term_count += 1
+        key = matcher_key(matcher)
+        shared = self.terms.get(key)
+        if shared is None:
+            shared = self.terms[key] = SharedTermMatcher(matcher)
+        return shared
+
+    def build_numeric_indexes(self):
+        """field_name -> NumericTermIndex. 공유 term 이 index 를 사용하도록 연결한다."""
+        numeric_terms = {}
+        for shared in self.terms.values():
+            if is_numeric_term(shared.matcher):
+                numeric_terms.setdefault(shared.matcher.field_name, []).append(shared)
+
+        numeric_indexes = {}
+        for field_name, terms in numeric_terms.items():
+            if len(terms) < NUMERIC_INDEX_MIN_TERMS:
+                continue
+            numeric_index = numeric_indexes[field_name] = NumericTermIndex(field_name, terms, lambda s: s.matcher)
+            for shared in terms:
+                shared.numeric_index = numeric_index
+        return numeric_indexes
+
+    def share_terms(self, matcher):
+        """tree 의 term 들을 공유 matcher 로 바꾼다. (깊은 tree 에서도 재귀하지 않음)"""
+        composite = (NotMatcher, OrMatcher, AndMatcher, FlatOrMatcher, FlatAndMatcher)
+
+        def visit(node):
+            if isinstance(node, composite):
+                stack.append(node)
+                return node
+            return self.get_shared_term(node)
+
+        stack = []
+        root = visit(matcher)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, NotMatcher):
+                node.term = visit(node.term)
+            elif isinstance(node, (OrMatcher, AndMatcher)):
+                node.left = visit(node.left)
+                node.right = visit(node.right)
+            else:
+                node.matchers = [visit(m) for m in node.matchers]
+        return root
+
+    def match(self, j, environ=None, with_results=False):
+        """매칭된 rule_id 의 set. with_results=True 이면 rule_id -> JsonMatchResult 의 dict
+
+        environ 을 주지 않으면 compile 할 때 bind 한 environ(KeywordSetStore 이면 현재 snapshot) 으로 평가한다.
+        """
+        if environ is None and self.environ is not None:
+            environ = self.environ.get_environ()
+        return self.match_with_context(MatchContext(j, environ), with_results)
+
+    def update_bindings(self, environ):
+        """공유 term 들을 environ(같은 origin 의 새 snapshot) 으로 옮긴다. (KeywordSetStore.reload)"""
+        for shared in self.terms.values():
+            update_bindings(shared.matcher, environ)
+
+    def match_with_context(self, context, with_results=False):
+        matched_rules = {} if with_results else set()
+        if self.index is not None:
+            rules = self.rules
+            candidates = (rules[idx] for idx in self.index.candidates(context))
+        else:
+            candidates = self.rules
+        for rule_id, matcher in candidates:
+            context.clear_result()
+            matched, matched_value = matcher.eval(context)
+            if not matched:
+                continue
+            if with_results:
+                matched_rules[rule_id] = JsonMatchResult(context.get_result())
+            else:
+                matched_rules.add(rule_id)
+        context.clear_result()
+        return matched_rules
+
+    def stats(self):
+        """index 로 평가하지 않은 rule 의 비율 등 (index=False 이면 None)"""
+        if self.index is None:
+            return None
+        return self.index.stats()
+
+
+def compile_many(rules, flags=0, parser=None, optimize=False, index=True, regex_engine=None, environ=None):
+    """rules(rule_id -> query) 를 compile 한 MultiMatcher. environ 을 주면 bind 한다. (JsonMatcher.bind)"""
+    implicit_bin_op, term_match_op = get_match_ops(flags)
+    parser = parser or matcher_module.default_parser
+    regex_engine = regex_engine or matcher_module.default_regex_engine
+    return MultiMatcher(rules, implicit_bin_op, term_match_op, parser, optimize, index, regex_engine, environ)
+
+
+__all__ = ['MultiMatcher', 'compile_many']
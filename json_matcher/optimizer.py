@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""cost based query optimizer
+
+compile 된 matcher tree 의 AND/OR 연쇄를 n-ary matcher(FlatAndMatcher/FlatOrMatcher) 로 펼치고,
+비용이 작은 matcher 를 먼저 평가하도록 순서를 정한다.
+
+    exists < exact text < numeric operator/range < wildcard < regexp < code < expression
+
+같은 비용이면 AND 는 매칭될 확률이 낮은 것을, OR 는 높은 것을 먼저 평가한다.
+
+매칭 여부는 바뀌지 않는다. preserve_groups=True 이면 groups() 도 작성된 순서로 평가한 것과 같다.
+
+    - AND 는 매칭되면 작성된 순서로 결과를 다시 붙인다. 매칭되지 않은 AND 의 결과(먼저 매칭된 operand 의 결과)는
+      작성된 순서와 다르므로, 실패한 결과가 groups() 에 나타나지 않는 곳(바깥이 AND 뿐인 곳)에서만 순서를 바꾼다.
+    - OR 는 처음 매칭된 matcher 의 결과가 groups() 에 남으므로, 결과가 보이지 않는 곳이나
+      결과를 남기지 않는 matcher 만 있는 경우에만 순서를 바꾼다.
+"""
+from __future__ import print_function, unicode_literals
+
+from .json_matcher import (TERM_MATCH_OP_CONTAIN,
+                           TextMatcher, RegexpMatcher, MultipleTextMatcher, CountingMatcher, CodeMatcher,
+                           Operator, RangeMatcher, TermMatcher, ExpressionMatcher, ExistsMatcher,
+                           NotMatcher, OrMatcher, AndMatcher, FlatOrMatcher, FlatAndMatcher)
+from .match_environ import KEYWORD_SET_PREFIX
+
+COST_EXISTS = 1
+COST_TEXT = 2
+COST_TEXT_CONTAIN = 3
+COST_OPERATOR = 4
+COST_WILDCARD = 6
+COST_KEYWORD_SET = 8
+COST_REGEXP = 10
+COST_CODE = 20
+COST_EXPRESSION = 30
+# field name 에 * 가 있으면 문서 전체를 훑는다.
+COST_WILDCARD_FIELD = 10
+COST_COUNTING = 10
+
+# 매칭될 확률(추정치)
+SELECTIVITY_EXISTS = 0.9
+SELECTIVITY_TEXT = 0.1
+SELECTIVITY_OPERATOR = 0.5
+SELECTIVITY_PATTERN = 0.3
+SELECTIVITY_UNKNOWN = 0.5
+
+
+class Estimate(object):
+    def __init__(self, cost, selectivity, has_result):
+        self.cost = cost
+        self.selectivity = selectivity
+        # 평가 결과를 context 에 남기는지 (groups() 에 나타나는지)
+        self.has_result = has_result
+
+    def __repr__(self):
+        return 'Estimate(cost={}, selectivity={:.2f}, has_result={})'.format(
+            self.cost, self.selectivity, self.has_result)
+
+
+def estimate_value(matcher):
+    """field value matcher 의 (cost, selectivity)"""
+    if isinstance(matcher, TextMatcher):
+        value = matcher.value
+        if KEYWORD_SET_PREFIX in value:
+            return COST_KEYWORD_SET, SELECTIVITY_PATTERN
+        if '*' in value or '?' in value:
+            return COST_WILDCARD, SELECTIVITY_PATTERN
+        if matcher.term_match_op == TERM_MATCH_OP_CONTAIN:
+            return COST_TEXT_CONTAIN, SELECTIVITY_TEXT
+        return COST_TEXT, SELECTIVITY_TEXT
+    elif isinstance(matcher, RegexpMatcher):
+        return COST_REGEXP, SELECTIVITY_PATTERN
+    elif isinstance(matcher, (Operator, RangeMatcher)):
+        return COST_OPERATOR, SELECTIVITY_OPERATOR
+    elif isinstance(matcher, MultipleTextMatcher):
+        cost, unmatched = 0, 1.0
+        for m in matcher.matchers:
+            c, s = estimate_value(m)
+            cost += c
+            unmatched *= 1 - s
+        return cost, 1 - unmatched
+    elif isinstance(matcher, CountingMatcher):
+        cost, _ = estimate_value(matcher.matcher)
+        return cost + COST_COUNTING, SELECTIVITY_UNKNOWN
+    elif isinstance(matcher, CodeMatcher):
+        return COST_CODE, SELECTIVITY_UNKNOWN
+    return COST_EXPRESSION, SELECTIVITY_UNKNOWN
+
+
+def estimate(matcher):
+    if isinstance(matcher, ExistsMatcher):
+        return Estimate(COST_EXISTS, SELECTIVITY_EXISTS, False)
+    elif isinstance(matcher, ExpressionMatcher):
+        return Estimate(COST_EXPRESSION, SELECTIVITY_UNKNOWN, False)
+    elif isinstance(matcher, TermMatcher):
+        cost, selectivity = estimate_value(matcher.field_value)
+        if '*' in matcher.field_name:
+            cost += COST_WILDCARD_FIELD
+        return Estimate(cost, selectivity, True)
+    elif isinstance(matcher, NotMatcher):
+        e = estimate(matcher.term)
+        return Estimate(e.cost, 1 - e.selectivity, True)
+    elif isinstance(matcher, (AndMatcher, OrMatcher, FlatAndMatcher, FlatOrMatcher)):
+        estimates = [estimate(m) for m in flatten(matcher)]
+        cost = sum(e.cost for e in estimates)
+        has_result = any(e.has_result for e in estimates)
+        if isinstance(matcher, (AndMatcher, FlatAndMatcher)):
+            selectivity = 1.0
+            for e in estimates:
+                selectivity *= e.selectivity
+        else:
+            unmatched = 1.0
+            for e in estimates:
+                unmatched *= 1 - e.selectivity
+            selectivity = 1 - unmatched
+        return Estimate(cost, selectivity, has_result)
+    return Estimate(COST_EXPRESSION, SELECTIVITY_UNKNOWN, True)
+
+
+def flatten(matcher):
+    """같은 종류의 AND/OR 연쇄를 작성된 순서의 목록으로 펼친다. (깊은 연쇄에서도 재귀하지 않음)"""
+    if isinstance(matcher, (AndMatcher, FlatAndMatcher)):
+        class_objects = (AndMatcher, FlatAndMatcher)
+    else:
+        class_objects = (OrMatcher, FlatOrMatcher)
+
+    operands = []
+    stack = [matcher]
+    while stack:
+        m = stack.pop()
+        if isinstance(m, class_objects[0]):
+            stack.append(m.right)
+            stack.append(m.left)
+        elif isinstance(m, class_objects[1]):
+            stack.extend(reversed(m.matchers))
+        else:
+            operands.append(m)
+    return operands
+
+
+def optimize(matcher, preserve_groups=True):
+    """matcher tree 를 펼치고 평가 순서를 정한 새 tree 를 반환한다. (원래 tree 는 바꾸지 않음)"""
+    return _optimize(matcher, preserve_groups, False)
+
+
+def _optimize(matcher, success_visible, failure_visible):
+    """success_visible/failure_visible: matcher 가 매칭된/매칭되지 않은 경우의 결과가 groups() 에 나타날 수 있는지
+
+    AND/NOT 은 실패한 부분의 결과를 지우지 않는다. 실패한 결과는 OR 의 다른 matcher 가 매칭되거나 NOT 이 매칭되면
+    groups() 에 남는다. 가장 바깥이 실패하면 매칭되지 않으므로 결과는 나타나지 않는다.
+    """
+    if isinstance(matcher, NotMatcher):
+        # term 이 매칭되면 NOT 은 실패하고, 매칭되지 않으면 NOT 이 매칭된다.
+        return NotMatcher(_optimize(matcher.term, failure_visible, success_visible))
+
+    if isinstance(matcher, (AndMatcher, FlatAndMatcher)):
+        # operand 가 매칭된 결과는 AND 가 실패해도 남는다.
+        operands = [_optimize(m, success_visible or failure_visible, failure_visible) for m in flatten(matcher)]
+        if failure_visible:
+            return FlatAndMatcher(operands)
+        estimates = [estimate(m) for m in operands]
+        # AND 는 싸고 실패할 확률이 높은 것부터
+        order = sorted(range(len(operands)), key=lambda i: (estimates[i].cost, estimates[i].selectivity))
+        return FlatAndMatcher(operands, order, ordered_result=success_visible)
+
+    if isinstance(matcher, (OrMatcher, FlatOrMatcher)):
+        # operand 가 실패한 결과는 OR 가 매칭되어도 남는다.
+        operands = [_optimize(m, success_visible, success_visible or failure_visible) for m in flatten(matcher)]
+        estimates = [estimate(m) for m in operands]
+        if (success_visible or failure_visible) and any(e.has_result for e in estimates):
+            return FlatOrMatcher(operands)
+        # OR 는 싸고 성공할 확률이 높은 것부터
+        order = sorted(range(len(operands)), key=lambda i: (estimates[i].cost, -estimates[i].selectivity))
+        return FlatOrMatcher(operands, order)
+
+    return matcher
+
+
+__all__ = ['optimize', 'estimate', 'flatten', 'Estimate']
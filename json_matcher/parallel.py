@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""parallel jrep (jrep -j N)
+
+입력 file 들을 줄 경계에서 byte 범위(chunk)로 나누고 process pool 에서 매칭한다. worker 는 시작할 때 query 를 한 번
+compile 하고, chunk 를 받으면 그 범위만 읽어서 매칭된 줄(bytes)을 그대로 반환한다.
+
+    - ordered=True 이면 입력 순서(file, chunk 순서)로 출력하고, False 이면 끝난 chunk 부터 출력한다.
+    - 여러 file 과 directory(recursive) 의 chunk 를 같은 pool 에서 평가한다.
+    - stdin 은 나눌 수 없으므로 chunk_size 만큼 읽고 줄 끝까지 더 읽은 data 를 worker 에 넘긴다.
+    - 평가 중인 chunk 는 worker 수의 몇 배까지만 두므로 stdin 을 미리 모두 읽거나, 결과를 모두 쌓아두지 않는다.
+
+    >>> grep('status:500', ['logs/'], jobs=8, recursive=True)
+"""
+from __future__ import print_function, unicode_literals
+
+import collections
+import io
+import json
+import multiprocessing
+import os
+import sys
+
+from six.moves import queue
+
+from .json_matcher import compile as compile_query
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+# worker 하나당 동시에 넘기는 chunk 수
+PENDING_CHUNKS_PER_JOB = 4
+
+# worker process 의 (matcher, invert_match, ignore_json_error). init_worker 에서 만든다.
+worker_state = None
+
+
+class DirectoryInputError(IOError):
+    """recursive 가 아닌데 directory 가 입력된 경우"""
+    def __init__(self, path):
+        super(DirectoryInputError, self).__init__('{}: Is a directory'.format(path))
+        self.path = path
+
+
+def iter_input_files(paths, recursive=False):
+    """입력 path 들의 file. directory 는 recursive 이면 하위 file 들(이름 순서), 아니면 DirectoryInputError"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        if not recursive:
+            raise DirectoryInputError(path)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+
+
+def split_file(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """file 을 줄 경계에서 나눈 (path, start, end) 목록. 각 chunk 는 chunk_size 보다 크거나 같다. (마지막 제외)"""
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            # 줄 중간이면 줄 끝까지 포함한다.
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((path, start, end))
+            start = end
+    return chunks
+
+
+def iter_stream_chunks(f, chunk_size=DEFAULT_CHUNK_SIZE):
+    """binary stream(stdin) 을 줄 경계에서 나눈 data"""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        if not data.endswith(b'\n'):
+            data += f.readline()
+        yield data
+
+
+def iter_chunks(paths, chunk_size=DEFAULT_CHUNK_SIZE, recursive=False, stdin=None):
+    """pool 에 넘길 chunk 들. file 은 (path, start, end), stdin 은 data. paths 가 비어 있거나 - 이면 stdin"""
+    if not paths or list(paths) == ['-']:
+        for data in iter_stream_chunks(stdin, chunk_size):
+            yield data
+        return
+    for path in iter_input_files(paths, recursive):
+        for chunk in split_file(path, chunk_size):
+            yield chunk
+
+
+def read_chunk(chunk):
+    """chunk 의 줄들 (bytes, \\n 포함). 줄은 \\n 으로만 나눈다."""
+    if not isinstance(chunk, bytes):
+        path, start, end = chunk
+        with open(path, 'rb') as f:
+            f.seek(start)
+            chunk = f.read(end - start)
+    return io.BytesIO(chunk)
+
+
+def init_worker(query, invert_match=False, ignore_json_error=False):
+    global worker_state
+    worker_state = (compile_query(query), invert_match, ignore_json_error)
+
+
+def match_lines(matcher, lines, invert_match=False, ignore_json_error=False):
+    """매칭된(invert_match 이면 매칭되지 않은) 줄들을 이어 붙인 bytes"""
+    matched = []
+    for line in lines:
+        try:
+            j = json.loads(line.decode('utf-8'))
+        except ValueError:
+            if not ignore_json_error:
+                raise
+            continue
+        if matcher.test(j) != invert_match:
+            matched.append(line)
+    return b''.join(matched)
+
+
+def match_chunk(chunk):
+    matcher, invert_match, ignore_json_error = worker_state
+    return match_lines(matcher, read_chunk(chunk), invert_match, ignore_json_error)
+
+
+def get_finished(finished):
+    result = finished.get()
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def iter_results(pool, chunks, ordered=True, window=1):
+    """chunks 를 pool 에서 match_chunk 한 결과. 동시에 window 개까지만 넘긴다."""
+    if ordered:
+        pending = collections.deque()
+        for chunk in chunks:
+            if len(pending) >= window:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(match_chunk, (chunk,)))
+        while pending:
+            yield pending.popleft().get()
+        return
+
+    # 끝난 순서대로 받는다.
+    finished = queue.Queue()
+    running = 0
+    for chunk in chunks:
+        if running >= window:
+            yield get_finished(finished)
+            running -= 1
+        pool.apply_async(match_chunk, (chunk,), callback=finished.put, error_callback=finished.put)
+        running += 1
+    while running:
+        yield get_finished(finished)
+        running -= 1
+
+
+def grep(query, paths, jobs=None, ordered=True, invert_match=False, ignore_json_error=False, recursive=False,
+         chunk_size=DEFAULT_CHUNK_SIZE, output=None, stdin=None):
+    """paths(비어 있거나 - 이면 stdin) 에서 query 에 매칭되는 줄을 output(binary) 에 쓴다. jobs 는 worker 수 (None: cpu 수)"""
+    if output is None:
+        output = getattr(sys.stdout, 'buffer', sys.stdout)
+    if stdin is None:
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    # query 가 잘못되었으면 worker 를 만들기 전에 알린다.
+    compile_query(query)
+
+    jobs = jobs or multiprocessing.cpu_count()
+    chunks = iter_chunks(paths, chunk_size, recursive, stdin)
+    pool = multiprocessing.Pool(jobs, initializer=init_worker, initargs=(query, invert_match, ignore_json_error))
+    try:
+        for data in iter_results(pool, chunks, ordered, jobs * PENDING_CHUNKS_PER_JOB):
+            if data:
+                output.write(data)
+                output.flush()
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""query side inverted index (percolator)
+
+rule 이 많을 때 문서마다 모든 rule 을 평가하지 않고, 매칭될 수 있는 rule(candidate) 만 평가한다.
+
+AND 로 연결된 term 중 반드시 매칭되어야 하는 것을 rule 의 조건으로 사용한다.
+
+    - field:value    (EQUAL, wildcard/keyword set 이 없는 text. 숫자/true/false 로 해석되는 값은 제외)
+    - field:(a b c)  (위와 같은 text 들. 그중 하나)
+    - _exists_:field
+
+rule 마다 조건 중 다른 rule 과 가장 적게 겹치는 하나를 골라 (field, value) 에 등록하고, 문서의 field 값으로 찾는다.
+조건이 없는 rule(OR, NOT 만 있는 경우 등) 은 항상 평가한다.
+
+text 는 문서 값을 문자열로 바꿔 비교하는 경우만 사용하므로, 문서의 값(list/dict 이면 안의 값들) 을
+str 로 바꿔서 찾으면 매칭될 수 있는 rule 을 모두 찾는다. (찾은 rule 은 다시 평가하므로 결과는 같다)
+"""
+from __future__ import print_function, unicode_literals
+
+import collections
+import numbers
+import threading
+
+from six import string_types
+
+from . import json_matcher as matcher_module
+from .json_matcher import (TERM_MATCH_OP_EQUAL, TextMatcher, MultipleTextMatcher, TermMatcher, ExistsMatcher,
+                           AndMatcher, FlatAndMatcher, iter_leaves)
+from .match_environ import KEYWORD_SET_PREFIX
+from .optimizer import flatten
+
+IndexStats = collections.namedtuple('IndexStats', ['rules', 'indexed', 'always', 'documents', 'evaluated',
+                                                   'pruned_ratio'])
+
+# 조건의 종류. 문서에 field 가 있는 경우가 많으므로 text 조건을 먼저 사용한다.
+REQUIRE_TEXT = 0
+REQUIRE_EXISTS = 1
+
+
+def is_indexable_text(matcher):
+    """문서 값을 str 로 바꿔서 value 와 같은지 비교하는 TextMatcher 인지"""
+    if not isinstance(matcher, TextMatcher) or matcher.term_match_op != TERM_MATCH_OP_EQUAL:
+        return False
+    if matcher.wildcard is not None or KEYWORD_SET_PREFIX in matcher.value:
+        return False
+    # 따옴표가 없으면 숫자/boolean 값과 숫자/boolean 으로 비교한다. (따옴표가 있으면 모두 None)
+    return matcher.bool_value is None and matcher.int_value is None and matcher.abs_float_value is None
+
+
+def get_requirement(matcher):
+    """term 이 매칭되려면 필요한 조건 (종류, field_name, [value]). 없으면 None"""
+    if isinstance(matcher, ExistsMatcher):
+        return REQUIRE_EXISTS, matcher.variable_name, None
+    if not isinstance(matcher, TermMatcher) or matcher.field_path.has_wildcard:
+        return None
+
+    field_value = matcher.field_value
+    if is_indexable_text(field_value):
+        return REQUIRE_TEXT, matcher.field_name, [field_value.value]
+    if isinstance(field_value, MultipleTextMatcher) and all(map(is_indexable_text, field_value.matchers)):
+        return REQUIRE_TEXT, matcher.field_name, [m.value for m in field_value.matchers]
+    return None
+
+
+def get_requirements(matcher):
+    """rule 이 매칭되려면 모두 만족해야 하는 조건 목록 (AND 의 operand 중 조건이 있는 것)"""
+    operands = flatten(matcher) if isinstance(matcher, (AndMatcher, FlatAndMatcher)) else [matcher]
+    return [r for r in map(get_requirement, operands) if r is not None]
+
+
+def iter_value_keys(value):
+    """BaseMatcher.eval 이 평가하는 값들을 str 로 바꿔서 반환한다."""
+    if isinstance(value, string_types):
+        yield value
+        return
+    if isinstance(value, numbers.Number):
+        yield str(value)
+        return
+    if isinstance(value, list) and len(value) and isinstance(value[0], dict):
+        return
+    for v in iter_leaves(value, matcher_module.leaf_max_depth, matcher_module.leaf_max_elements):
+        yield v if isinstance(v, string_types) else str(v)
+
+
+class RuleIndex(object):
+    """matcher tree 목록의 조건으로 만든 index. candidates 는 평가해야 하는 matcher 의 위치(작성된 순서)"""
+    def __init__(self, matchers):
+        self.size = len(matchers)
+        # field_name -> value -> [위치], field_name -> [위치]
+        self.terms = {}
+        self.exists = {}
+        self.always = []
+
+        requirements = [get_requirements(matcher) for matcher in matchers]
+        frequency = collections.Counter()
+        for rule_requirements in requirements:
+            for kind, field_name, values in rule_requirements:
+                for value in values or [None]:
+                    frequency[(kind, field_name, value)] += 1
+
+        for idx, rule_requirements in enumerate(requirements):
+            if not rule_requirements:
+                self.always.append(idx)
+                continue
+            # text 조건을 먼저, 그중 다른 rule 과 적게 겹치는 것
+            kind, field_name, values = min(rule_requirements, key=lambda r: (
+                r[0], sum(frequency[(r[0], r[1], v)] for v in r[2] or [None])))
+            if kind == REQUIRE_EXISTS:
+                self.exists.setdefault(field_name, []).append(idx)
+            else:
+                field_terms = self.terms.setdefault(field_name, {})
+                for value in set(values):
+                    field_terms.setdefault(value, []).append(idx)
+
+        # MultiMatcher 는 여러 thread 에서 공유하므로 통계는 lock 안에서 바꾼다.
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.evaluated = 0
+
+    def __repr__(self):
+        return 'RuleIndex(rules={}, always={})'.format(self.size, len(self.always))
+
+    def candidates(self, context):
+        found = set(self.always)
+        for field_name, field_terms in self.terms.items():
+            value = context.get(field_name)
+            if value is None:
+                continue
+            for key in iter_value_keys(value):
+                rules = field_terms.get(key)
+                if rules:
+                    found.update(rules)
+        for field_name, rules in self.exists.items():
+            if context.exists(field_name):
+                found.update(rules)
+
+        with self._lock:
+            self.documents += 1
+            self.evaluated += len(found)
+        return sorted(found)
+
+    def stats(self):
+        """rule 수, index 에 등록된 rule 수, 항상 평가하는 rule 수, 문서 수, 평가한 rule 수, 평가하지 않은 비율"""
+        with self._lock:
+            documents, evaluated = self.documents, self.evaluated
+        total = documents * self.size
+        pruned_ratio = 1 - float(evaluated) / total if total else 0.0
+        return IndexStats(self.size, self.size - len(self.always), len(self.always), documents, evaluated,
+                          pruned_ratio)
+
+    def clear_stats(self):
+        with self._lock:
+            self.documents = 0
+            self.evaluated = 0
+
+
+__all__ = ['RuleIndex', 'IndexStats']
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""hand-written query parser
+
+pyparsing grammar(get_parser) 와 같은 matcher tree 를 만드는 recursive-descent parser.
+pyparsing 의 ordered choice / backtracking 규칙을 그대로 따르므로, 같은 query 에 대해 같은 결과를 만든다.
+pyparsing 구현은 reference 로 유지한다. (tests/test_query_parser.py 에서 두 구현을 비교)
+"""
+from __future__ import print_function, unicode_literals
+
+import re
+import string
+
+from .json_matcher import (JsonMatcherBaseException,
+                           IMPLICIT_BIN_OP_AND, IMPLICIT_BIN_OP_OR, IMPLICIT_BIN_OPS,
+                           TERM_MATCH_OP_EQUAL, TERM_MATCH_OPS,
+                           ValidText, QuotedString,
+                           MultipleTextMatcher, CountingMatcher, CodeMatcher, Operator, RangeMatcher,
+                           NotMatcher, OrMatcher, AndMatcher,
+                           build_text_matcher, build_term_matcher,
+                           escape_regexp_term, escape_raw_regexp_term)
+
+# pyparsing 의 기본 whitespace
+WHITESPACE_RE = re.compile(r'[ \n\t\r]*')
+
+FIELD_NAME_RE = re.compile(r'[a-zA-Z_*@][a-zA-Z0-9_*@.\[\]]*')
+CODE_RE = re.compile(r'([^\s]+)')
+TEXT_RE = re.compile(r'([^\s\)]+)')
+RANGE_TEXT_RE = re.compile(r'([^\s\]\}]+)')
+QUOTED_STRING_RE = re.compile(r'"(?:[^"\n\r])*"')
+REGEXP_STRING_RE = re.compile(r'/(?:(?:\\/)|(?:\\.)|(?:[^/\n\r\\]))*/')
+REGEXP_OPTION_RE = re.compile(r'[i]')
+WHITESPACE_ESCAPE_RE = re.compile(r'\\[tnfr]')
+WHITESPACE_ESCAPES = {'\\t': '\t', '\\n': '\n', '\\f': '\f', '\\r': '\r'}
+
+RAW_REGEXP_DELIMETER = '/~/'
+COMPARE_OPS = ['<=', '<', '>=', '>', '=']
+COUNT_NAME = 'COUNT'
+START_OF_CODE = '!'
+
+# keyword 앞뒤에 올 수 없는 문자 (pyparsing.Keyword.DEFAULT_KEYWORD_CHARS)
+KEYWORD_CHARS = frozenset((string.ascii_letters + string.digits + '_$').upper())
+
+
+class QuerySyntaxError(JsonMatcherBaseException):
+    def __init__(self, query, loc, expected):
+        self.query = query
+        self.loc = loc
+        self.expected = expected
+
+    def __str__(self):
+        return 'Expected {} (at char {})'.format(self.expected, self.loc)
+
+    def __repr__(self):
+        return 'QuerySyntaxError({!r}, {}, {!r})'.format(self.query, self.loc, self.expected)
+
+
+class Tokenizer(object):
+    """query string 위를 움직이는 tokenizer
+
+    query 의 위치마다 올 수 있는 token 의 종류가 다르므로 (field value 와 range value 는 허용 문자가 다르다)
+    parser 가 필요한 token 을 요청하는 방식으로 동작한다. 모든 token 앞의 whitespace 는 무시한다.
+    실패한 경우 위치는 변하지 않는다.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.length = len(query)
+        self.pos = 0
+        self.furthest = 0
+
+    def _skip(self):
+        return WHITESPACE_RE.match(self.query, self.pos).end()
+
+    def _advance(self, pos):
+        self.pos = pos
+        if pos > self.furthest:
+            self.furthest = pos
+
+    def at_end(self):
+        return self._skip() == self.length
+
+    def literal(self, text):
+        pos = self._skip()
+        if not self.query.startswith(text, pos):
+            return None
+        self._advance(pos + len(text))
+        return text
+
+    def keyword(self, text):
+        """case insensitive keyword. 앞뒤로 keyword 문자가 붙어 있으면 keyword 가 아니다."""
+        pos = self._skip()
+        end = pos + len(text)
+        if self.query[pos:end].upper() != text:
+            return None
+        if pos > 0 and self.query[pos - 1].upper() in KEYWORD_CHARS:
+            return None
+        if end < self.length and self.query[end].upper() in KEYWORD_CHARS:
+            return None
+        self._advance(end)
+        return text
+
+    def regex(self, pattern):
+        pos = self._skip()
+        m = pattern.match(self.query, pos)
+        if not m:
+            return None
+        self._advance(m.end())
+        return m.group()
+
+    def skip_to(self, text):
+        """text 직전까지의 문자열을 반환한다. (text 는 소비하지 않음)"""
+        pos = self._skip()
+        end = self.query.find(text, pos)
+        if end < 0:
+            return None
+        self._advance(end)
+        return self.query[pos:end]
+
+
+class QueryParser(object):
+    """lucene like query -> matcher tree
+
+    grammar (우선순위가 낮은 것부터)
+        expression     := and_expression (OR and_expression)*
+        and_expression := not_expression (AND not_expression)*
+        not_expression := (NOT | '!') not_expression | term
+        term           := field_name ':' field_value | '(' expression ')'
+    implicit_bin_op 에 해당하는 operator 는 생략할 수 있다.
+    """
+
+    def __init__(self, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
+        if implicit_bin_op not in IMPLICIT_BIN_OPS or term_match_op not in TERM_MATCH_OPS:
+            raise ValueError('No parser for ({}, {})'.format(implicit_bin_op, term_match_op))
+        self.implicit_bin_op = implicit_bin_op
+        self.term_match_op = term_match_op
+        self.tokenizer = None
+
+    def parse(self, query):
+        # pyparsing.parseString 과 동일하게 tab 을 확장한다.
+        query = query.expandtabs()
+        self.tokenizer = Tokenizer(query)
+        try:
+            matcher = self.parse_expression()
+            if matcher is None or not self.tokenizer.at_end():
+                loc = self.tokenizer.furthest
+                raise QuerySyntaxError(query, loc, 'end of text' if matcher is not None else 'expression')
+            return matcher
+        finally:
+            self.tokenizer = None
+
+    #
+    # operators
+    #
+    def _restore(self, pos):
+        self.tokenizer.pos = pos
+
+    def match_and(self):
+        t = self.tokenizer
+        matched = t.keyword('AND') or t.literal('&&')
+        return bool(matched) or self.implicit_bin_op == IMPLICIT_BIN_OP_AND
+
+    def match_or(self):
+        t = self.tokenizer
+        matched = t.keyword('OR') or t.literal('||')
+        return bool(matched) or self.implicit_bin_op == IMPLICIT_BIN_OP_OR
+
+    def match_not(self):
+        t = self.tokenizer
+        return bool(t.keyword('NOT') or t.literal('!'))
+
+    def _parse_chain(self, match_operator, parse_operand, class_object):
+        # 긴 OR/AND 목록에서도 재귀가 깊어지지 않도록 반복문으로 처리한다.
+        left = parse_operand()
+        if left is None:
+            return None
+        while True:
+            pos = self.tokenizer.pos
+            if not match_operator():
+                break
+            right = parse_operand()
+            if right is None:
+                self._restore(pos)
+                break
+            left = class_object(left, right)
+        return left
+
+    def parse_expression(self):
+        return self._parse_chain(self.match_or, self.parse_and_expression, OrMatcher)
+
+    def parse_and_expression(self):
+        return self._parse_chain(self.match_and, self.parse_not_expression, AndMatcher)
+
+    def parse_not_expression(self):
+        pos = self.tokenizer.pos
+        if self.match_not():
+            term = self.parse_not_expression()
+            if term is not None:
+                return NotMatcher(term)
+            self._restore(pos)
+        return self.parse_term()
+
+    def parse_term(self):
+        t = self.tokenizer
+        pos = t.pos
+
+        name = t.regex(FIELD_NAME_RE)
+        if name is not None and t.literal(':'):
+            value = self.parse_field_value()
+            if value is not None:
+                return build_term_matcher(name, value)
+        self._restore(pos)
+
+        if t.literal('('):
+            matcher = self.parse_expression()
+            if matcher is not None and t.literal(')'):
+                return matcher
+        self._restore(pos)
+        return None
+
+    #
+    # field values
+    #
+    def parse_field_value(self):
+        for parse in (self.parse_code_value, self.parse_count_value,
+                      self.parse_multiple_value, self.parse_operate_value,
+                      self.parse_range_value, self.parse_text_value):
+            pos = self.tokenizer.pos
+            value = parse()
+            if value is not None:
+                return value
+            self._restore(pos)
+        return None
+
+    def parse_code_value(self):
+        if not self.tokenizer.literal(START_OF_CODE):
+            return None
+        code = self.parse_quoted_string()
+        if code is None:
+            code = self.parse_valid_text(CODE_RE)
+        if code is None:
+            return None
+        return CodeMatcher(code.value)
+
+    def parse_count_value(self):
+        t = self.tokenizer
+        if not t.literal(COUNT_NAME) or not t.literal('('):
+            return None
+        matcher = self.parse_text_value()
+        if matcher is None or not t.literal(')'):
+            return None
+        op = self.parse_compare_op()
+        if op is None:
+            return None
+        condition_value = self.parse_valid_text(TEXT_RE)
+        if condition_value is None:
+            return None
+        return CountingMatcher(matcher, op, condition_value)
+
+    def parse_multiple_value(self):
+        t = self.tokenizer
+        if not t.literal('('):
+            return None
+        values = []
+        while True:
+            value = self.parse_quoted_string()
+            if value is None:
+                value = self.parse_regexp_string()
+            if value is None:
+                value = self.parse_valid_text(TEXT_RE)
+            if value is None:
+                break
+            values.append(value)
+        if not values or not t.literal(')'):
+            return None
+        return MultipleTextMatcher(values, self.term_match_op)
+
+    def parse_operate_value(self):
+        op = self.parse_compare_op()
+        if op is None:
+            return None
+        value = self.parse_valid_text(TEXT_RE)
+        if value is None:
+            value = self.parse_quoted_string()
+        if value is None:
+            return None
+        return Operator(op, value)
+
+    def parse_range_value(self):
+        t = self.tokenizer
+        if t.literal('['):
+            incl, close = True, ']'
+        elif t.literal('{'):
+            incl, close = False, '}'
+        else:
+            return None
+        start = t.regex(RANGE_TEXT_RE)
+        if start is None or not t.keyword('TO'):
+            return None
+        stop = t.regex(RANGE_TEXT_RE)
+        if stop is None or not t.literal(close):
+            return None
+        return RangeMatcher(incl, start, stop)
+
+    def parse_text_value(self):
+        pos = self.tokenizer.pos
+        for parse in (self.parse_quoted_string, self.parse_raw_regexp_string,
+                      self.parse_regexp_string, lambda: self.parse_valid_text(TEXT_RE)):
+            value = parse()
+            if value is not None:
+                return build_text_matcher(value, self.term_match_op)
+            self._restore(pos)
+        return None
+
+    #
+    # strings
+    #
+    def parse_compare_op(self):
+        for op in COMPARE_OPS:
+            if self.tokenizer.literal(op):
+                return op
+        return None
+
+    def parse_valid_text(self, pattern):
+        text = self.tokenizer.regex(pattern)
+        if text is None:
+            return None
+        return ValidText(text)
+
+    def parse_quoted_string(self):
+        quoted = self.tokenizer.regex(QUOTED_STRING_RE)
+        if quoted is None:
+            return None
+        value = WHITESPACE_ESCAPE_RE.sub(lambda m: WHITESPACE_ESCAPES[m.group()], quoted[1:-1])
+        return QuotedString(value)
+
+    def parse_regexp_option(self):
+        option = self.tokenizer.regex(REGEXP_OPTION_RE)
+        return [option] if option is not None else []
+
+    def parse_regexp_string(self):
+        regexp = self.tokenizer.regex(REGEXP_STRING_RE)
+        if regexp is None:
+            return None
+        return escape_regexp_term([regexp] + self.parse_regexp_option())
+
+    def parse_raw_regexp_string(self):
+        t = self.tokenizer
+        if not t.literal(RAW_REGEXP_DELIMETER):
+            return None
+        regexp = t.skip_to(RAW_REGEXP_DELIMETER)
+        if regexp is None:
+            return None
+        t.literal(RAW_REGEXP_DELIMETER)
+        tokens = [RAW_REGEXP_DELIMETER, regexp, RAW_REGEXP_DELIMETER] + self.parse_regexp_option()
+        return escape_raw_regexp_term(tokens)
+
+
+def parse_query(query, implicit_bin_op=IMPLICIT_BIN_OP_AND, term_match_op=TERM_MATCH_OP_EQUAL):
+    return QueryParser(implicit_bin_op, term_match_op).parse(query)
+
+
+__all__ = ['QueryParser', 'QuerySyntaxError', 'parse_query']
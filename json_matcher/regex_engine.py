@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""regex engine for RegexpMatcher
+
+    - REGEX_ENGINE_RE: python re (backtracking, 기본)
+    - REGEX_ENGINE_RE2: RE2 binding(import re2) 이 있으면 사용한다. 선형 시간에 검색하므로 (a+)+b 와 같은 pattern 도
+      입력에 따라 멈추지 않는다. 설치되어 있지 않거나 RE2 가 지원하지 않는 문법(역참조, lookaround 등) 이면 re 를 사용한다.
+      RE2 의 \\d, \\w, \\s, \\b 는 ASCII 만 매칭하므로 이들을 사용하는 pattern 도 re 를 사용한다. (결과가 바뀌지 않음)
+
+find_backtracking 은 re 로 compile 되는 pattern 에서 catastrophic backtracking 이 생길 수 있는 구조를 찾는다. (heuristic)
+
+    - 중첩된 반복 중 반복을 어디서 끝낼지 여러 방법이 있는 것: (a+)+, (a*)*, (\\w+\\s?)+, (.*a){10}
+      ((\\d+\\.)+ 처럼 구분 문자가 있으면 제외)
+    - 반복 안에서 같은 문자로 시작할 수 있는 선택: (a|a)*, (.|x)*
+"""
+from __future__ import print_function, unicode_literals
+
+import re
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+REGEX_ENGINE_RE = 're'
+REGEX_ENGINE_RE2 = 're2'
+REGEX_ENGINES = [REGEX_ENGINE_RE, REGEX_ENGINE_RE2]
+
+# compile 할 때 pattern 검사
+REGEX_VALIDATION_OFF = 'off'
+REGEX_VALIDATION_WARN = 'warn'
+REGEX_VALIDATION_STRICT = 'strict'
+REGEX_VALIDATIONS = [REGEX_VALIDATION_OFF, REGEX_VALIDATION_WARN, REGEX_VALIDATION_STRICT]
+
+
+class UnsafeRegexpWarning(UserWarning):
+    pass
+
+
+def compile_regexp(pattern, flags=0, engine=REGEX_ENGINE_RE):
+    """engine 으로 pattern 을 compile 한다. RE2 를 사용할 수 없으면 re"""
+    if engine == REGEX_ENGINE_RE2 and re2 is not None and not uses_unicode_classes(pattern, flags):
+        try:
+            return re2.compile(('(?i)' if flags & re.IGNORECASE else '') + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
+def uses_unicode_classes(pattern, flags=0):
+    """re 에서는 unicode 문자도 매칭하고 RE2 에서는 ASCII 만 매칭하는 \\d, \\w, \\s, \\b (와 \\D 등) 를 사용하는지"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        # re 로 compile 해서 오류를 알린다.
+        return True
+    if parsed.state.flags & re.ASCII:
+        return False
+    return _has_category(parsed)
+
+
+def _has_category(subpattern):
+    for op, av in subpattern:
+        if op == sre_constants.IN:
+            if any(item_op == sre_constants.CATEGORY for item_op, item_av in av):
+                return True
+        elif op == sre_constants.AT:
+            if av in (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY):
+                return True
+        elif op in REPEATS or op == POSSESSIVE_REPEAT:
+            if _has_category(av[2]):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_category(branch) for branch in av[1]):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _has_category(av[-1]):
+                return True
+        elif op == ATOMIC_GROUP:
+            if _has_category(av):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_category(av[1]):
+                return True
+        elif op == sre_constants.GROUPREF_EXISTS:
+            if any(p is not None and _has_category(p) for p in av[1:]):
+                return True
+    return False
+
+
+def is_backtracking(compiled):
+    """re(backtracking engine) 로 compile 된 pattern 인지"""
+    return isinstance(compiled, re.Pattern)
+
+
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+# 되돌아가지 않는 반복/그룹 (3.11~)
+POSSESSIVE_REPEAT = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+# 반복 횟수가 이 이상이면(또는 제한이 없으면) 중첩된 반복을 검사한다.
+MANY_REPEATS = 10
+ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+
+# 문자 집합은 아래 문자들 중 매칭되는 것으로 비교한다. (latin-1 과 몇 가지 unicode 문자)
+SAMPLE_CHARS = frozenset(list(range(256)) + [ord(ch) for ch in '\u00a0\u2003\u0663\uac00\u017f\u212a'])
+CATEGORY_REGEXPS = {
+    sre_constants.CATEGORY_DIGIT: r'\d', sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+    sre_constants.CATEGORY_SPACE: r'\s', sre_constants.CATEGORY_NOT_SPACE: r'\S',
+    sre_constants.CATEGORY_WORD: r'\w', sre_constants.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+def _category_chars(category):
+    regexp = re.compile(CATEGORY_REGEXPS.get(category, r'[\s\S]'))
+    return frozenset(c for c in SAMPLE_CHARS if regexp.match(chr(c)))
+
+
+def _with_case(chars, flags):
+    if not flags & re.IGNORECASE:
+        return frozenset(chars)
+    cased = set(chars)
+    for c in chars:
+        cased.update(map(ord, [chr(c).lower()[:1] or chr(c), chr(c).upper()[:1] or chr(c)]))
+    return frozenset(cased)
+
+
+def _charset(items, flags):
+    chars = set()
+    negate = False
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            chars.add(av)
+        elif op == sre_constants.RANGE:
+            chars.update(c for c in SAMPLE_CHARS if av[0] <= c <= av[1])
+            chars.update(av)
+        elif op == sre_constants.CATEGORY:
+            chars.update(_category_chars(av))
+        else:
+            chars.update(SAMPLE_CHARS)
+    chars = _with_case(chars, flags)
+    return SAMPLE_CHARS - chars if negate else chars
+
+
+def _first(subpattern, flags):
+    """subpattern 이 처음 매칭할 수 있는 문자들과 빈 문자열을 매칭할 수 있는지 (chars, nullable)"""
+    chars = set()
+    for op, av in subpattern:
+        if op in ZERO_WIDTH:
+            continue
+        item_chars, nullable = _item_first(op, av, flags)
+        chars.update(item_chars)
+        if not nullable:
+            return frozenset(chars), False
+    return frozenset(chars), True
+
+
+def _item_first(op, av, flags):
+    if op == sre_constants.LITERAL:
+        return _with_case([av], flags), False
+    if op == sre_constants.NOT_LITERAL:
+        return SAMPLE_CHARS - _with_case([av], flags), False
+    if op == sre_constants.ANY:
+        return SAMPLE_CHARS, False
+    if op == sre_constants.IN:
+        return _charset(av, flags), False
+    if op == sre_constants.SUBPATTERN:
+        return _first(av[-1], flags)
+    if op == ATOMIC_GROUP:
+        return _first(av, flags)
+    if op in REPEATS or op == POSSESSIVE_REPEAT:
+        chars, nullable = _first(av[2], flags)
+        return chars, nullable or av[0] == 0
+    if op == sre_constants.BRANCH:
+        chars, nullable = set(), False
+        for branch in av[1]:
+            branch_chars, branch_nullable = _first(branch, flags)
+            chars.update(branch_chars)
+            nullable = nullable or branch_nullable
+        return frozenset(chars), nullable
+    # 역참조 등은 알 수 없으므로 무엇이든 매칭할 수 있다고 본다.
+    return SAMPLE_CHARS, True
+
+
+def _expand(subpattern):
+    """그룹을 풀어서 순서대로 매칭하는 항목 목록으로 만든다."""
+    items = []
+    for op, av in subpattern:
+        if op == sre_constants.SUBPATTERN:
+            items.extend(_expand(av[-1]))
+        elif op not in ZERO_WIDTH:
+            items.append((op, av))
+    return items
+
+
+def _has_ambiguous_repeat(subpattern, follow, flags):
+    """subpattern 안의 길이가 바뀌는 반복이 바로 뒤에 오는 문자(follow: subpattern 뒤에 올 수 있는 문자 포함)와
+    겹치는 문자로 시작하거나 빈 문자열을 매칭하는지. (반복을 어디서 끝낼지 여러 방법이 있음)"""
+    items = _expand(subpattern)
+    for idx, (op, av) in enumerate(items):
+        rest_chars, rest_nullable = _first(items[idx + 1:], flags)
+        item_follow = rest_chars | follow if rest_nullable else rest_chars
+        if op in REPEATS and av[0] != av[1]:
+            body_chars, body_nullable = _first(av[2], flags)
+            if body_nullable or body_chars & item_follow:
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_ambiguous_repeat(branch, item_follow, flags) for branch in av[1]):
+                return True
+    return False
+
+
+def _has_overlapping_branch(branches, flags):
+    """같은 문자로 시작할 수 있거나 둘 다 빈 문자열을 매칭하는 선택이 있는지"""
+    firsts = [_first(branch, flags) for branch in branches]
+    for idx, (chars, nullable) in enumerate(firsts):
+        for other_chars, other_nullable in firsts[idx + 1:]:
+            if chars & other_chars or (nullable and other_nullable):
+                return True
+    return False
+
+
+def _find(subpattern, flags, in_repeat, reasons):
+    for op, av in subpattern:
+        if op in (POSSESSIVE_REPEAT, ATOMIC_GROUP):
+            continue
+        if op in REPEATS:
+            min_count, max_count, body = av
+            repeated = max_count > 1 and (max_count >= MANY_REPEATS or in_repeat)
+            if repeated and _has_ambiguous_repeat(body, _first(body, flags)[0], flags):
+                reasons.append('nested quantifier')
+                continue
+            _find(body, flags, in_repeat or repeated, reasons)
+        elif op == sre_constants.BRANCH:
+            if in_repeat and _has_overlapping_branch(av[1], flags):
+                reasons.append('overlapping alternation in quantifier')
+                continue
+            for branch in av[1]:
+                _find(branch, flags, in_repeat, reasons)
+        elif op == sre_constants.SUBPATTERN:
+            _find(av[-1], flags, in_repeat, reasons)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _find(av[1], flags, in_repeat, reasons)
+        elif op == sre_constants.GROUPREF_EXISTS:
+            for p in av[1:]:
+                if p is not None:
+                    _find(p, flags, in_repeat, reasons)
+
+
+def find_backtracking(pattern, flags=0):
+    """catastrophic backtracking 이 생길 수 있는 구조의 목록 (없으면 [])"""
+    reasons = []
+    parsed = sre_parse.parse(pattern, flags)
+    # (?i) 처럼 pattern 안에서 지정한 flag 포함
+    _find(parsed, parsed.state.flags, False, reasons)
+    return reasons
+
+
+__all__ = ['REGEX_ENGINE_RE', 'REGEX_ENGINE_RE2', 'REGEX_VALIDATION_OFF', 'REGEX_VALIDATION_WARN',
+           'REGEX_VALIDATION_STRICT', 'UnsafeRegexpWarning', 'compile_regexp', 'find_backtracking',
+           'uses_unicode_classes']
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""prebuilt alternatives for MultipleTextMatcher
+
+field:(a b c /x/ *y*) 는 값마다 text/regexp matcher 를 순서대로 평가한다. (str 변환, keyword set 검사,
+fnmatch 변환을 matcher 마다 반복) compile 할 때 matcher 들을 종류별로 모아서 한 번에 찾는다.
+
+    - EQUAL text: frozenset 대신 값 -> 위치 dict (가장 앞의 matcher)
+    - CONTAIN text: 앞에서부터 'in' 검사. 많으면 Aho-Corasick automaton (aho_corasick.py)
+    - wildcard, 정규식: 종류별로 모두 합친 정규식 하나로 먼저 검사하고, 매칭되면 앞에서부터 pattern 을 검사한다.
+      (역참조/named group/inline flag 를 사용하거나 RE 가 아닌 regex_engine 의 정규식이 있으면 합치지 않음)
+    - 따옴표가 없는 숫자/true/false text 는 숫자/boolean 입력과 숫자/boolean 으로 비교한다. (TextMatcher.eval_one)
+    - keyword set(@@{name}) 이 있는 것은 하나씩 평가한다.
+
+여러 matcher 가 매칭되면 그중 가장 앞에 있는 matcher 의 결과를 반환하므로 하나씩 평가한 것과 결과가 같다.
+"""
+from __future__ import print_function, unicode_literals
+
+import numbers
+import re
+
+from six import string_types
+
+from .aho_corasick import build_automaton
+from .json_matcher import (TERM_MATCH_OP_CONTAIN, WILDCARD_PREFIX, WILDCARD_SUFFIX, WILDCARD_INFIX,
+                           TextMatcher, RegexpMatcher, match_wildcard)
+from .match_environ import MatchContext, AHO_CORASICK_MIN_KEYWORDS
+from .regex_engine import REGEX_ENGINE_RE
+
+# 다른 정규식과 합치면 의미가 바뀌는 문법 (역참조, named group, 조건, inline flag)
+UNCOMBINABLE_REGEXP = re.compile(r'\\[1-9]|\\g|\(\?P|\(\?\(|\(\?[aiLmsux]+\)')
+
+
+def is_typed_text(matcher):
+    return isinstance(matcher, TextMatcher) and not matcher.quoted
+
+
+def wildcard_regexp(wildcard):
+    """TextMatcher.wildcard 와 같은 문자열을 match 하는 정규식 (filter 에 합치기 위한 것)"""
+    kind, operand = wildcard
+    if kind == WILDCARD_PREFIX:
+        return re.escape(operand)
+    elif kind == WILDCARD_SUFFIX:
+        return r'(?s:.*{})\Z'.format(re.escape(operand))
+    elif kind == WILDCARD_INFIX:
+        return '(?s:.*{})'.format(re.escape(operand))
+    return operand.pattern
+
+
+def build_filter(parts, template):
+    """parts 중 하나라도 매칭되면 매칭되는 정규식. 2개 이상일 때만 만든다."""
+    if len(parts) < 2:
+        return None
+    try:
+        return re.compile(template.format('|'.join('(?:{})'.format(part) for part in parts)))
+    except (re.error, OverflowError, RecursionError):
+        return None
+
+
+class Literals(object):
+    """wildcard 가 없는 text 들. search 는 best 보다 앞에서 매칭되는 (위치, matched_value). 없으면 (None, None)"""
+    def __init__(self, items):
+        self.exact = {}
+        self.contains = []
+        for idx, matcher in items:
+            if matcher.term_match_op == TERM_MATCH_OP_CONTAIN:
+                self.contains.append((idx, matcher.value))
+            else:
+                self.exact.setdefault(matcher.value, idx)
+
+        self.automaton = None
+        if len(self.contains) >= AHO_CORASICK_MIN_KEYWORDS:
+            # keyword index -> 처음 나온 위치. 빈 문자열은 automaton 에 없으므로 따로 둔다. (항상 포함됨)
+            first = {}
+            for idx, value in self.contains:
+                first.setdefault(value, idx)
+            self.empty = first.pop('', None)
+            self.automaton = build_automaton(value for _, value in self.contains)
+            self.keyword_indexes = [first[keyword] for keyword in self.automaton.keywords]
+
+    def search(self, value, best):
+        idx = self.exact.get(value)
+        if idx is not None and idx < best:
+            best, matched_value = idx, value
+        else:
+            idx, matched_value = None, None
+
+        if self.automaton is not None:
+            keywords, keyword_indexes = self.automaton.keywords, self.keyword_indexes
+            if self.empty is not None and self.empty < best:
+                idx, matched_value = best, matched_value = self.empty, ''
+            for _, index in self.automaton.iter_matches(value):
+                if keyword_indexes[index] < best:
+                    idx, matched_value = best, matched_value = keyword_indexes[index], keywords[index]
+            return idx, matched_value
+
+        for contain_idx, literal in self.contains:
+            if contain_idx >= best:
+                break
+            if literal in value:
+                return contain_idx, literal
+        return idx, matched_value
+
+
+class TextAlternatives(object):
+    """MultipleTextMatcher 의 matcher 목록을 미리 나눠둔 것. eval_one 은 matcher 를 순서대로 평가한 것과 같다."""
+    def __init__(self, matchers):
+        self.matchers = matchers
+        self.size = len(matchers)
+        # keyword set 이 있어서 하나씩 평가하는 matcher [(위치, matcher)]
+        self.dynamic = []
+        # wildcard 는 [(위치, TextMatcher.wildcard)], 정규식은 [(위치, compile 된 pattern)] (search)
+        self.wildcards = []
+        self.regexps = []
+
+        literals = []
+        regexp_parts = []
+        for idx, matcher in enumerate(matchers):
+            value = matcher.value
+            if matcher.keyword_set_names:
+                self.dynamic.append((idx, matcher))
+            elif isinstance(matcher, RegexpMatcher):
+                self.regexps.append((idx, matcher.pattern))
+                if matcher.regex_engine == REGEX_ENGINE_RE and not UNCOMBINABLE_REGEXP.search(value):
+                    group = '(?i:{})' if matcher.flags & re.IGNORECASE else '(?:{})'
+                    regexp_parts.append(group.format(value))
+            elif matcher.wildcard is not None:
+                # compile 할 때 만든 wildcard 를 사용한다. (fnmatch 변환을 다시 하지 않음)
+                self.wildcards.append((idx, matcher.wildcard))
+            else:
+                literals.append((idx, matcher))
+
+        # 하나라도 매칭되는지 먼저 검사하는 정규식. 보통은 매칭되지 않으므로 pattern 을 하나씩 검사하지 않는다.
+        # (named group 으로 어느 것이 매칭되었는지 찾으면 re 의 prefix 최적화가 적용되지 않아 느리다)
+        self.wildcard_filter = build_filter([wildcard_regexp(wildcard) for _, wildcard in self.wildcards], r'\A(?:{})')
+        self.regexp_filter = build_filter(regexp_parts, '{}') if len(regexp_parts) == len(self.regexps) else None
+
+        # 숫자/boolean 입력과 숫자/boolean 으로 비교하는 text. int 로 비교하는 것 -> 위치, float 로 비교하는 것 [(위치, abs)]
+        self.int_values = {}
+        self.float_values = []
+        self.bool_values = {}
+        number_typed = set()
+        bool_typed = set()
+        for idx, matcher in literals:
+            if not is_typed_text(matcher):
+                continue
+            if matcher.bool_value is not None:
+                self.bool_values.setdefault(matcher.bool_value, idx)
+                bool_typed.add(idx)
+            if matcher.int_value is not None:
+                self.int_values.setdefault(matcher.int_value, idx)
+                number_typed.add(idx)
+            elif matcher.abs_float_value is not None:
+                self.float_values.append((idx, matcher.abs_float_value))
+                number_typed.add(idx)
+        # int 로 비교하는 text 는 입력을 int 로 바꿀 수 없으면(nan) float 로 비교한다.
+        self.int_float_values = []
+        for idx, matcher in literals:
+            if idx in number_typed and matcher.abs_float_value is not None:
+                self.int_float_values.append((idx, matcher.abs_float_value))
+
+        # 입력 종류별로 문자열로 비교하는 text
+        self.text_literals = Literals(literals)
+        self.number_literals = Literals([item for item in literals if item[0] not in number_typed]) \
+            if number_typed else self.text_literals
+        self.bool_literals = Literals([item for item in literals if item[0] not in bool_typed]) \
+            if bool_typed else self.text_literals
+
+    def eval_each(self, input_value, context):
+        for matcher in self.matchers:
+            matched, matched_value = matcher.eval_one(input_value, context)
+            if matched:
+                return matched, matched_value
+        return False, None
+
+    def eval_one(self, input_value, context):
+        best, matched_value = self.size, None
+        if isinstance(input_value, string_types):
+            value = input_value
+            literals = self.text_literals
+        elif isinstance(input_value, bool):
+            idx = self.bool_values.get(input_value)
+            if idx is not None:
+                best, matched_value = idx, input_value
+            value = str(input_value)
+            literals = self.bool_literals
+        elif isinstance(input_value, (int, float)) and (self.int_values or self.float_values):
+            try:
+                best, matched_value = self.search_number(input_value)
+            except OverflowError:
+                # int(inf) 등은 하나씩 평가할 때와 같게 처리한다.
+                return self.eval_each(input_value, context)
+            value = str(input_value)
+            literals = self.number_literals
+        elif isinstance(input_value, (int, float)):
+            value = str(input_value)
+            literals = self.number_literals
+        elif isinstance(input_value, numbers.Number) and (self.int_values or self.float_values):
+            # Decimal 등
+            return self.eval_each(input_value, context)
+        else:
+            value = str(input_value)
+            literals = self.text_literals
+
+        idx, literal = literals.search(value, best)
+        if idx is not None and idx < best:
+            best, matched_value = idx, literal
+
+        if self.wildcards and (self.wildcard_filter is None or self.wildcard_filter.match(value)):
+            for idx, wildcard in self.wildcards:
+                if idx >= best:
+                    break
+                if match_wildcard(wildcard, value):
+                    best, matched_value = idx, value
+                    break
+
+        if self.regexps and (self.regexp_filter is None or self.regexp_filter.search(value)):
+            for idx, pattern in self.regexps:
+                if idx >= best:
+                    break
+                m = pattern.search(value)
+                if m:
+                    best, matched_value = idx, m.group()
+                    break
+
+        for idx, matcher in self.dynamic:
+            if idx >= best:
+                break
+            matched, dynamic_value = matcher.eval_one(input_value, context)
+            if matched:
+                return matched, dynamic_value
+
+        if best < self.size:
+            return True, matched_value
+        return False, None
+
+    def search_number(self, input_value):
+        """숫자 입력과 숫자로 비교하는 text 중 가장 앞에서 매칭되는 것 (위치, matched_value)"""
+        best = self.size
+        try:
+            int_value = int(input_value)
+        except ValueError:
+            int_value = None
+
+        if int_value is None:
+            # nan: float 로 비교한다. (int 로 비교하는 text 도)
+            float_values = self.int_float_values
+        else:
+            best = self.int_values.get(int_value, best)
+            float_values = self.float_values
+
+        if float_values:
+            abs_value = abs(float(input_value))
+            for idx, abs_float_value in float_values:
+                if idx >= best:
+                    break
+                if abs_float_value - abs_value < 1e-09:
+                    best = idx
+                    break
+        if best < self.size:
+            return best, input_value
+        return best, None
+
+
+__all__ = ['TextAlternatives']
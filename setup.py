@@ -27,7 +27,7 @@ setuptools.setup(
     packages=packages,
     platforms='any',
 
-    install_requires=['pydash', 'pyparsing', 'six'],
+    install_requires=['pyparsing', 'six'],
 
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+
+import pytest
+
+import json_matcher
+from json_matcher import KeywordSet, MatchContext, MatchEnvironment
+from json_matcher import KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK
+from json_matcher import match_environ
+from json_matcher.aho_corasick import AhoCorasick, build_automaton
+from json_matcher.counting import COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING
+
+KEYWORD_LISTS = [
+    ['A', 'B', 'C'],
+    ['he', 'she', 'his', 'hers'],
+    ['abcd', 'bc', 'abc', 'b', 'cd'],
+    ['ab', 'abab', 'ab', '', 'ba'],
+    ['대출', '대출금', '보험', '출금'],
+    ['a.b', '(x)', '*', 'a\nb'],
+]
+
+VALUES = ['', 'A', 'xAyBzC', 'ushers', 'hishershe', 'abcdabcd', 'xbcx', 'abababa', 'bab',
+          '저금리 대출금 보험', '대출\n', 'he\n', 'a.b (x) * a\nb', 'nothing here']
+
+
+def random_keywords(r, count, alphabet='abc'):
+    return [''.join(r.choice(alphabet) for _ in range(r.randint(1, 4))) for _ in range(count)]
+
+
+def same_result(keyword_list, value):
+    expected_set = KeywordSet('keyword', keyword_list, engine=KEYWORD_ENGINE_REGEXP)
+    actual_set = KeywordSet('keyword', keyword_list, engine=KEYWORD_ENGINE_AHO_CORASICK)
+    for method in ['search', 'match']:
+        expected = getattr(expected_set, method)(value)
+        actual = getattr(actual_set, method)(value)
+        assert bool(actual) == bool(expected), (method, keyword_list, value)
+        if expected:
+            assert (actual.group(), actual.start(), actual.end()) == \
+                (expected.group(), expected.start(), expected.end()), (method, keyword_list, value)
+    for mode in [COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING]:
+        for limit in [None, 1, 2, 3]:
+            assert actual_set.count(value, mode, limit) == expected_set.count(value, mode, limit), \
+                (keyword_list, value, mode, limit)
+
+
+@pytest.mark.parametrize('keyword_list', KEYWORD_LISTS)
+def test_same_as_regexp(keyword_list):
+    for value in VALUES + keyword_list:
+        same_result(keyword_list, value)
+
+
+def test_random_same_as_regexp():
+    r = random.Random(0)
+    for _ in range(300):
+        keyword_list = random_keywords(r, r.randint(1, 12))
+        value = random_keywords(r, 1, 'abcd')[0] * r.randint(1, 5)
+        same_result(keyword_list, value)
+        same_result(keyword_list, r.choice(keyword_list))
+
+
+def test_count_limit():
+    # 같은 위치에서 시작하는 더 긴 keyword 가 나중에 끝나도 keyword_list 에서 앞에 있는 것이 마지막 keyword 이다.
+    same_result(['bb', 'b'], 'bb\nb')
+    assert KeywordSet('keyword', ['bb', 'b'], engine=KEYWORD_ENGINE_AHO_CORASICK).count('bb\nb', limit=1) == (1, 'bb')
+    assert KeywordSet('keyword', ['abc', 'b'], engine=KEYWORD_ENGINE_AHO_CORASICK).count('abc', limit=1) == \
+        (1, 'abc')
+
+
+def test_automaton():
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers', 'he'])
+    assert automaton.keywords == ['he', 'she', 'his', 'hers']
+    assert automaton.max_length == 4
+    assert sorted(automaton.iter_matches('ushers')) == [(4, 0), (4, 1), (6, 3)]
+    assert automaton.search('ushers').group() == 'she'
+    assert automaton.count('ushers') == (2, 'he')
+    assert automaton.search('xyz') is None
+    assert automaton.count('xyz') == (0, '')
+    assert len(build_automaton(['a', 'b'])) == 2
+
+
+def test_engine_selection(monkeypatch):
+    assert KeywordSet('keyword', ['A']).get_engine() == KEYWORD_ENGINE_REGEXP
+    monkeypatch.setattr(match_environ, 'AHO_CORASICK_MIN_KEYWORDS', 2)
+    keyword_set = KeywordSet('keyword', ['A', 'B'])
+    assert keyword_set.get_engine() == KEYWORD_ENGINE_AHO_CORASICK
+    assert keyword_set.search('xB').group() == 'B'
+    assert keyword_set.automaton is not None
+    assert keyword_set.regexp is None
+
+    # 빈 keyword 만 있으면 정규식 '()' 과 같게 동작한다.
+    keyword_set = KeywordSet('keyword', ['', ''], engine=KEYWORD_ENGINE_AHO_CORASICK)
+    assert keyword_set.search('x').group() == ''
+
+    with pytest.raises(ValueError):
+        KeywordSet('keyword', ['A'], engine='unknown')
+
+
+@pytest.mark.parametrize('engine', [KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK])
+def test_query(engine):
+    keyword_list = ['word{}'.format(i) for i in range(1000)]
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', keyword_list, engine=engine))
+
+    def match(query, value, flags=0):
+        return json_matcher.compile(query, flags).match_with_context(MatchContext({'field': value}, environ))
+
+    assert [tuple(m) for m in match('field:@@{keyword}', 'word999').groups()] == [('field', 'word999', 'word999')]
+    assert not match('field:@@{keyword}', 'a word999')
+    r = match('field:@@{keyword}', 'a word99 word1', json_matcher.TERM_MATCH_CONTAIN)
+    assert [tuple(m) for m in r.groups()] == [('field', 'a word99 word1', 'word9')]
+    assert match('field:@@{keyword}', 'a word99 word1', json_matcher.TERM_MATCH_CONTAIN)
+    # word1 과 word12 는 시작 위치가 같으므로 2 개
+    assert match('field:COUNT(@@{keyword})=2', 'word1 word12')
+    assert not match('field:COUNT(@@{keyword})>2', 'word1 word12')
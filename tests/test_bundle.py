@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import json_matcher
+from json_matcher import MatchEnvironment, MatchContext
+from json_matcher.bundle import (build_bundle, save_bundle, load_bundle, load_or_build_bundle,
+                                 get_rules_hash, StaleBundleException)
+
+RULES = {
+    'text': 'A:안녕 B:세상아',
+    'regexp': 'A:/[a-z]+\\d/i',
+    'range': 'size:{10 TO 20} OR size:>100',
+    'code': 'A:!function_true',
+    'expr': '_expr_:"A.B > 10"',
+    'count': 'text:COUNT(/match\\d/)>=2',
+    'not': 'NOT A:x*',
+}
+
+
+def test_bundle_round_trip(tmpdir):
+    path = str(tmpdir.join('rules.bundle'))
+    bundle = build_bundle(RULES)
+    save_bundle(bundle, path)
+
+    loaded = load_bundle(path, get_rules_hash(RULES))
+    assert sorted(loaded) == sorted(RULES)
+    assert loaded['regexp'].matcher.field_value.pattern.flags == bundle['regexp'].matcher.field_value.pattern.flags
+
+    assert loaded['text'].match(dict(A='안녕', B='세상아'))
+    assert loaded['regexp'].match(dict(A='ABC1'))
+    assert loaded['range'].match(dict(size=15))
+    assert not loaded['range'].match(dict(size=20))
+    assert loaded['expr'].match(dict(A=dict(B=11)))
+    assert loaded['count'].match(dict(text='match1 match2'))
+    assert loaded['not'].match(dict(A='y'))
+
+    environ = MatchEnvironment()
+    environ.add_function('function_true', lambda t: True)
+    assert loaded['code'].match_with_context(MatchContext(dict(A=1), environ))
+
+
+def test_bundle_stale(tmpdir):
+    path = str(tmpdir.join('rules.bundle'))
+    bundle = load_or_build_bundle(path, RULES)
+    assert os.path.exists(path)
+    assert load_or_build_bundle(path, RULES).source_hash == bundle.source_hash
+
+    changed = dict(RULES, text='A:changed')
+    with pytest.raises(StaleBundleException):
+        load_bundle(path, get_rules_hash(changed))
+    with pytest.raises(StaleBundleException):
+        load_bundle(path, get_rules_hash(RULES, json_matcher.IMPLICIT_OR))
+    with pytest.raises(StaleBundleException):
+        load_bundle(path, get_rules_hash(RULES, parser=json_matcher.PARSER_NATIVE))
+    assert load_bundle(path, get_rules_hash(RULES, parser=json_matcher.PARSER_PYPARSING))
+
+    rebuilt = load_or_build_bundle(path, changed)
+    assert rebuilt.source_hash != bundle.source_hash
+    assert rebuilt['text'].match(dict(A='changed'))
+    assert load_bundle(path).source_hash == rebuilt.source_hash
+
+    with open(path, 'wb') as f:
+        f.write(b'broken')
+    assert load_or_build_bundle(path, changed)['text'].match(dict(A='changed'))
+
+
+def test_rules_hash_rule_id_type():
+    assert get_rules_hash({1: 'A:x', '1': 'A:y'}) != get_rules_hash({'1': 'A:x', 1: 'A:y'})
+    assert get_rules_hash({1: 'A:x'}) != get_rules_hash({'1': 'A:x'})
+    assert get_rules_hash({'1': 'A:x', 1: 'A:y'}) == get_rules_hash({1: 'A:y', '1': 'A:x'})
+
+
+def test_bundle_load_without_pyparsing(tmpdir):
+    path = str(tmpdir.join('rules.bundle'))
+    save_bundle(build_bundle(RULES), path)
+
+    code = ('import sys\n'
+            'from json_matcher.bundle import load_bundle\n'
+            'bundle = load_bundle(sys.argv[1])\n'
+            'assert bundle["regexp"].match(dict(A="abc1"))\n'
+            'assert "pyparsing" not in sys.modules\n')
+    subprocess.check_call([sys.executable, '-c', code, path])
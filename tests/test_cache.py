@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+
+from json_matcher.cache import LRUCache
+
+
+def test_lru_eviction_order():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert cache.info().evictions == 1
+
+
+def test_lru_disabled_and_unbounded():
+    cache = LRUCache(0)
+    assert cache.get_or_create('a', lambda: 1) == 1
+    assert len(cache) == 0
+
+    cache = LRUCache(None)
+    for i in range(1000):
+        cache.put(i, i)
+    assert len(cache) == 1000
+
+
+def test_lru_get_or_create_threads():
+    cache = LRUCache(16)
+    created = []
+
+    def factory():
+        created.append(1)
+        return object()
+
+    results = []
+
+    def worker():
+        results.append(cache.get_or_create('key', factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(map(id, results))) == 1
+    assert cache.info().hits + cache.info().misses == 8
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import itertools
+import pickle
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchEnvironment, MatchContext, KeywordSet
+from tests import test_json_matcher
+from tests.test_optimizer import QUERIES as OPTIMIZER_QUERIES, DOCS as OPTIMIZER_DOCS, groups
+from tests.test_query_parser import suite_test_names
+
+QUERIES = OPTIMIZER_QUERIES + [
+    'a:x',
+    'a:*x*',
+    'a:"1"',
+    'a:true',
+    'a:1.5',
+    'a:>="10"',
+    'a:<1.5',
+    'a:=x',
+    'a:[1 TO 3]',
+    'a:{1 TO 3}',
+    'a:[a TO c]',
+    'a:/^X/i',
+    'a.b.c:1',
+    'a.b:x OR a.c:y',
+    'a[0]:1',
+    'l.b:x',
+    '*.b:x',
+    '*:x',
+    'a:@@{keyword}',
+    'a:/x@@{keyword}/',
+    '@id:x',
+]
+
+DOCS = OPTIMIZER_DOCS + [
+    dict(a='x'),
+    dict(a='Xax'),
+    dict(a='1'),
+    dict(a=True),
+    dict(a=False),
+    dict(a=1.5),
+    dict(a=None),
+    dict(a='10'),
+    dict(a='b'),
+    dict(a=[1, 2]),
+    dict(a=['x', 'y']),
+    dict(a=dict(b=dict(c=1), c='y')),
+    dict(a=dict(b='x')),
+    dict(l=[dict(b='y'), dict(b='x')]),
+    {'@id': 'x'},
+    {'a.b': 'x'},
+]
+
+
+def environment():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x', 'ax']))
+    return environ
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('implicit_bin_op,term_match_op',
+                         list(itertools.product(jm.IMPLICIT_BIN_OPS, jm.TERM_MATCH_OPS)))
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(query, implicit_bin_op, term_match_op, optimize):
+    interpreter = jm.JsonMatcher(query, implicit_bin_op, term_match_op, optimize=optimize)
+    codegen = jm.JsonMatcher(query, implicit_bin_op, term_match_op, optimize=optimize, engine=jm.ENGINE_CODEGEN)
+    for doc in DOCS:
+        for environ in [None, environment()]:
+            expected = interpreter.match_with_context(MatchContext(doc, environ))
+            actual = codegen.match_with_context(MatchContext(doc, environ))
+            assert groups(actual) == groups(expected), (query, doc)
+
+
+@pytest.mark.parametrize('name', suite_test_names())
+def test_suite_with_codegen(name):
+    json_matcher.set_default_engine(json_matcher.ENGINE_CODEGEN)
+    try:
+        getattr(test_json_matcher, name)()
+    finally:
+        json_matcher.set_default_engine(json_matcher.ENGINE_INTERPRETER)
+
+
+def test_compile_option():
+    json_matcher.clear_cache()
+    matcher = json_matcher.compile('a:x', engine=json_matcher.ENGINE_CODEGEN)
+    assert matcher.program is not None
+    assert 'def _match(context):' in matcher.program.source
+    assert json_matcher.compile('a:x').program is None
+    with pytest.raises(ValueError):
+        json_matcher.compile('a:x', engine='unknown')
+
+
+def test_pickle():
+    matcher = jm.JsonMatcher('a:x AND b:>1', engine=jm.ENGINE_CODEGEN)
+    loaded = pickle.loads(pickle.dumps(matcher))
+    assert loaded.program is not None
+    assert groups(loaded.match(dict(a='x', b=2))) == [('a', 'x', 'x'), ('b', 2, 2)]
+
+
+def test_deep_query():
+    depth = 80
+    query = '(' * depth + 'A:x' + ' AND B:y)' * depth
+    matcher = json_matcher.compile(query, parser=json_matcher.PARSER_NATIVE, engine=json_matcher.ENGINE_CODEGEN)
+    assert matcher.match(dict(A='x', B='y'))
+    assert not matcher.match(dict(A='x', B='z'))
+
+    query = ' OR '.join('field{}:value{}'.format(i, i) for i in range(2000))
+    matcher = json_matcher.compile(query, parser=json_matcher.PARSER_NATIVE, engine=json_matcher.ENGINE_CODEGEN)
+    assert groups(matcher.match(dict(field1999='value1999'))) == [('field1999', 'value1999', 'value1999')]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchEnvironment, KeywordSet
+from json_matcher.columnar import build_document
+
+QUERIES = [
+    'i:200', 'i:>500', 'i:[100 TO 300]', 'i:{100 TO 300}', 'i:(200 404 500)', 'i:"200"', 'i:2*', 'i:1.5', 'i:abc',
+    'i:>=abc', 'f:2', 'f:<0.5', 'f:[0 TO 1]', 'f:0.25', 'f:"0.25"', 's:GET', 's:(GET HEAD)', 's:G*', 's:*T',
+    's:*E*', 's:G?T', 's:>HEAD', 's:[GET TO POST]', 's:[1 TO 2]', 's:/^P/', 's:COUNT(T)>=1', 'b:true', 'o:x', 'o:>1',
+    'i:>500 AND s:GET', 'i:>500 OR s:GET', 'NOT i:200', 'NOT (i:200 OR s:(GET HEAD))', 'i:>500 AND s:/^P/',
+    '_exists_:o', '_expr_:"i > f"', 'missing:1', 'missing:1 OR i:200', 'a.b:x', 'a.b:x AND NOT a.c:>1', 'a:x',
+    '*.b:x', 'i:200 s:GET f:<0.5', 's:@@{keyword}', 's:/@@{keyword}/',
+]
+
+
+def make_columns(count, seed=0):
+    r = random.Random(seed)
+    return {
+        'i': [r.choice([200, 404, 500, 301, -7, 0]) for _ in range(count)],
+        'f': [r.choice([0.25, 2.7, -2.0, float('nan'), 1.5, 0.0]) for _ in range(count)],
+        's': [r.choice(['GET', 'HEAD', 'POST', 'PUT', '', 'GOT', '1.5']) for _ in range(count)],
+        'b': [r.choice([True, False]) for _ in range(count)],
+        'o': [r.choice([None, 'x', 2, [1, 'x'], {'k': 1}]) for _ in range(count)],
+        'a.b': [r.choice(['x', 'y']) for _ in range(count)],
+        'a.c': [r.choice([0, 1, 2]) for _ in range(count)],
+    }
+
+
+def match_rows(matcher, columns, environ=None):
+    # ndarray 의 행은 python 값(tolist)으로 평가한다.
+    names = list(columns)
+    values = [list(columns[name].tolist() if hasattr(columns[name], 'tolist') else columns[name]) for name in names]
+    return [bool(matcher.match_with_context(json_matcher.MatchContext(build_document(names, row), environ)))
+            for row in zip(*values)]
+
+
+def make_environ():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['PU', 'HEAD']))
+    return environ
+
+
+def test_build_document():
+    assert build_document(['a.b', 'a.c', 'd'], [1, 2, 3]) == {'a': {'b': 1, 'c': 2}, 'd': 3}
+    with pytest.raises(ValueError):
+        build_document(['a', 'a.b'], [1, 2])
+
+
+def test_match_columns_rows():
+    # NumPy 가 없어도 행마다 평가한 결과를 반환한다.
+    columns = make_columns(50)
+    for query in QUERIES:
+        matcher = jm.JsonMatcher(query, environ=make_environ())
+        assert list(matcher.match_columns(columns)) == match_rows(matcher, columns, make_environ()), query
+    with pytest.raises(ValueError):
+        jm.JsonMatcher('i:1').match_columns({'i': [1, 2], 's': ['x']})
+
+
+def test_match_columns_numpy():
+    numpy = pytest.importorskip('numpy')
+    columns = make_columns(300, seed=1)
+    arrays = dict(columns, i=numpy.array(columns['i']), f=numpy.array(columns['f']), s=numpy.array(columns['s']),
+                  b=numpy.array(columns['b']))
+    environ = make_environ()
+    for optimize in [False, True]:
+        for query in QUERIES:
+            matcher = jm.JsonMatcher(query, optimize=optimize, environ=environ)
+            expected = match_rows(matcher, columns, environ)
+            for values in [columns, arrays]:
+                mask = matcher.match_columns(values)
+                assert mask.dtype == bool
+                assert mask.tolist() == expected, query
+
+
+def test_match_columns_numpy_types():
+    numpy = pytest.importorskip('numpy')
+    # NumPy 가 하나의 dtype 으로 바꾸면 결과가 달라지는 list 는 바꾸지 않는다.
+    columns = {'v': [1, 2.5, True, 'x', None, 2 ** 70, 2 ** 53 + 1]}
+    for query in ['v:1', 'v:"1"', 'v:true', 'v:>2', 'v:[1 TO 3]', 'v:x', 'v:>9007199254740992']:
+        matcher = jm.JsonMatcher(query)
+        assert matcher.match_columns(columns).tolist() == match_rows(matcher, columns), query
+
+    big = {'v': numpy.array([2 ** 53 + 1, 2 ** 62, -2 ** 62, 5], dtype=numpy.int64),
+           'f': numpy.array([float('inf'), 3.0, -float('inf'), 1e300])}
+    for query in ['v:>9007199254740992', 'v:9007199254740993', 'v:5', 'v:99999999999999999999', 'f:3', 'f:>1',
+                  'f:1e300', 'f:[1 TO 1e301]']:
+        matcher = jm.JsonMatcher(query)
+        try:
+            expected = match_rows(matcher, big)
+        except OverflowError:
+            with pytest.raises(OverflowError):
+                matcher.match_columns(big)
+            continue
+        assert matcher.match_columns(big).tolist() == expected, query
+
+
+def test_match_columns_numpy_fallback_rows():
+    numpy = pytest.importorskip('numpy')
+    calls = []
+    environ = MatchEnvironment()
+    environ.add_function('check', lambda v: calls.append(v) or True)
+    matcher = jm.JsonMatcher('i:>500 AND s:!check', environ=environ)
+    columns = {'i': numpy.array([1, 600, 2, 700]), 's': numpy.array(['a', 'b', 'c', 'd'])}
+    assert matcher.match_columns(columns).tolist() == [False, True, False, True]
+    # 행마다 평가하는 term 은 결정되지 않은 행만 평가한다.
+    assert calls == ['b', 'd']
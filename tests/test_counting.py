@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pickle
+import random
+import re
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import KeywordSet, MatchContext, MatchEnvironment
+from json_matcher import KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK
+from json_matcher import COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING
+from json_matcher.counting import count_matches, count_text, get_count_limit
+
+
+def slice_count(pattern, value):
+    # 이전 구현 (남은 문자열을 잘라서 검색)
+    last_matched = ''
+    count = 0
+    start = 0
+    while start <= len(value):
+        m = pattern.search(value[start:])
+        if not m:
+            break
+        last_matched = m.group()
+        start += m.start() + 1
+        count += 1
+    return count, last_matched
+
+
+@pytest.mark.parametrize('regexp', ['a', 'aa', 'a+', 'ab|b', '[ab]{2}', 'x'])
+def test_count_matches_overlapping(regexp):
+    pattern = re.compile(regexp)
+    for value in ['', 'a', 'aaaa', 'abab', 'babba', 'xaxbx']:
+        assert count_matches(pattern.search, value) == slice_count(pattern, value)
+
+
+def test_count_matches_non_overlapping():
+    pattern = re.compile('aa')
+    assert count_matches(pattern.search, 'aaaaa', COUNT_OVERLAPPING) == (4, 'aa')
+    assert count_matches(pattern.search, 'aaaaa', COUNT_NON_OVERLAPPING) == (2, 'aa')
+    pattern = re.compile('a+')
+    assert count_matches(pattern.search, 'aab', COUNT_NON_OVERLAPPING) == (1, 'aa')
+
+
+def test_count_matches_empty_match():
+    pattern = re.compile('a*')
+    assert count_matches(pattern.search, 'bab', COUNT_OVERLAPPING) == (4, '')
+    assert count_matches(pattern.search, 'bab', COUNT_NON_OVERLAPPING) == (len(pattern.findall('bab')), '')
+
+
+def test_count_matches_position():
+    # 문자열을 자르지 않으므로 ^ 는 처음에서만, lookbehind 는 앞의 문자를 본다.
+    assert count_matches(re.compile('^a').search, 'aaa') == (1, 'a')
+    assert count_matches(re.compile('(?<=a)b').search, 'abab') == (2, 'b')
+
+
+def test_count_matches_limit():
+    pattern = re.compile(r'\d')
+    assert count_matches(pattern.search, 'a1b2c3d4', limit=2) == (2, '2')
+    assert count_matches(pattern.search, 'a1b2c3d4', limit=10) == (4, '4')
+
+
+def test_count_text():
+    assert count_text('aa', 'aaaaa') == 2
+    assert count_text('aa', 'aaaaa', COUNT_OVERLAPPING) == 4
+    assert count_text('aa', 'aaaaa', COUNT_OVERLAPPING, limit=3) == 3
+    assert count_text('', 'abc', COUNT_OVERLAPPING) == 'abc'.count('') == 4
+    assert count_text('', '', COUNT_OVERLAPPING) == 1
+    assert count_text('x', 'abc', COUNT_OVERLAPPING) == 0
+
+
+@pytest.mark.parametrize('mode', [COUNT_OVERLAPPING, COUNT_NON_OVERLAPPING])
+def test_keyword_set_count_engines(mode):
+    r = random.Random(0)
+    for _ in range(100):
+        keywords = [''.join(r.choice('ab') for _ in range(r.randint(1, 3))) for _ in range(r.randint(1, 5))]
+        value = ''.join(r.choice('abc') for _ in range(r.randint(0, 12)))
+        expected = KeywordSet('keyword', keywords, engine=KEYWORD_ENGINE_REGEXP).count(value, mode)
+        actual = KeywordSet('keyword', keywords, engine=KEYWORD_ENGINE_AHO_CORASICK).count(value, mode)
+        assert actual == expected, (keywords, value)
+
+
+def test_keyword_set_count_limit():
+    for engine in [KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK]:
+        keyword_set = KeywordSet('keyword', ['ab', 'b'], engine=engine)
+        assert keyword_set.count('ababab') == (6, 'b')
+        assert keyword_set.count('ababab', limit=2)[0] == 2
+        assert keyword_set.count('ababab', COUNT_NON_OVERLAPPING) == (3, 'ab')
+
+
+@pytest.mark.parametrize('op,condition_value,limit', [
+    ('>', 2, 3), ('>=', 2, 2), ('<', 2, 2), ('<=', 2, 3), ('=', 2, 3), ('>=', 0, None), ('<', 0, None),
+])
+def test_count_limit(op, condition_value, limit):
+    assert get_count_limit(op, condition_value) == limit
+
+
+def same_result_without_limit(query, doc, environ=None):
+    matcher = json_matcher.compile(query)
+    counting_matcher = matcher.matcher.field_value
+    expected_counting_matcher = pickle.loads(pickle.dumps(counting_matcher))
+    expected_counting_matcher.limit = None
+    value = doc['a']
+    actual = counting_matcher.eval(value, MatchContext(doc, environ))
+    expected = expected_counting_matcher.eval(value, MatchContext(doc, environ))
+    assert actual[0] == expected[0], (query, doc)
+    return actual
+
+
+@pytest.mark.parametrize('op', ['<', '<=', '>', '>=', '='])
+@pytest.mark.parametrize('condition_value', [0, 1, 2, 3, 5])
+def test_counting_matcher_early_exit(op, condition_value):
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x', 'y']))
+    docs = [dict(a=''), dict(a='x'), dict(a='xyxy'), dict(a='x1y2x3'), dict(a=['x', 'xx', 'y']), dict(a=12),
+            dict(a=['1x', ['x', 'y'], {'k': 'xxx'}])]
+    for term in ['x', '/x|y/', '@@{keyword}', '/\\d/']:
+        query = 'a:COUNT({}){}{}'.format(term, op, condition_value)
+        for doc in docs:
+            same_result_without_limit(query, doc, environ)
+
+
+def test_counting_matcher_stops():
+    calls = []
+    counting_matcher = json_matcher.compile('a:COUNT(x)>1').matcher.field_value
+    original = counting_matcher.matcher.count
+
+    def count(value, context, mode=None, limit=None):
+        calls.append(value)
+        return original(value, context, mode, limit)
+    counting_matcher.matcher.count = count
+    assert counting_matcher.eval(['x', 'xx', 'x', 'x'], MatchContext({})) == (True, 'x')
+    assert calls == ['x', 'xx']
+    json_matcher.clear_cache()
+
+
+def test_counting_matcher_mode():
+    counting_matcher = jm.CountingMatcher(jm.TextMatcher(jm.QuotedString('aa')), '=', jm.QuotedString('4'),
+                                          COUNT_OVERLAPPING)
+    assert counting_matcher.eval('aaaaa', MatchContext({}))[0]
+    counting_matcher = jm.CountingMatcher(jm.RegexpMatcher(jm.RQuotedString('aa', '')), '=', jm.QuotedString('2'),
+                                          COUNT_NON_OVERLAPPING)
+    assert counting_matcher.eval('aaaaa', MatchContext({}))[0]
+    with pytest.raises(ValueError):
+        jm.CountingMatcher(jm.TextMatcher(jm.QuotedString('aa')), '=', jm.QuotedString('4'), 'greedy')
+
+
+def test_counting_matcher_old_pickle():
+    counting_matcher = json_matcher.compile('a:COUNT(x)>1').matcher.field_value
+    state = dict(vars(counting_matcher))
+    del state['mode'], state['limit']
+    loaded = jm.CountingMatcher.__new__(jm.CountingMatcher)
+    loaded.__setstate__(state)
+    assert loaded.limit == 2
+    assert loaded.eval('xx', MatchContext({}))[0]
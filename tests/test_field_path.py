@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import subprocess
+import sys
+
+import pytest
+
+import json_matcher
+from json_matcher import MatchContext
+from json_matcher.field_path import FieldPath, get_field_path, parse_path
+
+pydash = pytest.importorskip('pydash')
+
+
+class ReferenceContext(MatchContext):
+    """pydash 를 사용하던 이전 MatchContext.get
+
+    이전 구현은 나머지 path 를 field_name.lstrip(new_field_name) 으로 구했는데, lstrip 은 문자 집합을 제거하므로
+    (a.b.z -> '') 빈 field name 에서 무한 루프에 빠졌다. 앞부분의 길이만큼 자르도록 고친 것과 비교한다.
+    *.name 에서 list 안의 list 는 AttributeError, list 안의 None 은 문서 전체를 다시 훑어서 RecursionError 가
+    발생했는데, 이것도 고친 것과 비교한다.
+    """
+
+    def find_longest_existing_path(self, field_name, j):
+        if pydash.has(j, field_name):
+            return field_name
+
+        while True:
+            split = field_name.rsplit(".", 1)
+            if len(split) == 1 and split[0] != '':
+                return None
+            field_name = split[0]
+            if pydash.has(j, field_name):
+                break
+        return field_name
+
+    def get(self, field_name, j=None, default=None):
+        j = self.j if j is None else j
+
+        if field_name == "*":
+            return list(self.DictToValues(j))
+
+        if field_name.startswith("*.") and (isinstance(j, list) or isinstance(j, dict)):
+            values = [self.get(field_name.lstrip("*."), j, default)]
+            for v in (j.values() if isinstance(j, dict) else j):
+                if isinstance(v, list):
+                    for i in v:
+                        values.append(self.get(field_name, i, default) if isinstance(i, (list, dict)) else default)
+                if isinstance(v, dict):
+                    values.append(self.get(field_name, v, default))
+            return values
+
+        if pydash.has(j, field_name):
+            return pydash.get(j, field_name)
+        else:
+            new_field_name = self.find_longest_existing_path(field_name, j)
+            new_value = pydash.get(j, new_field_name)
+            if isinstance(new_value, list) and len(new_value) and isinstance(new_value[0], dict):
+                return [self.get(field_name[len(new_field_name) + 1:], nv, default) for nv in new_value]
+            elif isinstance(new_value, dict):
+                return self.get(field_name[len(new_field_name) + 1:], new_value)
+
+        return default
+
+
+Point = collections.namedtuple('Point', ['x', 'y'])
+
+DOCS = [
+    {},
+    {'a': 1},
+    {'a': None},
+    {'a': {'b': {'c': 'x'}}},
+    {'a': {'b': None}},
+    {'a': {'b': 'text'}},
+    {'a': [1, 2, 3]},
+    {'a': [{'b': 1}, {'b': 2, 'c': {'d': 3}}, {'c': 4}]},
+    {'a': [{'b': [{'c': 1}, {'c': 2}]}, {'b': []}]},
+    {'a': [[{'b': 1}]]},
+    {'a': {'0': 'zero', 1: 'one'}},
+    {'a': {'b': [{'c': {'d': 'deep'}}, 'x']}},
+    {'a.b': 1, 'a': {'c': 2}},
+    {'@id': 'x', 'ab': {'ba': [{'c': 1}]}},
+    {'x': {'name': 'n1', 'y': {'name': 'n2'}}, 'l': [{'name': 'n3'}, {'z': {'name': 'n4'}}], 'name': 'n0'},
+    {'a': Point(1, 2), 'p': {'q': 5}},
+    {'a': 'abc'},
+    {'a': [None, {'b': 1}]},
+]
+
+FIELD_NAMES = [
+    'a', 'b', 'a.b', 'a.b.c', 'a.b.c.d', 'a.c', 'a.c.d', 'a.z', 'a.b.z',
+    'a[0]', 'a[1].b', 'a[1].c.d', 'a[-1]', 'a.0', 'a.1', 'a[5]', 'a[0].b', 'a[0][0].b',
+    'a.b.c.e', 'a.b[0].c.d', 'a.b[1]', 'a.x.y.z',
+    '@id', 'ab.ba.c', 'ab.ba.x',
+    'a.x', 'a.real', 'a.__class__', 'p.q', 'a.b.name',
+    '*', '*.name', '*.z.name', '*.q',
+]
+
+
+@pytest.mark.parametrize('field_name', FIELD_NAMES)
+def test_same_as_pydash(field_name):
+    dummy = object()
+    for doc in DOCS:
+        try:
+            expected = ReferenceContext(doc).get(field_name, default=dummy)
+        except Exception as e:
+            with pytest.raises(type(e)):
+                MatchContext(doc).get(field_name, default=dummy)
+            continue
+        assert MatchContext(doc).get(field_name, default=dummy) == expected, (doc, field_name)
+        assert MatchContext(doc).exists(field_name) == ReferenceContext(doc).exists(field_name), (doc, field_name)
+
+
+@pytest.mark.parametrize('path', ['a', 'a.b.c', 'a[0].b', 'a[0][1]', 'a.b[-1]', 'a..b', '.a', 'a.', '[0]',
+                                  'a[x].b', 'a\\.b.c', 'a[0]b', '@id', '*.name'])
+def test_parse_path(path):
+    assert parse_path(path) == pydash.utilities.to_path(path)
+
+
+def test_get_field_path():
+    assert get_field_path('a.b') is get_field_path('a.b')
+    field_path = FieldPath('a.b')
+    assert get_field_path(field_path) is field_path
+    assert MatchContext({'a': {'b': 1}}).get(field_path) == 1
+
+
+def test_no_pydash_import():
+    code = ('import sys; import json_matcher; '
+            'json_matcher.match("a.b:1", {"a": {"b": 1}}, parser=json_matcher.PARSER_NATIVE); '
+            'assert "pydash" not in sys.modules')
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+def flatten(values):
+    # get 은 list 안의 값마다 None 을 남기지만 iter_values 는 건너뛴다.
+    return [v for v in MatchContext({}).NestedListToList(values) if v is not None]
+
+
+@pytest.mark.parametrize('field_name', [name for name in FIELD_NAMES if '*' in name] +
+                         ['a.*', 'x.*.name', 'l.*.name', 'a.*.c'])
+def test_iter_values(field_name):
+    for doc in DOCS:
+        context = MatchContext(doc)
+        assert flatten(list(context.iter_values(field_name))) == flatten([context.get(field_name)]), doc
+
+
+class CountingDict(dict):
+    visited = 0
+
+    def values(self):
+        CountingDict.visited += 1
+        return super(CountingDict, self).values()
+
+
+def test_wildcard_early_exit():
+    doc = CountingDict(first=CountingDict(target='hit'))
+    for idx in range(1000):
+        doc['k{}'.format(idx)] = CountingDict(target='miss{}'.format(idx), child=CountingDict(name=idx))
+
+    CountingDict.visited = 0
+    assert MatchContext(doc).exists('*.target')
+    r = json_matcher.match('*.target:hit', doc)
+    assert CountingDict.visited <= 4
+    assert list(r.groups()[0]) == ['*.target', 'hit', 'hit']
+
+    CountingDict.visited = 0
+    assert not json_matcher.match('*.target:none', doc)
+    assert CountingDict.visited > 1000
+
+
+@pytest.mark.parametrize('engine', [json_matcher.ENGINE_INTERPRETER, json_matcher.ENGINE_CODEGEN])
+def test_all_values_in_list_of_dicts(engine):
+    # * 는 list 안의 dict 의 값도 찾는다. (모든 값을 하나의 list 로 평가하던 이전 구현과 같음)
+    for doc in [{'ld': [{'k': 'x'}]}, {'a': {'b': [{'k': 'x'}]}}, {'a': 1, 'ld': [{'k': [{'m': 'x'}]}]}]:
+        assert json_matcher.match('*:x', doc, engine=engine), doc
+        assert not json_matcher.match('NOT *:x', doc, engine=engine), doc
+        assert json_matcher.match('*:x', doc, engine=engine).groups()[0].matched_value == 'x'
+    assert not json_matcher.match('*:x', {'ld': [{'k': 'y'}]}, engine=engine)
+    assert json_matcher.match('NOT *:x', {'ld': [{'k': 'y'}]}, engine=engine)
+
+
+@pytest.mark.parametrize('engine', [json_matcher.ENGINE_INTERPRETER, json_matcher.ENGINE_CODEGEN])
+def test_all_values_result_shape(engine):
+    # list 값은 dict 의 list 이든 아니든 list 하나로 평가하고 결과에는 (펼친) list 를 남긴다.
+    assert json_matcher.match('*:x', {'a': [1, 'x']}, engine=engine).groups() == [('*', [1, 'x'], 'x')]
+    assert json_matcher.match('*:x', {'ld': [{'k': 'y'}, {'k': 'x'}]}, engine=engine).groups() == \
+        [('*', ['y', 'x'], 'x')]
+    assert json_matcher.match('*:x', {'a': 'x'}, engine=engine).groups() == [('*', 'x', 'x')]
+    for doc in [{'a': ['x', 'x']}, {'ld': [{'k': 'x'}, {'k': 'x'}]}]:
+        assert json_matcher.match('*:COUNT(x)>=2', doc, engine=engine), doc
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+from json_matcher.interval_index import INF, Interval, IntervalTree, NumericTermIndex, contains, get_interval
+from json_matcher.multi_matcher import compile_many
+from tests.test_optimizer import groups
+
+NUMERIC_QUERIES = [
+    'a:>1', 'a:>=1', 'a:<1', 'a:<=1', 'a:>0.5', 'a:<-3', 'a:>=10', 'a:<=2.5', 'a:>1e3',
+    'a:[1 TO 3]', 'a:{1 TO 3}', 'a:[0 TO 0]', 'a:{2 TO 2}', 'a:[-5 TO 0.5]', 'a:[3 TO 1]',
+    'a:>nan', 'a:[nan TO 1]', 'a:>inf', 'a:<inf', 'a:>="10"', 'a:[a TO c]', 'a:>x',
+]
+
+VALUES = [0, 1, 1.0, 2, 3, 2.5, -3, -5, 0.5, 10, 1000, 1001, True, False, float('inf'), float('-inf'),
+          float('nan'), 10 ** 400, '1', '10', 'b', None, [1, 5], [], dict(x=2)]
+
+
+def brute_force(intervals, x):
+    return sorted(interval.item for interval in intervals if contains(interval, x))
+
+
+def test_interval_tree():
+    r = random.Random(0)
+    for _ in range(200):
+        intervals = []
+        for idx in range(r.randint(0, 30)):
+            low, high = sorted([r.choice([-INF, INF] + list(range(-5, 6))) for _ in range(2)])
+            intervals.append(Interval(low, r.random() < 0.5, high, r.random() < 0.5, idx))
+        tree = IntervalTree(intervals)
+        assert len(tree) == len(intervals)
+        for x in [-INF, INF] + [v / 2.0 for v in range(-12, 13)]:
+            assert sorted(tree.stab(x)) == brute_force(intervals, x), (intervals, x)
+
+
+def test_get_interval():
+    def interval(query):
+        return get_interval(jm.JsonMatcher(query).matcher.field_value)
+
+    assert interval('a:>1') == (1.0, False, INF, True)
+    assert interval('a:<=2') == (-INF, True, 2.0, True)
+    assert interval('a:[1 TO 3]') == (1.0, True, 3.0, True)
+    assert interval('a:{1 TO 3}') == (1.0, False, 3.0, False)
+    for query in ['a:>x', 'a:>"1"', 'a:[a TO c]', 'a:>nan', 'a:[3 TO 1]', 'a:1']:
+        assert interval(query) is None, query
+
+
+def test_numeric_term_index():
+    terms = [jm.JsonMatcher(query).matcher for query in NUMERIC_QUERIES]
+    terms = [term for term in terms if get_interval(term.field_value) is not None]
+    index = NumericTermIndex('a', terms)
+    assert len(index) == len(terms)
+    for value in VALUES:
+        found = index.search(value)
+        if not isinstance(value, (int, float)) or value != value or value == 10 ** 400:
+            assert found is None, value
+            continue
+        expected = []
+        for term in terms:
+            matched, matched_value = term.field_value.eval(value, None)
+            if matched:
+                expected.append((term.field_value, matched_value))
+        actual = [(term.field_value, matched_value) for term, matched_value in found]
+        assert sorted(actual, key=repr) == sorted(expected, key=repr), value
+        for (_, actual_value), (_, expected_value) in zip(sorted(actual, key=repr), sorted(expected, key=repr)):
+            assert type(actual_value) is type(expected_value)
+
+
+def test_multi_matcher():
+    rules = dict(('rule{}'.format(idx), query) for idx, query in enumerate(NUMERIC_QUERIES))
+    rules.update({
+        'and': 'a:>1 AND b:x',
+        'or': 'a:<-100 OR a:[1 TO 2]',
+        'not': 'NOT a:>=10',
+        'other': 'b:>1 AND b:<5',
+    })
+    multi_matcher = compile_many(rules)
+    assert set(multi_matcher.numeric_indexes) == {'a'}
+
+    for value in VALUES:
+        for doc in [dict(a=value, b='x'), dict(a=value, b=3), dict(b='x')]:
+            expected = {}
+            for rule_id, query in rules.items():
+                try:
+                    r = jm.JsonMatcher(query).match(doc)
+                except (TypeError, OverflowError):
+                    # 숫자가 아닌 값의 range 비교 (index 를 사용하지 않으므로 같은 예외)
+                    break
+                if r:
+                    expected[rule_id] = groups(r)
+            else:
+                results = multi_matcher.match(doc, with_results=True)
+                assert dict((rule_id, groups(r)) for rule_id, r in results.items()) == expected, doc
+
+
+def test_index_used():
+    rules = dict(('rule{}'.format(i), 'latency:>{}'.format(i * 10)) for i in range(1000))
+    multi_matcher = compile_many(rules, index=False)
+    index = multi_matcher.numeric_indexes['latency']
+    evaluated = []
+    for shared in multi_matcher.terms.values():
+        original = shared.matcher.eval
+        shared.matcher.eval = lambda context, original=original: evaluated.append(1) or original(context)
+
+    context = MatchContext(dict(latency=55))
+    assert multi_matcher.match_with_context(context) == {'rule0', 'rule1', 'rule2', 'rule3', 'rule4', 'rule5'}
+    assert context.term_results[index] is True
+    assert evaluated == []
+
+    # 숫자가 아니면 term 을 평가한다. (문자열 비교)
+    assert 'rule100' in multi_matcher.match(dict(latency='55'))
+    assert len(evaluated) == 1000
@@ -3,10 +3,19 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import decimal
+import fnmatch
+import numbers
+import pickle
 import re
+import subprocess
+import sys
+
+import pytest
 
 import json_matcher
 from json_matcher import MatchEnvironment, MatchContext, KeywordSet, TERM_MATCH_CONTAIN
+from json_matcher import json_matcher as jm
 
 
 def test_compile_text_term():
@@ -633,3 +642,348 @@ def test_bool_string():
 
     query = 'field_name:0'
     assert not json_matcher.match(query, data)
+
+
+def test_compile_cache():
+    json_matcher.clear_cache()
+    matcher = json_matcher.compile('A:안녕 B:세상아')
+    assert json_matcher.compile(' A:안녕 B:세상아 ') is matcher
+    assert json_matcher.compile('A:안녕 B:세상아', json_matcher.IMPLICIT_OR) is not matcher
+
+    info = json_matcher.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 2
+
+    json_matcher.set_cache_size(1)
+    info = json_matcher.cache_info()
+    assert info.currsize == 1
+    assert info.evictions == 1
+
+    json_matcher.clear_cache()
+    assert json_matcher.cache_info().currsize == 0
+    json_matcher.set_cache_size(json_matcher.DEFAULT_CACHE_SIZE)
+
+
+def test_context_field_cache():
+    from json_matcher.field_path import FieldPath
+
+    lookups = []
+    original_get = FieldPath.get
+
+    def counting_get(self, j, root, default=None):
+        lookups.append(self.field_name)
+        return original_get(self, j, root, default)
+
+    FieldPath.get = counting_get
+    try:
+        context = MatchContext({'items': [{'status': 'a'}, {'status': 'x'}], 'name': 'foo'})
+        matchers = [
+            json_matcher.compile('items.status:(a b c) AND items.status:/x/ AND NOT items.status:d'),
+            json_matcher.compile('items.status:b OR name:foo'),
+            json_matcher.compile('_exists_:items.status AND _exists_:name'),
+        ]
+        results = [matcher.match_with_context(context) for matcher in matchers]
+    finally:
+        FieldPath.get = original_get
+
+    assert [len(r.groups()) for r in results] == [2, 1, 0]
+    # 값과 존재 여부를 한 번씩 찾는다. (codegen engine 은 dict 에 바로 있는 field 를 직접 꺼낸다)
+    assert lookups.count('items.status') == 2
+    assert lookups.count('name') <= 2
+    assert context.get('items.status') == ['a', 'x']
+
+
+def reference_flat_nested_object(o, pathes=None, depth=0, max_depth=10):
+    # 이전의 재귀 구현
+    if depth >= max_depth:
+        return
+    if pathes is None:
+        pathes = []
+    if isinstance(o, list):
+        for idx, item in enumerate(o):
+            for name, value in reference_flat_nested_object(item, pathes + ['[{}]'.format(idx)], depth + 1, max_depth):
+                yield name, value
+    elif isinstance(o, dict):
+        for inner_key, inner_value in o.items():
+            for name, value in reference_flat_nested_object(inner_value, pathes + ['.{}'.format(inner_key)],
+                                                            depth + 1, max_depth):
+                yield name, value
+    else:
+        name = ''.join(pathes)
+        if name.startswith('.'):
+            name = name[1:]
+        yield name, o
+
+
+def nested_list(value, depth):
+    for _ in range(depth):
+        value = [value]
+    return value
+
+
+def test_iter_leaves():
+    from json_matcher.json_matcher import iter_leaves, iter_leaf_paths, flat_nested_object
+
+    docs = [1, 'a', [], {}, [1, [2, [3, [4]]]], {'a': {'b': [1, {'c': 2}], 'd': []}, 'e': 'x'},
+            {'a': nested_list('deep', 12), 'b': 'shallow'}]
+    for doc in docs:
+        for max_depth in [0, 1, 2, 3, 10]:
+            expected = list(reference_flat_nested_object(doc, max_depth=max_depth))
+            assert list(iter_leaf_paths(doc, max_depth)) == expected
+            assert list(iter_leaves(doc, max_depth)) == [value for name, value in expected]
+        assert list(flat_nested_object(doc)) == list(reference_flat_nested_object(doc))
+    assert list(flat_nested_object({'b': 1}, ['.a'], 1)) == [('a.b', 1)]
+
+    # element budget
+    assert list(iter_leaves(list(range(100)), max_elements=10)) == list(range(10))
+    assert list(iter_leaf_paths([[1, 2], [3, 4]], max_elements=4)) == [('[0][0]', 1), ('[0][1]', 2)]
+
+    # 재귀하지 않으므로 아주 깊은 문서도 처리할 수 있다.
+    deep = nested_list('leaf', 5000)
+    assert list(iter_leaves(deep, max_depth=10000)) == ['leaf']
+    assert list(iter_leaves(deep)) == []
+
+    json_matcher.set_leaf_budget(max_depth=20)
+    try:
+        assert json_matcher.match('A:x', {'A': nested_list('x', 12)})
+    finally:
+        json_matcher.set_leaf_budget()
+    assert not json_matcher.match('A:x', {'A': nested_list('x', 12)})
+    json_matcher.set_leaf_budget(max_elements=3)
+    try:
+        assert not json_matcher.match('A:x', {'A': ['a', 'b', 'c', 'x']})
+    finally:
+        json_matcher.set_leaf_budget()
+    assert json_matcher.match('A:x', {'A': ['a', 'b', 'c', 'x']})
+
+
+def test_lazy_grammar():
+    code = ('import sys, json_matcher\n'
+            'from json_matcher import json_matcher as m\n'
+            'assert not m.PREBUILT_PARSERS\n'
+            'assert "pyparsing" not in sys.modules\n'
+            'json_matcher.compile("A:B")\n'
+            'assert list(m.PREBUILT_PARSERS) == [m.IMPLICIT_BIN_OP_AND]\n'
+            'assert list(m.PREBUILT_PARSERS[m.IMPLICIT_BIN_OP_AND]) == [m.TERM_MATCH_OP_EQUAL]\n')
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+def original_text_eval_one(matcher, input_value):
+    # 값을 매번 해석하던 이전 TextMatcher.eval_one (keyword set 제외)
+    value = matcher.value
+    if not matcher.quoted:
+        if isinstance(input_value, bool):
+            if value.lower() in ['true', 'false']:
+                return (value.lower() == 'true') == input_value, input_value
+        elif isinstance(input_value, numbers.Number):
+            try:
+                return int(value) == int(input_value), input_value
+            except ValueError:
+                pass
+            try:
+                return (abs(float(str(value))) - abs(float(input_value))) < 1e-09, input_value
+            except ValueError:
+                pass
+    if not isinstance(input_value, str):
+        input_value = str(input_value)
+    if '*' in value or '?' in value:
+        return fnmatch.fnmatch(input_value, value), input_value
+    if matcher.term_match_op == jm.TERM_MATCH_OP_CONTAIN:
+        return value in input_value, value
+    return value == input_value, value
+
+
+def test_text_matcher_precompiled():
+    values = ['a', 'ab*', '*ab', '*ab*', '**', '*', 'a*b', 'a?', '*[ab]*', '*a.b*', 'a\\*', '1', '-1', '1.5', '1e3',
+              'nan', 'inf', 'True', 'false', '0x10', '1_000', ' 2 ', '']
+    inputs = ['', 'a', 'ab', 'xab', 'abx', 'xabx', 'a*', 'a\nb', 'a.b', 'b', '1', 1, -1, 0, 1.5, 2.5, -1.5, 1000,
+              1000.0, True, False, float('nan'), decimal.Decimal('1'), decimal.Decimal('NaN'), 16, 2]
+    for text in values:
+        for quoted in [jm.ValidText, jm.QuotedString]:
+            for term_match_op in jm.TERM_MATCH_OPS:
+                matcher = jm.TextMatcher(quoted(text), term_match_op)
+                for input_value in inputs:
+                    expected = original_text_eval_one(matcher, input_value)
+                    actual = matcher.eval_one(input_value, MatchContext({}))
+                    assert repr(actual) == repr(expected), (text, quoted, term_match_op, input_value)
+
+
+def test_text_matcher_wildcard_kind():
+    assert jm.build_wildcard('abc') is None
+    assert jm.build_wildcard('ab*') == (jm.WILDCARD_PREFIX, 'ab')
+    assert jm.build_wildcard('*ab') == (jm.WILDCARD_SUFFIX, 'ab')
+    assert jm.build_wildcard('**ab**') == (jm.WILDCARD_INFIX, 'ab')
+    assert jm.build_wildcard('*') == (jm.WILDCARD_PREFIX, '')
+    assert jm.build_wildcard('a*b')[0] == jm.WILDCARD_PATTERN
+    assert jm.build_wildcard('*a?')[0] == jm.WILDCARD_PATTERN
+    assert jm.build_wildcard('[a]*')[0] == jm.WILDCARD_PATTERN
+
+
+def test_text_matcher_old_pickle():
+    matcher = jm.TextMatcher(jm.ValidText('1*'))
+    state = dict(vars(matcher))
+    for name in ['wildcard', 'bool_value', 'int_value', 'abs_float_value', 'keyword_set_names', 'binding']:
+        del state[name]
+    loaded = jm.TextMatcher.__new__(jm.TextMatcher)
+    loaded.__setstate__(state)
+    assert loaded.wildcard == (jm.WILDCARD_PREFIX, '1')
+    assert loaded.int_value is None
+    assert loaded.eval_one('12', MatchContext({}))[0]
+
+
+def original_expression_eval(matcher, context):
+    # 문서 전체를 복사하던 이전 ExpressionMatcher.eval
+    local = dict(context.get_dict())
+    local.update(context.environ.get_functions())
+    try:
+        ret = eval(compile(matcher.expression, '_expression_matcher', 'eval'), {}, jm.DictOrObject(local))
+    except (AttributeError, TypeError):
+        return False, None
+    return ret, ret
+
+
+def test_expression_same_result():
+    environ = MatchEnvironment()
+    environ.add_function('double', lambda v: v * 2)
+    environ.add_function('A', lambda: 'function wins')
+    expressions = ['A+B>10', 'A.B+B.C>10', 'A.B.C', 'A is None', 'x.y', "'k' in D", 'D.k', "D['k'] == 1", 'E',
+                   'B.upper()', 'double(B) > 10', 'double(C.n)', 'A()', 'L[0] if L else None', 'not F', 'F == {}',
+                   "D.v == {'k': 1}", 'C.n.real', 'C.v.n', 'double(C).v', '(C or D).k', 'L[0].a', 'B.x.y']
+    docs = [dict(A=10, B=20), dict(A=dict(B=10), B=dict(C=20)), dict(B='x', C=dict(n=3)), dict(D=dict(k=1), E=[1]),
+            dict(L=[dict(a=1)], F={}), dict(C=dict(v=dict(n=1))), {}]
+    for expression in expressions:
+        matcher = jm.ExpressionMatcher(expression)
+        for doc in docs:
+            context = MatchContext(doc, environ)
+            assert repr(matcher.eval(context)) == repr(original_expression_eval(matcher, context)), (expression, doc)
+
+
+def test_expression_resolves_names():
+    matcher = jm.ExpressionMatcher('A.B + A.C > x')
+    local = matcher.get_local(MatchContext(dict(A=dict(B=1, C=2), x=0, other=list(range(1000)))))
+    assert sorted(local) == ['A', '__builtins__', 'x']
+    assert json_matcher.match('_expr_:"[v for v in L if v > limit]"', dict(L=[1, 5, 10], limit=4))
+
+
+def test_expression_sandbox():
+    for expression in ['().__class__', 'A.__class__.__bases__', '(x for x in A).gi_frame.f_back',
+                       "__import__('os')", "'{0.__class__}'.format(A)", 'A.__dict__']:
+        with pytest.raises(jm.UnsafeExpressionException):
+            jm.ExpressionMatcher(expression)
+    # builtins 는 사용할 수 없다.
+    assert not json_matcher.match('_expr_:"len(A) > 0"', dict(A=[1]))
+    assert not json_matcher.match('_expr_:"[len(v) for v in A]"', dict(A=['x']))
+    assert json_matcher.match('_expr_:"len(A) > 0"', dict(A=[1], len=lambda v: 1))
+
+
+def test_code_matcher_frame():
+    environ = MatchEnvironment()
+    environ.add_function('positive', lambda v: v > 0)
+    matcher = jm.JsonMatcher('a:!positive AND b:!"positive(this - 10)"')
+    assert matcher.match_with_context(MatchContext(dict(a=1, b=11), environ))
+    code_matcher = matcher.matcher.left.field_value
+    frame = code_matcher.frame
+    assert frame.function is not None
+    assert not matcher.match_with_context(MatchContext(dict(a=-1, b=11), environ))
+    # 같은 environ 이면 함수/globals 를 다시 찾지 않는다.
+    assert code_matcher.frame is frame
+
+    # 함수를 바꾸면 version 이 올라가고 다시 찾는다.
+    environ.add_function('positive', lambda v: v < 0)
+    assert matcher.match_with_context(MatchContext(dict(a=-1, b=9), environ))
+    assert code_matcher.frame is not frame
+    assert not matcher.match_with_context(MatchContext(dict(a=1, b=9), environ))
+
+    restored = pickle.loads(pickle.dumps(matcher))
+    assert restored.matcher.left.field_value.frame is None
+    assert restored.match_with_context(MatchContext(dict(a=-1, b=9), environ))
+
+
+def test_code_matcher_environ_without_version():
+    class FunctionEnvironment(object):
+        def __init__(self, functions):
+            self.functions = functions
+
+        def get_functions(self):
+            return self.functions
+
+        def get_keyword_set(self, name):
+            return None
+
+    class CustomEnvironment(MatchEnvironment):
+        def __init__(self, functions):
+            self.keyword_sets = {}
+            self.functions = functions
+
+    matcher = jm.JsonMatcher('a:!positive AND b:!"positive(this - 10)"')
+    for environ_class in [FunctionEnvironment, CustomEnvironment]:
+        functions = dict(positive=lambda v: v > 0)
+        environ = environ_class(functions)
+        assert matcher.match_with_context(MatchContext(dict(a=1, b=11), environ))
+        # version 이 없으면 frame 을 저장하지 않으므로 functions 를 직접 바꿔도 반영된다.
+        functions['positive'] = lambda v: v < 0
+        assert matcher.match_with_context(MatchContext(dict(a=-1, b=9), environ))
+        assert not matcher.match_with_context(MatchContext(dict(a=1, b=11), environ))
+
+
+def test_code_matcher_batch():
+    calls = []
+
+    @json_matcher.accepts_sequence
+    def suspicious(values):
+        calls.append(list(values))
+        return [value.endswith('.exe') for value in values]
+
+    environ = MatchEnvironment()
+    environ.add_function('suspicious', suspicious)
+    environ.add_function('each', lambda value: value.endswith('.exe'))
+    doc = dict(files=[dict(name='a.txt'), dict(name='b.exe'), dict(name='c.exe'), dict(other=1)])
+    for engine in [json_matcher.ENGINE_INTERPRETER, json_matcher.ENGINE_CODEGEN]:
+        del calls[:]
+        # 값마다 호출하는 것과 결과가 같고, 한 번만 호출한다.
+        matcher = jm.JsonMatcher('files.*.name:!suspicious', engine=engine, environ=environ)
+        each = jm.JsonMatcher('files.*.name:!each', engine=engine, environ=environ)
+        groups = matcher.match(doc).groups()
+        assert groups == each.match(doc).groups()
+        assert [(v.field_name, v.query_value) for v in groups] == [('files.*.name', 'b.exe')]
+        assert calls == [['a.txt', 'b.exe', 'c.exe']]
+        assert not matcher.match(dict(files=[dict(name='a.txt')]))
+        assert not matcher.match(dict(files=[]))
+    # wildcard 가 아닌 경우는 list 를 그대로 넘긴다.
+    assert json_matcher.match('names:!"len(this) == 2"', dict(names=['a', 'b']))
+
+
+def test_test_and_filter():
+    docs = [dict(a=1, b='x'), dict(a=20, b='y'), dict(a=30, c=dict(d='z')), dict(b=['x', 'y']), {}]
+    queries = ['a:>10', 'b:x OR c.d:z', 'NOT a:>10', 'a:>10 AND NOT c.d:z', '_exists_:c', 'b:(y z) AND a:>1']
+    for engine in [json_matcher.ENGINE_INTERPRETER, json_matcher.ENGINE_CODEGEN]:
+        for query in queries:
+            matcher = jm.JsonMatcher(query, engine=engine)
+            expected = [doc for doc in docs if matcher.match(doc)]
+            assert [doc for doc in docs if matcher.test(doc)] == expected, query
+            assert list(matcher.filter(docs)) == expected, query
+            # 같은 context 를 사용해도 문서마다의 groups() 는 match 와 같다.
+            captured = list(matcher.filter(iter(docs), capture=True))
+            assert [doc for doc, r in captured] == expected
+            assert [r.groups() for doc, r in captured] == [matcher.match(doc).groups() for doc in expected]
+
+
+def test_match_context_reset():
+    context = MatchContext(dict(a=1), capture=False)
+    context.add_result(('a', 1, 1))
+    assert context.get_result() == []
+    assert context.get('a') == 1
+    context.reset(dict(a=2))
+    assert context.get('a') == 2
+    assert not context.exists('b')
+    context.reset(dict(b=1))
+    assert context.exists('b')
+
+
+def test_lazy_groups():
+    r = json_matcher.compile('a:1 AND b:2').match(dict(a=1, b=2))
+    assert r.matched_values is None
+    assert r.group(1) == ('b', 2, 2)
+    assert r.groups() is r.groups()
+    assert r.groups()[0].field_name == 'a'
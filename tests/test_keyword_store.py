@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import threading
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchEnvironment, MatchContext, KeywordSet
+from json_matcher import KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK
+from json_matcher.keyword_store import KeywordSetStore
+from json_matcher.multi_matcher import compile_many
+
+
+def write_keywords(path, keywords, mtime=None):
+    # 다른 이름으로 쓴 뒤 rename 한다.
+    temp_path = '{}.tmp'.format(path)
+    with io.open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(''.join('{}\n'.format(keyword) for keyword in keywords))
+    os.rename(temp_path, str(path))
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+@pytest.mark.parametrize('engine', [KEYWORD_ENGINE_REGEXP, KEYWORD_ENGINE_AHO_CORASICK])
+def test_add_keyword_resets(engine):
+    keyword_set = KeywordSet('keyword', ['x'], engine=engine).build()
+    assert keyword_set.search('ayb') is None
+    assert keyword_set.match('y') is None
+    version = keyword_set.version
+    keyword_set.add_keyword('y')
+    assert keyword_set.version > version
+    assert keyword_set.search('ayb').group() == 'y'
+    assert keyword_set.match('y').group() == 'y'
+    assert keyword_set.count('xyx') == (3, 'x')
+
+
+def test_add_keyword_bound_regexp():
+    keyword_set = KeywordSet('keyword', ['x'])
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', keyword_set)
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=environ)
+    assert not matcher.match(dict(a='y'))
+    keyword_set.add_keyword('y')
+    assert matcher.match(dict(a='y'))
+
+
+def test_load(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    with io.open(str(path), 'w', encoding='utf-8', newline='') as f:
+        f.write('x\r\n\n한글\ny z\n')
+    keyword_set = KeywordSet.load('keyword', str(path))
+    assert keyword_set.keyword_list == ['x', '한글', 'y z']
+    assert KeywordSet.load('keyword', str(path), KEYWORD_ENGINE_AHO_CORASICK).get_automaton() is not None
+
+
+def test_snapshot():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x']))
+    environ.add_function('f', len)
+    snapshot = environ.snapshot({'keyword': KeywordSet('keyword', ['y'])})
+    assert environ.get_keyword_set('keyword').keyword_list == ['x']
+    assert snapshot.get_keyword_set('keyword').keyword_list == ['y']
+    assert snapshot.get_functions() == {'f': len}
+    assert snapshot.origin is environ
+    assert snapshot.version > environ.version
+    assert snapshot.snapshot().version == snapshot.version
+
+
+def test_binding_follows_snapshots():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x']))
+    environ.put_keyword_set('other', KeywordSet('other', ['z']))
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=environ)
+    binding = matcher.matcher.field_value.binding
+    first = binding.resolved
+
+    second = environ.snapshot({'other': KeywordSet('other', ['w'])})
+    assert matcher.match_with_context(MatchContext(dict(a='x'), second))
+    # 사용하는 keyword set 이 그대로이면 다시 compile 하지 않는다.
+    assert binding.resolved.environ is second
+    assert binding.resolved.pattern is first.pattern
+
+    third = second.snapshot({'keyword': KeywordSet('keyword', ['y'])})
+    assert matcher.match_with_context(MatchContext(dict(a='y'), third))
+    assert not matcher.match_with_context(MatchContext(dict(a='x'), third))
+    assert binding.resolved.environ is third
+    # 바로 이전 snapshot 으로 평가 중인 것은 이전 것을 사용하고, 더 오래된 것은 bind 하지 않은 것처럼 평가한다.
+    assert binding.lookup(second) is binding.previous
+    assert binding.lookup(environ) is None
+    assert matcher.match_with_context(MatchContext(dict(a='x'), environ))
+    assert binding.resolved.environ is third
+
+
+def test_store_reload(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    write_keywords(path, ['x', 'ax'], mtime=1000)
+    store = KeywordSetStore({'keyword': str(path)})
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=store)
+    multi_matcher = compile_many({1: 'a:@@{keyword}', 2: 'a:/@@{keyword}/'}, environ=store)
+    first = store.get_environ()
+    assert matcher.match(dict(a='ax'))
+    assert multi_matcher.match(dict(a='ax')) == {1, 2}
+    assert not store.reload()
+
+    write_keywords(path, ['y'], mtime=2000)
+    assert store.reload()
+    second = store.get_environ()
+    assert second is not first
+    assert first.get_keyword_set('keyword').keyword_list == ['x', 'ax']
+    # bind 한 term 은 reload 할 때 새 snapshot 으로 옮겨진다.
+    assert matcher.matcher.field_value.binding.resolved.environ is second
+    assert not matcher.match(dict(a='ax'))
+    assert matcher.match(dict(a='y'))
+    assert multi_matcher.match(dict(a='y')) == {1, 2}
+    assert multi_matcher.match(dict(a='ax'), first) == {1, 2}
+    assert json_matcher.compile('a:@@{keyword}', environ=store).match(dict(a='y'))
+    json_matcher.clear_cache()
+
+
+def test_store_reload_error(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    write_keywords(path, ['x'])
+    store = KeywordSetStore({'keyword': str(path)})
+    environ = store.get_environ()
+    os.remove(str(path))
+    with pytest.raises(OSError):
+        store.reload()
+    assert store.get_environ() is environ
+
+
+def test_store_base_environ(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    write_keywords(path, ['x'])
+    base = MatchEnvironment()
+    base.put_keyword_set('other', KeywordSet('other', ['y']))
+    store = KeywordSetStore({'keyword': str(path)}, base)
+    assert store.get_environ().get_keyword_set('other') is base.get_keyword_set('other')
+    assert base.get_keyword_set('keyword') is None
+
+
+def test_store_thread(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    write_keywords(path, ['k0'], mtime=1000)
+    store = KeywordSetStore({'keyword': str(path)})
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=store)
+    errors = []
+    stopped = threading.Event()
+
+    def read():
+        # 매칭 하나는 하나의 snapshot 으로 평가하고, 결과는 그 snapshot 의 keyword 와 같다.
+        while not stopped.is_set():
+            environ = store.get_environ()
+            keyword = environ.get_keyword_set('keyword').keyword_list[0]
+            context = MatchContext(dict(a=keyword), environ)
+            if not matcher.match_with_context(context):
+                errors.append(keyword)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        store.start(interval=0.001)
+        for idx in range(1, 30):
+            write_keywords(path, ['k{}'.format(idx)], mtime=1000 + idx)
+            while store.get_environ().get_keyword_set('keyword').keyword_list != ['k{}'.format(idx)]:
+                stopped.wait(0.001)
+    finally:
+        stopped.set()
+        store.stop()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    assert store.thread is None
+
+
+def test_filter_keyword_store(tmp_path):
+    path = tmp_path / 'keywords.txt'
+    write_keywords(path, ['x'])
+    store = KeywordSetStore({'keyword': str(path)})
+    matcher = jm.JsonMatcher('a:@@{keyword}', environ=store)
+
+    def docs():
+        yield dict(a='x')
+        # 다음 문서부터 새 snapshot 으로 평가한다.
+        write_keywords(path, ['y'])
+        store.reload(force=True)
+        yield dict(a='x')
+        yield dict(a='y')
+    assert list(matcher.filter(docs())) == [dict(a='x'), dict(a='y')]
+
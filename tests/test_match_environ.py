@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pickle
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchEnvironment, MatchContext, KeywordSet, KeywordSetBinding
+from json_matcher.multi_matcher import compile_many
+from tests.test_codegen import QUERIES, DOCS
+from tests.test_optimizer import groups
+
+KEYWORD_QUERIES = QUERIES + [
+    'a:@@{keyword}',
+    'a:*@@{keyword}*',
+    'a:(y @@{keyword} z)',
+    'a:/^@@{keyword}$/',
+    'a:/@@{keyword}@@{other}/',
+    'a:/@@{missing}/',
+    'a:@@{missing}',
+    'a:COUNT(@@{keyword})>1',
+    'a:COUNT(/@@{keyword}/)>=1',
+]
+
+
+def environment():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x', 'ax']))
+    environ.put_keyword_set('other', KeywordSet('other', ['y']))
+    return environ
+
+
+@pytest.mark.parametrize('engine', jm.ENGINES)
+@pytest.mark.parametrize('term_match_op', jm.TERM_MATCH_OPS)
+@pytest.mark.parametrize('query', KEYWORD_QUERIES)
+def test_bound_same_result(query, term_match_op, engine):
+    environ = environment()
+    unbound = jm.JsonMatcher(query, term_match_op=term_match_op, engine=engine)
+    bound = jm.JsonMatcher(query, term_match_op=term_match_op, engine=engine, environ=environ)
+    for doc in DOCS + [dict(a='xy'), dict(a='axxy'), dict(a=['ax', 'z'])]:
+        expected = unbound.match_with_context(MatchContext(doc, environ))
+        assert groups(bound.match(doc)) == groups(expected), (query, doc)
+        # 다른 environ 으로 평가하면 bind 하지 않은 것과 같다.
+        for other in [None, environment()]:
+            expected = unbound.match_with_context(MatchContext(doc, other))
+            actual = bound.match_with_context(MatchContext(doc, other))
+            assert groups(actual) == groups(expected), (query, doc)
+
+
+def test_binding_resolves_once():
+    environ = environment()
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=environ)
+    binding = matcher.matcher.field_value.binding
+    pattern = binding.lookup(environ).pattern
+    assert pattern.pattern == '^(x|ax)$'
+    assert binding.lookup(environ).pattern is pattern
+
+    # 관계없는 keyword set 이나 함수를 바꾸면 다시 compile 하지 않는다.
+    environ.put_keyword_set('other', KeywordSet('other', ['z']))
+    environ.add_function('f', lambda v: v)
+    assert binding.lookup(environ).pattern is pattern
+    assert binding.resolved.version == environ.version
+
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['q']))
+    assert binding.lookup(environ).pattern.pattern == '^(q)$'
+    assert matcher.match(dict(a='q'))
+    assert not matcher.match(dict(a='x'))
+
+
+def test_binding_missing_keyword_set():
+    environ = MatchEnvironment()
+    matcher = jm.JsonMatcher('a:@@{keyword}', environ=environ)
+    assert matcher.match({'a': '@@{keyword}'})
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x']))
+    assert not matcher.match({'a': '@@{keyword}'})
+    assert matcher.match({'a': 'x'})
+
+
+def test_binding_environ_without_version():
+    class CustomEnvironment(MatchEnvironment):
+        def __init__(self, keyword_sets):
+            self.keyword_sets = keyword_sets
+            self.functions = {}
+
+    # version/origin 이 없는 environ 은 bind 한 결과 대신 평가할 때 찾는다.
+    for query in ['f:@@{k}', 'f:/^@@{k}$/']:
+        matcher = jm.JsonMatcher(query, environ=environment())
+        custom = CustomEnvironment({'k': KeywordSet('k', ['z'])})
+        assert matcher.match_with_context(MatchContext(dict(f='z'), custom)), query
+        assert not matcher.match_with_context(MatchContext(dict(f='ax'), custom)), query
+        # version 이 없는 environ 에 bind 해도 평가할 때 찾는다.
+        bound = jm.JsonMatcher(query, environ=custom)
+        custom.keyword_sets['k'] = KeywordSet('k', ['w'])
+        assert bound.match(dict(f='w')), query
+        assert not bound.match(dict(f='z')), query
+
+
+def test_binding_names():
+    environ = environment()
+    binding = KeywordSetBinding(environ, ('keyword', 'other'), '@@{keyword}-@@{other}')
+    assert [k.name for k in binding.lookup(environ).keyword_sets] == ['keyword', 'other']
+    assert binding.lookup(environ).pattern.search('ax-y')
+    assert KeywordSetBinding(environ, ('keyword', 'missing')).lookup(environ).keyword_sets is None
+
+
+def test_with_default_keyword_set_version():
+    environ = environment()
+    default_environ = environ.with_default_keyword_set(KeywordSet('default', ['d']))
+    assert default_environ.version > environ.version
+    assert default_environ.keyword_set_versions['other'] == environ.keyword_set_versions['other']
+    assert default_environ.get_keyword_set('keyword').name == 'default'
+
+
+def test_bound_regex_engine():
+    environ = environment()
+    matcher = jm.JsonMatcher('a:/^@@{keyword}$/', environ=environ, regex_engine=jm.REGEX_ENGINE_RE2)
+    assert matcher.matcher.field_value.binding.regex_engine == jm.REGEX_ENGINE_RE2
+    assert matcher.match(dict(a='ax'))
+
+
+def test_bound_pickle():
+    environ = environment()
+    matcher = jm.JsonMatcher('a:(/@@{keyword}/ @@{other})', environ=environ)
+    loaded = pickle.loads(pickle.dumps(matcher))
+    assert loaded.environ is None
+    assert all(m.binding is None for m in loaded.matcher.field_value.matchers)
+    assert loaded.match_with_context(MatchContext(dict(a='y'), environ))
+
+
+def test_compile_environ():
+    json_matcher.clear_cache()
+    environ = environment()
+    # environ 에 bind 한 matcher 는 cache 하지 않는다. (environ 을 cache 에 붙잡아 두지 않음)
+    bound = json_matcher.compile('a:@@{keyword}', environ=environ)
+    assert bound.environ is environ
+    assert bound is not json_matcher.compile('a:@@{keyword}', environ=environ)
+    assert json_matcher.cache_info().currsize == 0
+    assert bound is not json_matcher.compile('a:@@{keyword}')
+    assert json_matcher.compile('a:@@{keyword}').environ is None
+    assert not hasattr(bound, 'bind_environ')
+    assert json_matcher.match('a:@@{keyword}', dict(a='ax'), environ=environ)
+    assert not json_matcher.match('a:@@{keyword}', dict(a='ax'))
+    json_matcher.clear_cache()
+
+
+def test_compile_many_environ():
+    environ = environment()
+    multi_matcher = compile_many({1: 'a:@@{keyword}', 2: 'a:/@@{other}/'}, environ=environ)
+    assert multi_matcher.match(dict(a='ax')) == {1}
+    assert multi_matcher.match(dict(a='y')) == {2}
+    assert multi_matcher.match(dict(a='ax'), MatchEnvironment()) == set()
+
+
+def test_bind_does_not_change_cached_matcher():
+    json_matcher.clear_cache()
+    environ = MatchEnvironment()
+    environ.put_keyword_set('bad', KeywordSet('bad', ['x']))
+    matcher = json_matcher.compile('a:@@{bad}')
+    bound = matcher.bind(environ)
+    assert bound is not matcher and bound.environ is environ
+    assert bound.match(dict(a='x'))
+    # compile() 이 공유하는 matcher 는 bind 하지 않은 그대로이다.
+    assert matcher.environ is None
+    assert json_matcher.compile('a:@@{bad}') is matcher
+    assert not json_matcher.compile('a:@@{bad}').match(dict(a='x'))
+    assert not json_matcher.match('a:@@{bad}', dict(a='x'))
+    assert json_matcher.match('a:@@{bad}', dict(a='x'), environ=environ)
+    json_matcher.clear_cache()
+
+
+def test_bind_store_registers_copy(tmp_path):
+    from json_matcher.keyword_store import KeywordSetStore
+    path = tmp_path / 'bad.txt'
+    path.write_text('x\n')
+    store = KeywordSetStore({'bad': str(path)})
+    matcher = jm.JsonMatcher('a:@@{bad}')
+    bound = matcher.bind(store)
+    assert list(store.matchers) == [bound]
+    assert bound.match(dict(a='x'))
+    assert not matcher.match(dict(a='x'))
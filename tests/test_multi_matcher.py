@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+from json_matcher.multi_matcher import MultiMatcher, SharedTermMatcher, compile_many, matcher_key
+from tests.test_codegen import QUERIES, DOCS, environment
+from tests.test_optimizer import groups
+
+RULES = dict(('rule{}'.format(idx), query) for idx, query in enumerate(QUERIES))
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('flags', [0, json_matcher.IMPLICIT_OR | json_matcher.TERM_MATCH_CONTAIN])
+def test_same_result(flags, optimize):
+    multi_matcher = compile_many(RULES, flags, optimize=optimize)
+    implicit_bin_op, term_match_op = jm.get_match_ops(flags)
+    matchers = dict((rule_id, jm.JsonMatcher(query, implicit_bin_op, term_match_op, optimize=optimize))
+                    for rule_id, query in RULES.items())
+    for doc in DOCS:
+        for environ in [None, environment()]:
+            expected = {}
+            for rule_id, matcher in matchers.items():
+                r = matcher.match_with_context(MatchContext(doc, environ))
+                if r:
+                    expected[rule_id] = groups(r)
+
+            assert multi_matcher.match(doc, environ) == set(expected), doc
+            results = multi_matcher.match(doc, environ, with_results=True)
+            assert dict((rule_id, groups(r)) for rule_id, r in results.items()) == expected, doc
+
+
+def test_shared_terms():
+    multi_matcher = compile_many({
+        'r1': 'a:x AND b:>1',
+        'r2': 'a:x OR c:/y+/',
+        'r3': 'NOT a:x',
+        'r4': 'c:/y+/ AND b:>1 AND _exists_:d',
+        'r5': 'a:"x"',
+    })
+    assert multi_matcher.term_count == 9
+    # a:x, b:>1, c:/y+/, _exists_:d, a:"x"(quoted)
+    assert len(multi_matcher.terms) == 5
+
+    calls = []
+    for shared in multi_matcher.terms.values():
+        original = shared.matcher.eval
+        shared.matcher.eval = lambda context, original=original: calls.append(1) or original(context)
+
+    results = multi_matcher.match(dict(a='x', b=2, c='yy', d=None), with_results=True)
+    assert sorted(results) == ['r1', 'r2', 'r4', 'r5']
+    assert groups(results['r1']) == [('a', 'x', 'x'), ('b', 2, 2)]
+    assert groups(results['r4']) == [('c', 'yy', 'yy'), ('b', 2, 2)]
+    assert len(calls) == 5
+
+
+def test_matcher_key():
+    def key(query):
+        return matcher_key(jm.JsonMatcher(query).matcher)
+
+    assert key('a:x') == key('a:x')
+    assert key('_expr_:"a > 1"') == key('_expr_:"a > 1"')
+    assert key('a:x') != key('a:"x"')
+    assert key('a:x') != key('b:x')
+    assert key('a:/x/') != key('a:/x/i')
+    assert key('a:1') != key('a:>1')
+
+
+def test_match_with_context():
+    multi_matcher = compile_many({'r1': 'a:x', 'r2': 'b:y'})
+    context = MatchContext(dict(a='x', b='y'))
+    assert multi_matcher.match_with_context(context) == {'r1', 'r2'}
+    assert context.get_result() == []
+    # 같은 context 로 다시 평가해도 같은 결과
+    assert multi_matcher.match_with_context(context) == {'r1', 'r2'}
+    assert json_matcher.compile('a:x').match_with_context(context)
+
+
+def test_deep_query():
+    query = ' OR '.join('field{}:value{}'.format(i, i) for i in range(2000))
+    multi_matcher = compile_many({'deep': query, 'single': 'field1999:value1999'}, parser=json_matcher.PARSER_NATIVE,
+                                 optimize=True)
+    assert len(multi_matcher.terms) == 2000
+    assert multi_matcher.match(dict(field1999='value1999')) == {'deep', 'single'}
+
+
+def test_repr():
+    multi_matcher = MultiMatcher({'r1': 'a:x', 'r2': 'a:x'})
+    assert len(multi_matcher) == 2
+    assert repr(multi_matcher) == 'MultiMatcher(rules=2, terms=2, unique_terms=1)'
+    assert isinstance(multi_matcher.rules[0][1], SharedTermMatcher)
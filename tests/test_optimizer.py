@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import itertools
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher.optimizer import optimize, flatten, estimate
+
+QUERIES = [
+    'a:1 AND b:2',
+    'a:1 OR b:2',
+    '_expr_:"a > 0" AND a:/\\d+/ AND _exists_:b AND b:2',
+    'a:/\\d/ AND b:*2* AND c:>1 AND d:x',
+    'a:1 AND (b:2 OR c:3) AND _exists_:d',
+    'a:/1/ AND NOT b:2',
+    'NOT b:2 AND a:/1/',
+    'NOT b:2 AND NOT c:4 AND d:x',
+    'NOT (a:/1/ AND b:*2* AND _exists_:c)',
+    'NOT (a:1 OR _exists_:zz OR b:/9/)',
+    '_exists_:a OR _expr_:"b == 2"',
+    'c:[1 TO 5] AND *.e:f AND a:1',
+    'a:(1 2 3) AND b:!"this == 2" AND c:>=3',
+    'x.y:COUNT("ab")>=2 AND a:1',
+    'a:1 AND b:2 AND c:3 AND d:x AND NOT x.y:zz',
+    '(a:/1/ AND b:3) OR c:>1',
+    'NOT (a:/1/ AND b:2) AND c:3',
+    '(a:/1/ AND NOT (b:*2* AND c:3)) OR d:x',
+]
+
+DOCS = [
+    dict(a=1, b=2, c=3, d='x'),
+    dict(a=1, b=3, c=4, d='x'),
+    dict(a=2, b=2, c=3),
+    dict(b=2, c=5, d='y', x=dict(y='abab', e='f')),
+    dict(a=1, b=2, c=3, d='x', x=dict(y='abab', e='f')),
+    dict(),
+]
+
+
+def groups(result):
+    if result is None:
+        return None
+    return [tuple(m) for m in result.groups()]
+
+
+def test_flatten():
+    matcher = jm.build_json_matcher('a:1 AND b:2 AND (c:3 AND d:4) AND (e:5 OR f:6)')
+    operands = flatten(matcher)
+    assert [type(m).__name__ for m in operands] == ['TermMatcher'] * 4 + ['OrMatcher']
+    assert [m.field_name for m in operands[:4]] == ['a', 'b', 'c', 'd']
+
+    optimized = optimize(matcher)
+    assert isinstance(optimized, jm.FlatAndMatcher)
+    assert len(optimized.matchers) == 5
+    assert isinstance(optimized.matchers[4], jm.FlatOrMatcher)
+
+
+def test_order():
+    matcher = optimize(jm.build_json_matcher('_expr_:"a > 0" AND a:/\\d+/ AND b:*2* AND c:>1 AND d:x AND _exists_:b'))
+    ordered = [type(matcher.matchers[idx].field_value).__name__
+               if isinstance(matcher.matchers[idx], jm.TermMatcher) else type(matcher.matchers[idx]).__name__
+               for idx in matcher.order]
+    assert ordered == ['ExistsMatcher', 'TextMatcher', 'Operator', 'TextMatcher', 'RegexpMatcher',
+                       'ExpressionMatcher']
+    assert matcher.matchers[matcher.order[1]].field_name == 'd'
+
+    assert estimate(jm.build_json_matcher('*.a:x')).cost > estimate(jm.build_json_matcher('a:x')).cost
+
+
+def test_or_order_preserves_groups():
+    # 결과가 groups() 에 나타나는 OR 는 순서를 바꾸지 않는다.
+    matcher = optimize(jm.build_json_matcher('a:/1/ OR b:2'))
+    assert matcher.order == [0, 1]
+
+    # 결과가 나타나지 않는 경우는 바꾼다.
+    matcher = optimize(jm.build_json_matcher('_expr_:"a > 1" OR _exists_:a'))
+    assert matcher.order == [1, 0]
+    matcher = optimize(jm.build_json_matcher('a:/1/ OR b:2'), preserve_groups=False)
+    assert matcher.order == [1, 0]
+
+
+@pytest.mark.parametrize('implicit_bin_op,term_match_op',
+                         list(itertools.product(jm.IMPLICIT_BIN_OPS, jm.TERM_MATCH_OPS)))
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result(query, implicit_bin_op, term_match_op):
+    plain = jm.JsonMatcher(query, implicit_bin_op, term_match_op)
+    optimized = jm.JsonMatcher(query, implicit_bin_op, term_match_op, optimize=True)
+    for doc in DOCS:
+        assert groups(optimized.match(doc)) == groups(plain.match(doc))
+
+
+def test_not_result():
+    doc = dict(a=1, b=3)
+    expected = [('NOT', 'NOT', 'NOT'), ('a', 1, '1')]
+    assert groups(json_matcher.match('NOT b:2 AND a:/1/', doc)) == expected
+    assert groups(json_matcher.match('NOT b:2 AND a:/1/', doc, optimize=True)) == expected
+
+    expected = [('a', 1, '1')]
+    assert groups(json_matcher.match('a:/1/ AND NOT b:2', doc)) == expected
+    assert groups(json_matcher.match('a:/1/ AND NOT b:2', doc, optimize=True)) == expected
+
+
+@pytest.mark.parametrize('optimize_', [False, True])
+def test_failed_branch_result(optimize_):
+    # 매칭되지 않은 AND 의 결과(먼저 매칭된 term 의 결과)도 groups() 에 남는다.
+    doc = dict(a=1, b=2, c=3)
+    assert groups(json_matcher.match('(a:1 AND b:3) OR c:3', doc, optimize=optimize_)) == [('a', 1, 1), ('c', 3, 3)]
+    assert groups(json_matcher.match('(a:1 AND b:2) OR c:3', dict(a=1, c=3), optimize=optimize_)) == \
+        [('a', 1, 1), ('c', 3, 3)]
+    assert groups(json_matcher.match('NOT (a:1 AND b:3) OR c:3', doc, optimize=optimize_)) == [('a', 1, 1)]
+    assert groups(json_matcher.match('NOT (a:1 AND b:2) AND c:3', dict(a=1, c=3), optimize=optimize_)) == \
+        [('a', 1, 1), ('c', 3, 3)]
+    # 순서를 바꿔 평가해도 실패한 AND 의 결과는 작성된 순서로 평가한 것과 같다.
+    assert groups(json_matcher.match('(a:/1/ AND b:3) OR c:3', doc, optimize=optimize_)) == \
+        [('a', 1, '1'), ('c', 3, 3)]
+
+
+def test_reorder_failed_and():
+    # 실패한 결과가 groups() 에 나타날 수 있는 AND 는 순서를 바꾸지 않는다.
+    assert optimize(jm.build_json_matcher('a:/1/ AND b:3')).order == [1, 0]
+    assert optimize(jm.build_json_matcher('(a:/1/ AND b:3) OR c:3')).matchers[0].order == [0, 1]
+    assert optimize(jm.build_json_matcher('NOT (a:/1/ AND b:3)')).term.order == [0, 1]
+    assert optimize(jm.build_json_matcher('NOT (a:/1/ AND b:3)'), preserve_groups=False).term.order == [1, 0]
+
+
+def test_compile_option():
+    json_matcher.clear_cache()
+    plain = json_matcher.compile('a:1 AND b:2')
+    optimized = json_matcher.compile('a:1 AND b:2', optimize=True)
+    assert plain is not optimized
+    assert isinstance(optimized.matcher, jm.FlatAndMatcher)
+    assert optimized is json_matcher.compile('a:1 AND b:2', optimize=True)
+
+
+def test_long_chain():
+    query = ' OR '.join('field{}:value{}'.format(i, i) for i in range(2000))
+    matcher = json_matcher.compile(query, parser=json_matcher.PARSER_NATIVE, optimize=True)
+    assert len(matcher.matcher.matchers) == 2000
+    assert groups(matcher.match(dict(field1999='value1999'))) == [('field1999', 'value1999', 'value1999')]
+    assert not matcher.match(dict(field1999='value'))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from json_matcher.parallel import (grep, split_file, iter_stream_chunks, iter_input_files, read_chunk,
+                                   DirectoryInputError)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_lines(path, docs, newline=True):
+    data = '\n'.join(json.dumps(doc, ensure_ascii=False) for doc in docs) + ('\n' if newline else '')
+    with io.open(str(path), 'w', encoding='utf-8', newline='') as f:
+        f.write(data)
+    return data.encode('utf-8')
+
+
+def make_docs(count, start=0):
+    return [dict(a=idx, b='한글 {}'.format(idx % 7)) for idx in range(start, start + count)]
+
+
+def expected_lines(docs, match):
+    return b''.join(json.dumps(doc, ensure_ascii=False).encode('utf-8') + b'\n' for doc in docs if match(doc))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 10000])
+def test_split_file(tmp_path, chunk_size):
+    path = tmp_path / 'a.json'
+    data = write_lines(path, make_docs(50), newline=False)
+    chunks = split_file(str(path), chunk_size)
+    assert chunks[0][1] == 0 and chunks[-1][2] == len(data)
+    # 빈틈없이 나누고, 마지막을 제외하면 줄 경계에서 끝난다.
+    assert all(prev[2] == chunk[1] for prev, chunk in zip(chunks, chunks[1:]))
+    assert all(data[end - 1:end] == b'\n' for path, start, end in chunks[:-1])
+    assert b''.join(b''.join(read_chunk(chunk)) for chunk in chunks) == data
+    assert split_file(str(write_empty(tmp_path)), chunk_size) == []
+
+
+def write_empty(tmp_path):
+    path = tmp_path / 'empty.json'
+    path.write_bytes(b'')
+    return path
+
+
+def test_iter_stream_chunks():
+    data = b'{"a": 1}\n{"a": 22}\n{"a": 333}'
+    chunks = list(iter_stream_chunks(io.BytesIO(data), 3))
+    assert b''.join(chunks) == data
+    assert all(chunk.endswith(b'\n') for chunk in chunks[:-1])
+
+
+def test_iter_input_files(tmp_path):
+    (tmp_path / 'd' / 'e').mkdir(parents=True)
+    for name in ['d/b.json', 'd/a.json', 'd/e/c.json', 'f.json']:
+        (tmp_path / name).write_bytes(b'')
+    files = list(iter_input_files([str(tmp_path / 'f.json'), str(tmp_path / 'd')], recursive=True))
+    assert [os.path.relpath(f, str(tmp_path)) for f in files] == ['f.json', 'd/a.json', 'd/b.json', 'd/e/c.json']
+    with pytest.raises(DirectoryInputError):
+        list(iter_input_files([str(tmp_path / 'd')]))
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_grep(tmp_path, ordered):
+    (tmp_path / 'd').mkdir()
+    first, second = make_docs(300), make_docs(200, start=300)
+    write_lines(tmp_path / 'first.json', first)
+    write_lines(tmp_path / 'd' / 'second.json', second, newline=False)
+    paths = [str(tmp_path / 'first.json'), str(tmp_path / 'd')]
+
+    output = io.BytesIO()
+    grep('a:>100 AND b:"한글 3"', paths, jobs=3, ordered=ordered, recursive=True, chunk_size=256, output=output)
+    expected = expected_lines(first + second, lambda doc: doc['a'] > 100 and doc['b'] == '한글 3')
+    # 마지막 줄바꿈이 없는 file 의 마지막 줄은 그대로 출력한다.
+    if second[-1]['b'] == '한글 3':
+        expected = expected[:-1]
+    if ordered:
+        assert output.getvalue() == expected
+    else:
+        assert sorted(output.getvalue().splitlines()) == sorted(expected.splitlines())
+
+    output = io.BytesIO()
+    grep('a:>10', [], jobs=2, ordered=ordered, invert_match=True, chunk_size=64, output=output,
+         stdin=io.BytesIO(expected_lines(first, lambda doc: True)))
+    assert sorted(output.getvalue().splitlines()) == sorted(expected_lines(first[:11], bool).splitlines())
+
+
+def test_grep_json_error(tmp_path):
+    path = tmp_path / 'a.json'
+    path.write_bytes(b'{"a": 1}\nnot json\n{"a": 2}\n')
+    output = io.BytesIO()
+    grep('a:*', [str(path)], jobs=2, ignore_json_error=True, chunk_size=4, output=output)
+    assert output.getvalue() == b'{"a": 1}\n{"a": 2}\n'
+    with pytest.raises(ValueError):
+        grep('a:*', [str(path)], jobs=2, chunk_size=4, output=io.BytesIO())
+
+
+def test_jrep_jobs(tmp_path):
+    path = tmp_path / 'a.json'
+    write_lines(path, make_docs(100))
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    command = [sys.executable, os.path.join(ROOT, 'bin', 'jrep')]
+    sequential = subprocess.check_output(command + ['a:>90', str(path)], env=env)
+    assert sequential == expected_lines(make_docs(100), lambda doc: doc['a'] > 90)
+    assert subprocess.check_output(command + ['-j', '2', 'a:>90', str(path)], env=env) == sequential
+    assert subprocess.check_output(command + ['-r', '-j', '0', 'a:>90', str(tmp_path)], env=env) == sequential
+    process = subprocess.Popen(command + ['a:>90', str(tmp_path)], env=env, stderr=subprocess.PIPE)
+    assert process.communicate()[1].endswith(b'Is a directory\n')
+    assert process.returncode == 2
+    # 음수 worker 수는 traceback 대신 usage 오류이다.
+    process = subprocess.Popen(command + ['-j', '-1', 'a:>90', str(path)], env=env, stderr=subprocess.PIPE)
+    assert b'usage:' in process.communicate()[1]
+    assert process.returncode == 2
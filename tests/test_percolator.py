@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+
+import pytest
+
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext
+from json_matcher.multi_matcher import compile_many
+from json_matcher.percolator import RuleIndex, get_requirements, REQUIRE_TEXT, REQUIRE_EXISTS
+from tests.test_codegen import QUERIES as CODEGEN_QUERIES, DOCS as CODEGEN_DOCS, environment
+from tests.test_optimizer import groups
+
+QUERIES = CODEGEN_QUERIES + [
+    'a:x AND b:y',
+    'a:"1"',
+    'a:"True"',
+    'a:"None"',
+    'a:"1.5"',
+    'a:(x y) AND b:>1',
+    '_exists_:a AND a:x',
+    '_exists_:b',
+    'a:x OR b:y',
+    'NOT a:x',
+    'a.b:x AND NOT a.c:y',
+    'l.b:x',
+    'a:1',
+    'a:nan',
+    'a:"x y"',
+    'a:X',
+]
+
+DOCS = CODEGEN_DOCS + [
+    dict(a=1),
+    dict(a='1'),
+    dict(a=True),
+    dict(a=[True, 'x']),
+    dict(a=[1.5, True]),
+    dict(a=dict(b='x', c='z')),
+    dict(a='x y', b=2),
+    dict(a='y', b=2),
+    dict(a=float('nan')),
+    dict(l=[dict(b='x')]),
+    dict(a=[[['x']]]),
+]
+
+RULES = dict(('rule{}'.format(idx), query) for idx, query in enumerate(QUERIES))
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_same_result(optimize):
+    with_index = compile_many(RULES, optimize=optimize)
+    without_index = compile_many(RULES, optimize=optimize, index=False)
+    matchers = dict((rule_id, jm.JsonMatcher(query, optimize=optimize)) for rule_id, query in RULES.items())
+    for doc in DOCS:
+        for environ in [None, environment()]:
+            expected = {}
+            for rule_id, matcher in matchers.items():
+                r = matcher.match_with_context(MatchContext(doc, environ))
+                if r:
+                    expected[rule_id] = groups(r)
+
+            for multi_matcher in [with_index, without_index]:
+                results = multi_matcher.match(doc, environ, with_results=True)
+                assert dict((rule_id, groups(r)) for rule_id, r in results.items()) == expected, doc
+    assert with_index.stats().pruned_ratio > 0.3
+
+
+def requirements(query):
+    return [(kind, field_name, values) for kind, field_name, values in get_requirements(jm.JsonMatcher(query).matcher)]
+
+
+def test_requirements():
+    assert requirements('a:x') == [(REQUIRE_TEXT, 'a', ['x'])]
+    assert requirements('a:x AND (b:"1" AND _exists_:c)') == \
+        [(REQUIRE_TEXT, 'a', ['x']), (REQUIRE_TEXT, 'b', ['1']), (REQUIRE_EXISTS, 'c', None)]
+    assert requirements('a:(x y)') == [(REQUIRE_TEXT, 'a', ['x', 'y'])]
+    for query in ['a:x OR b:y', 'NOT a:x', 'a:1', 'a:1.5', 'a:true', 'a:x*', 'a:/x/', 'a:(x /y/)', 'a:@@{keyword}',
+                  '*.a:x', 'a:>x', '_expr_:"a"']:
+        assert requirements(query) == [], query
+    assert requirements('(a:x OR b:y) AND c:z') == [(REQUIRE_TEXT, 'c', ['z'])]
+
+
+def test_index():
+    matchers = [jm.JsonMatcher(query).matcher for query in [
+        'service:a AND userid:u1',
+        'service:a AND userid:u2',
+        'service:b',
+        '_exists_:x',
+        'size:>1',
+        'userid:(u3 u4)',
+    ]]
+    index = RuleIndex(matchers)
+    # userid 가 service 보다 적게 겹친다.
+    assert index.terms == {'userid': {'u1': [0], 'u2': [1], 'u3': [5], 'u4': [5]}, 'service': {'b': [2]}}
+    assert index.exists == {'x': [3]}
+    assert index.always == [4]
+
+    assert index.candidates(MatchContext(dict(service='a', userid='u1'))) == [0, 4]
+    assert index.candidates(MatchContext(dict(service='b', x=None))) == [2, 3, 4]
+    assert index.candidates(MatchContext(dict(userid=['u2', 'u3']))) == [1, 4, 5]
+
+    stats = index.stats()
+    assert (stats.rules, stats.indexed, stats.always, stats.documents, stats.evaluated) == (6, 5, 1, 3, 8)
+    assert stats.pruned_ratio == pytest.approx(1 - 8 / 18.0)
+    index.clear_stats()
+    assert index.stats().documents == 0
+
+
+def test_stats():
+    multi_matcher = compile_many(dict(('rule{}'.format(i), 'service:s{} AND size:>1'.format(i)) for i in range(100)))
+    assert multi_matcher.match(dict(service='s7', size=10)) == {'rule7'}
+    assert multi_matcher.stats().evaluated == 1
+    assert multi_matcher.stats().pruned_ratio == 0.99
+    assert compile_many({'r': 'a:x'}, index=False).stats() is None
+
+
+def test_stats_threads():
+    # 여러 thread 에서 같은 MultiMatcher 를 사용해도 통계는 정확하다.
+    multi_matcher = compile_many(dict(('rule{}'.format(i), 'service:s{} AND size:>1'.format(i)) for i in range(10)))
+
+    def run():
+        for i in range(500):
+            multi_matcher.match(dict(service='s{}'.format(i % 10), size=10))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = multi_matcher.stats()
+    assert (stats.documents, stats.evaluated) == (4000, 4000)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher.query_parser import parse_query, QuerySyntaxError
+from tests import test_json_matcher
+
+OP_COMBINATIONS = [(bin_op, match_op) for bin_op in jm.IMPLICIT_BIN_OPS for match_op in jm.TERM_MATCH_OPS]
+
+# test_json_matcher 에 없는 경계 조건
+EXTRA_QUERIES = [
+    'A:x OR B:y OR C:z',
+    'A:x || B:y && C:z',
+    'A:x AND B:y OR C:z AND D:w',
+    'NOT A:x B:y',
+    'not A:x or !B:y',
+    'NOT NOT A:x',
+    'NOTE:x',
+    'ORDER:x ANDROID:y',
+    '(A:x)AND(B:y)',
+    'A:x&&B:y',
+    '((((A:x))))',
+    'A : x',
+    'A:B:C',
+    'A:"quoted \\t value"',
+    'A:"\\x41\\101"',
+    'A:/abc/ i',
+    'A:/a\\/b\\d/i',
+    'A:/~/ raw /~/',
+    'A:/~//~/',
+    'A:(a "b c" /d/ i *e*)',
+    'A:("abc)',
+    'A:COUNTRY',
+    'A:COUNT("a b")>=2',
+    'A:COUNT(/a+/i)<3',
+    'A:COUNT(/~/a/~/)=1',
+    'A:>"10"',
+    'A:> 10',
+    'A:=abc',
+    'A:{a TO b}',
+    'A:[TO TO 3]',
+    'A:[1 to 2]',
+    'A:!func',
+    'A:!"func(this, 1)"',
+    '_exists_:A.B[0]',
+    '_expr_:"A > 1"',
+    '*.target:x',
+    '@id:1\tB:2',
+]
+
+INVALID_QUERIES = [
+    '',
+    'A',
+    'A:',
+    'A:x OR',
+    'A:x AND',
+    '(A:x',
+    'A:x)',
+    'A:[1 TO 2',
+    'A:[1 TO 2}',
+    'A:COUNT(a)',
+    'NOT',
+]
+
+
+def dump(node):
+    if isinstance(node, (list, tuple)):
+        return type(node).__name__, [dump(n) for n in node]
+    if isinstance(node, re.Pattern):
+        return 'Pattern', node.pattern, node.flags
+    if hasattr(node, '__dict__'):
+        return type(node).__name__, dict((k, dump(v)) for k, v in vars(node).items())
+    return node
+
+
+def suite_test_names():
+    """test_json_matcher 의 인자가 없는 test 함수들. (fixture 나 parametrize 를 사용하는 test 는 제외)"""
+    return [name for name in dir(test_json_matcher)
+            if name.startswith('test_') and name != 'test_lazy_grammar' and
+            callable(getattr(test_json_matcher, name)) and not getattr(test_json_matcher, name).__code__.co_argcount]
+
+
+@pytest.fixture(scope='session')
+def suite_queries():
+    """test_json_matcher 를 실행하면서 compile 되는 모든 query. (collection 이 아닌 처음 사용하는 test 에서 실행한다)"""
+    queries = set()
+    original = jm.build_json_matcher
+
+    def recording_build_json_matcher(expr, implicit_bin_op, term_match_op, parser=jm.PARSER_PYPARSING):
+        queries.add((expr, implicit_bin_op, term_match_op))
+        return original(expr, implicit_bin_op, term_match_op, parser)
+
+    json_matcher.clear_cache()
+    jm.build_json_matcher = recording_build_json_matcher
+    try:
+        for name in suite_test_names():
+            getattr(test_json_matcher, name)()
+    finally:
+        jm.build_json_matcher = original
+        json_matcher.clear_cache()
+    return sorted(queries)
+
+
+def test_suite_query_tree(suite_queries):
+    assert suite_queries
+    for query, implicit_bin_op, term_match_op in suite_queries:
+        expected = jm.build_json_matcher(query, implicit_bin_op, term_match_op, jm.PARSER_PYPARSING)
+        actual = parse_query(query, implicit_bin_op, term_match_op)
+        assert dump(actual) == dump(expected), (query, implicit_bin_op, term_match_op)
+
+
+@pytest.mark.parametrize('implicit_bin_op,term_match_op', OP_COMBINATIONS)
+@pytest.mark.parametrize('query', EXTRA_QUERIES)
+def test_extra_query_tree(query, implicit_bin_op, term_match_op):
+    expected = jm.build_json_matcher(query, implicit_bin_op, term_match_op, jm.PARSER_PYPARSING)
+    actual = parse_query(query, implicit_bin_op, term_match_op)
+    assert dump(actual) == dump(expected)
+
+
+@pytest.mark.parametrize('query', INVALID_QUERIES)
+def test_invalid_query(query):
+    with pytest.raises(jm.JsonMatcherParseException):
+        json_matcher.compile(query, parser=json_matcher.PARSER_PYPARSING)
+    with pytest.raises(jm.JsonMatcherParseException):
+        json_matcher.compile(query, parser=json_matcher.PARSER_NATIVE)
+    with pytest.raises(QuerySyntaxError):
+        parse_query(query)
+
+
+@pytest.mark.parametrize('name', suite_test_names())
+def test_suite_with_native_parser(name):
+    json_matcher.set_default_parser(json_matcher.PARSER_NATIVE)
+    try:
+        getattr(test_json_matcher, name)()
+    finally:
+        json_matcher.set_default_parser(json_matcher.PARSER_PYPARSING)
+
+
+def test_long_query():
+    query = ' OR '.join('field{}:value{}'.format(i, i) for i in range(2000))
+    matcher = parse_query('(' * 100 + query + ')' * 100)
+
+    count = 1
+    while isinstance(matcher, jm.OrMatcher):
+        assert matcher.right.field_name == 'field{}'.format(2000 - count)
+        matcher = matcher.left
+        count += 1
+    assert count == 2000
+
+
+@pytest.mark.parametrize('parser', jm.PARSERS)
+def test_unsafe_expression(parser):
+    with pytest.raises(jm.UnsafeExpressionException):
+        jm.JsonMatcher('_expr_:"A.__class__"', parser=parser)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pickle
+import re
+import warnings
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext, MatchEnvironment, KeywordSet
+from json_matcher import regex_engine
+from json_matcher.regex_engine import find_backtracking, compile_regexp
+from tests.test_codegen import QUERIES, DOCS, environment
+from tests.test_optimizer import groups
+
+UNSAFE_PATTERNS = [
+    r'(a+)+b',
+    r'(a*)*',
+    r'(\w+\s?)+$',
+    r'(.|x)*',
+    r'(x+x+)+y',
+    r'(a|a)*b',
+    r'(.*a){10}',
+    r'^(a?){25}a{25}$',
+    r'(\w+)*@',
+    r'(?i)(ab|AB)+$',
+]
+
+SAFE_PATTERNS = [
+    r'abc',
+    r'a+b+',
+    r'(x+y)+',
+    r'(\d+\.)+\d+',
+    r'(a|ab)+',
+    r'^[a-z]+@[a-z]+\.com$',
+    r'(a{2}){3}',
+    r'(a|b)*c',
+    r'(?:a++)+b',
+    r'(?>a+)+b',
+]
+
+
+@pytest.mark.parametrize('pattern', UNSAFE_PATTERNS)
+def test_find_backtracking(pattern):
+    assert find_backtracking(pattern)
+
+
+@pytest.mark.parametrize('pattern', SAFE_PATTERNS)
+def test_find_backtracking_safe(pattern):
+    assert find_backtracking(pattern) == []
+
+
+def test_find_backtracking_ignorecase():
+    assert find_backtracking('(ab|AB)+$') == []
+    assert find_backtracking('(ab|AB)+$', re.IGNORECASE)
+
+
+@pytest.fixture
+def validation():
+    yield json_matcher.set_regex_validation
+    json_matcher.set_regex_validation(json_matcher.REGEX_VALIDATION_OFF)
+
+
+def test_regex_validation_strict(validation):
+    validation(json_matcher.REGEX_VALIDATION_STRICT)
+    with pytest.raises(json_matcher.UnsafeRegexpException) as e:
+        json_matcher.compile('a:/(a+)+b/ OR b:x')
+    assert e.value.pattern == '(a+)+b'
+    assert e.value.reasons == ['nested quantifier']
+
+    with pytest.raises(json_matcher.UnsafeRegexpException):
+        json_matcher.compile('a:(x /(.|x)*y/)')
+    assert json_matcher.compile('a:/(x+y)+/').match(dict(a='xxy'))
+
+
+def test_regex_validation_warn(validation):
+    validation(json_matcher.REGEX_VALIDATION_WARN)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        matcher = json_matcher.compile('a:/(\\w+)*@/')
+    assert [w.category for w in caught if issubclass(w.category, json_matcher.UnsafeRegexpWarning)] == \
+        [json_matcher.UnsafeRegexpWarning]
+    assert matcher.match(dict(a='x@y'))
+
+
+def test_regex_validation_off():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', json_matcher.UnsafeRegexpWarning)
+        assert json_matcher.compile('a:/(a+)+b/').match(dict(a='aab'))
+
+
+def test_unknown_regex_engine():
+    with pytest.raises(ValueError):
+        json_matcher.compile('a:/x/', regex_engine='pcre')
+    with pytest.raises(ValueError):
+        json_matcher.set_default_regex_engine('pcre')
+    with pytest.raises(ValueError):
+        json_matcher.set_regex_validation('loose')
+
+
+def test_compile_regexp_fallback():
+    pattern = compile_regexp('a.c', re.IGNORECASE, json_matcher.REGEX_ENGINE_RE2)
+    assert pattern.search('xAbC')
+    if regex_engine.re2 is None:
+        assert isinstance(pattern, re.Pattern)
+    # RE2 가 지원하지 않는 문법은 re 로 compile 한다.
+    pattern = compile_regexp(r'(a)\1', 0, json_matcher.REGEX_ENGINE_RE2)
+    assert isinstance(pattern, re.Pattern)
+    assert pattern.search('aa')
+
+
+def test_compile_regexp_unicode_classes(monkeypatch):
+    class FakeRe2(object):
+        @staticmethod
+        def compile(pattern):
+            return ('re2', pattern)
+
+    monkeypatch.setattr(regex_engine, 're2', FakeRe2)
+    assert compile_regexp('a.c', 0, json_matcher.REGEX_ENGINE_RE2) == ('re2', 'a.c')
+    assert compile_regexp('[a-z]+', re.IGNORECASE, json_matcher.REGEX_ENGINE_RE2) == ('re2', '(?i)[a-z]+')
+    # RE2 의 \d, \w, \s, \b 는 ASCII 만 매칭하므로 re 로 compile 한다.
+    for pattern in [r'\w+', r'[\d.]+', r'(x|\s)', r'(?:a\S)*', r'\bé']:
+        compiled = compile_regexp(pattern, 0, json_matcher.REGEX_ENGINE_RE2)
+        assert isinstance(compiled, re.Pattern), pattern
+    assert compile_regexp(r'\\w', 0, json_matcher.REGEX_ENGINE_RE2) == ('re2', r'\\w')
+    assert compile_regexp(r'(?a)\w', 0, json_matcher.REGEX_ENGINE_RE2) == ('re2', r'(?a)\w')
+    assert compile_regexp(r'\w+', 0, json_matcher.REGEX_ENGINE_RE2).search('é')
+    assert json_matcher.match('f:/\\w+/', dict(f='é'), regex_engine=json_matcher.REGEX_ENGINE_RE2)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_result_re2(query):
+    expected_matcher = json_matcher.compile(query)
+    actual_matcher = json_matcher.compile(query, regex_engine=json_matcher.REGEX_ENGINE_RE2)
+    for doc in DOCS:
+        for environ in [None, environment()]:
+            expected = expected_matcher.match_with_context(MatchContext(doc, environ))
+            actual = actual_matcher.match_with_context(MatchContext(doc, environ))
+            assert groups(actual) == groups(expected), (query, doc)
+
+
+def test_pickle_regex_engine():
+    matcher = json_matcher.compile('a:/^x@@{keyword}/i', regex_engine=json_matcher.REGEX_ENGINE_RE2)
+    loaded = pickle.loads(pickle.dumps(matcher))
+    regexp_matcher = loaded.matcher.field_value
+    assert regexp_matcher.regex_engine == json_matcher.REGEX_ENGINE_RE2
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['a', 'b']))
+    assert loaded.match_with_context(MatchContext(dict(a='xb'), environ))
+    assert not loaded.match_with_context(MatchContext(dict(a='xc'), environ))
+
+
+def test_expand_regexp_engine():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['a', 'b']))
+    context = MatchContext({}, environ)
+    pattern = context.expand_regexp('^x@@{keyword}$', json_matcher.REGEX_ENGINE_RE2)
+    assert pattern.search('xb')
+    assert not pattern.search('xc')
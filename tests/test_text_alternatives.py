@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import decimal
+import pickle
+import random
+
+import pytest
+
+import json_matcher
+from json_matcher import json_matcher as jm
+from json_matcher import MatchContext, MatchEnvironment, KeywordSet
+from json_matcher import match_environ
+from tests.test_optimizer import groups
+
+VALUE_LISTS = [
+    'a b c',
+    'a "b" a',
+    '1 2.5 true "3"',
+    '10 x 1e3 nan',
+    'false 0 TRUE',
+    '*x* a?c /^X/i b',
+    '/b+/ /a/ /c/ ab',
+    '/(a)\\1/ *a* /a/',
+    '/(?i)A/ /a+$/ x*',
+    '@@{keyword} a /x@@{keyword}/ *y',
+    '"" a',
+    '"a*" "1" 1 "true"',
+    '/\\d+/ 12 *2',
+    '"여러분" 안녕* /세상/',
+]
+
+INPUTS = ['', 'a', 'b', 'ab', 'xax', 'XY', 'x', 'aa', 'abc', 'y', 'bbb', '12', '123', '3', '1', '1000', 'true',
+          'True', 'nan', '안녕하세요', '여러분 세상', 'a\nb', 1, 2, 2.5, 3, 10, 1000, 1000.0, 0, -1, 12.9,
+          True, False, float('nan'), decimal.Decimal('1'), None, ['x', 'b'], [1, 'a'], {'k': 'ab'}]
+
+
+def environment():
+    environ = MatchEnvironment()
+    environ.put_keyword_set('keyword', KeywordSet('keyword', ['x', 'ax']))
+    return environ
+
+
+@pytest.mark.parametrize('flags', [json_matcher.TERM_MATCH_EQUAL, json_matcher.TERM_MATCH_CONTAIN])
+@pytest.mark.parametrize('values', VALUE_LISTS)
+def test_same_result(values, flags):
+    query = 'a:({})'.format(values)
+    matcher = json_matcher.compile(query, flags)
+    for input_value in INPUTS:
+        for environ in [None, environment()]:
+            context = MatchContext({'a': input_value}, environ)
+            alternatives = matcher.matcher.field_value.alternatives
+            expected = alternatives.eval_each(input_value, context)
+            actual = alternatives.eval_one(input_value, context)
+            if expected[1] != expected[1]:
+                # nan
+                assert actual[0] == expected[0] and actual[1] != actual[1]
+            else:
+                assert actual == expected, (values, input_value)
+
+
+def test_overflow():
+    matcher = json_matcher.compile('a:(1 x)')
+    with pytest.raises(OverflowError):
+        matcher.match(dict(a=float('inf')))
+    with pytest.raises(OverflowError):
+        json_matcher.compile('a:(x 1.5)').match(dict(a=10 ** 400))
+    assert json_matcher.compile('a:("1" x)').match(dict(a='x'))
+
+
+def test_random_alternatives():
+    r = random.Random(0)
+    alphabet = 'ab1*?'
+    for _ in range(200):
+        values = []
+        for _ in range(r.randint(1, 8)):
+            value = ''.join(r.choice(alphabet) for _ in range(r.randint(0, 3)))
+            kind = r.random()
+            if kind < 0.2:
+                regexp = value.replace('*', '').replace('?', '') or 'a'
+                values.append('/{}{}/'.format(regexp, r.choice(['', '+', '.', '?', '$'])))
+            elif kind < 0.4:
+                values.append('"{}"'.format(value))
+            elif value:
+                values.append(value)
+        if not values:
+            continue
+        inputs = [''.join(r.choice('ab1') for _ in range(r.randint(0, 4))) for _ in range(10)] + [1, 11, 1.0, True]
+        for flags in [json_matcher.TERM_MATCH_EQUAL, json_matcher.TERM_MATCH_CONTAIN]:
+            matcher = json_matcher.compile('a:({})'.format(' '.join(values)), flags).matcher.field_value
+            for input_value in inputs:
+                context = MatchContext({})
+                assert matcher.alternatives.eval_one(input_value, context) == \
+                    matcher.alternatives.eval_each(input_value, context), (values, input_value)
+
+
+def test_many_contain_literals(monkeypatch):
+    monkeypatch.setattr(match_environ, 'AHO_CORASICK_MIN_KEYWORDS', 3)
+    from json_matcher import text_alternatives
+    monkeypatch.setattr(text_alternatives, 'AHO_CORASICK_MIN_KEYWORDS', 3)
+    query = 'a:(zz cd "" abc bc b)'
+    values = ['abcd', 'xbcx', 'zzz', '', 'q']
+    json_matcher.clear_cache()
+    matcher = json_matcher.compile(query, json_matcher.TERM_MATCH_CONTAIN).matcher.field_value
+    assert matcher.alternatives.text_literals.automaton is not None
+    for value in values:
+        context = MatchContext({})
+        assert matcher.alternatives.eval_one(value, context) == matcher.alternatives.eval_each(value, context)
+    json_matcher.clear_cache()
+
+
+def test_regex_engine_rebuild():
+    matcher = json_matcher.compile('a:(/a+/ b)', regex_engine=json_matcher.REGEX_ENGINE_RE2)
+    alternatives = matcher.matcher.field_value.alternatives
+    assert alternatives.regexp_filter is None
+    assert alternatives.regexps == [(0, matcher.matcher.field_value.matchers[0].pattern)]
+    assert groups(matcher.match(dict(a='xaa'))) == [('a', 'xaa', 'aa')]
+
+
+def test_filters():
+    alternatives = json_matcher.compile('a:(x /b+/ *y /(c)\\1/ z? /d/)').matcher.field_value.alternatives
+    assert alternatives.wildcard_filter is not None
+    assert alternatives.regexp_filter is None
+    alternatives = json_matcher.compile('a:(x /b+/i *y /d/)').matcher.field_value.alternatives
+    assert alternatives.wildcard_filter is None
+    assert alternatives.regexp_filter.search('xBx')
+
+
+def test_wildcards_reuse_matcher_wildcard():
+    # compile 할 때 만든 TextMatcher.wildcard 를 그대로 사용하고, filter 는 하나씩 평가한 것과 같다.
+    matcher = json_matcher.compile('a:(x* *y *z* w?v * "q")').matcher.field_value
+    alternatives = matcher.alternatives
+    assert [wildcard for _, wildcard in alternatives.wildcards] == [m.wildcard for m in matcher.matchers[:5]]
+    assert all(wildcard is m.wildcard for (_, wildcard), m in zip(alternatives.wildcards, matcher.matchers))
+    context = MatchContext({})
+    for value in ['', 'x', 'ax', 'x\n', 'a\ny', 'y\n', 'zz', '\nz\n', 'wav', 'w\nv', 'q', '.*', 'x.']:
+        assert alternatives.eval_one(value, context) == alternatives.eval_each(value, context), value
+    assert not json_matcher.compile('a:(x* *y)').match(dict(a='y\n'))
+    assert json_matcher.compile('a:(x* *y)').match(dict(a='x\ny'))
+
+
+def test_pickle():
+    matcher = json_matcher.compile('a:(x *y /z+/)')
+    loaded = pickle.loads(pickle.dumps(matcher))
+    assert 'alternatives' not in matcher.matcher.field_value.__getstate__()
+    assert groups(loaded.match(dict(a='azz'))) == [('a', 'azz', 'zz')]
+    assert groups(loaded.match(dict(a='xy'))) == [('a', 'xy', 'xy')]